@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for retrieval, persistence and prompt building.
+
+Each run seeds a throwaway SQLite database per dataset size with synthetic
+memories and messages (fixed random seed, deterministic hash embeddings), times
+every case, and reports p50/p95/p99 latency and ops/s. No Ollama or model
+download is needed.
+
+Usage:
+  python benchmarks/bench_kairos.py                        # sizes 10^2..10^4
+  python benchmarks/bench_kairos.py --sizes 100,10000,1000000 --output out.json
+  python benchmarks/bench_kairos.py --save-baseline        # record a new baseline
+  python benchmarks/bench_kairos.py --cases get_all_memories,add_chat_message
+
+Results are compared against benchmarks/baseline.json when it exists; a case
+whose p50 is more than --threshold slower than its baseline is flagged and the
+run exits with status 1. Baselines are machine specific, so record one on the
+machine that runs the comparison.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "python"))
+# Must be set before kairos_ai is imported so it never loads the real model
+os.environ["KAIROS_EMBEDDING_BACKEND"] = "hash"
+
+from termcolor import colored
+
+from database.connection import DbConnection
+from database.operations import (
+    init_db,
+    add_chat_message,
+    add_memory,
+    get_all_memories,
+)
+from embeddings import HashEmbedding
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BENCH_DIR, "..", "src", "python", "database", "schema.sql")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = [100, 1000, 10000]
+# KairosAI holds every memory and its embedding in process; beyond this the
+# benchmark measures swap rather than code
+MAX_IN_PROCESS_SIZE = 100_000
+BULK_BATCH = 100
+SEED = 1234
+
+WORDS = (
+    "morning coffee focus energy rest cycle moon creative writing walk music "
+    "tea journal friend sister project deadline calm anxious sleep dream garden "
+    "ocean book painting yoga routine pomodoro break protein snack spark ritual "
+    "archetype tarot season winter summer rain light candle bath meditation"
+).split()
+
+
+def synthetic_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def seed_database(db_path: str, size: int) -> None:
+    """Fill a fresh database with `size` messages and `size` memories."""
+    rng = random.Random(SEED)
+    backend = HashEmbedding()
+    init_db(db_path, SCHEMA_PATH)
+
+    def messages():
+        for i in range(size):
+            role = "user" if i % 2 == 0 else "assistant"
+            yield role, synthetic_text(rng, 5, 40), f"2024-01-01T00:00:{i:08d}"
+
+    def memories():
+        for i in range(size):
+            value = synthetic_text(rng, 3, 15)
+            embedding = json.dumps([round(v, 5) for v in backend.embed(value)])
+            yield f"memory_{i}", value, rng.randint(1, 10), embedding
+
+    conn = DbConnection(db_path).connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO chat_history (role, content, timestamp) VALUES (?, ?, ?)",
+                messages(),
+            )
+            conn.executemany(
+                """
+                INSERT INTO spellbook_memories (memory_key, memory_value, priority, embedding)
+                VALUES (?, ?, ?, ?)
+                """,
+                memories(),
+            )
+    finally:
+        conn.close()
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(
+        0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1)
+    )
+    return sorted_samples[rank]
+
+
+def measure(
+    fn: Callable[[], Any], min_runs: int, min_seconds: float, max_runs: int
+) -> List[float]:
+    """Time `fn` after one warm-up call, until both run and time minimums are met."""
+    fn()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (
+        len(samples) < min_runs or time.perf_counter() - started < min_seconds
+    ):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def summarize(name: str, size: int, samples: List[float], items: int = 1) -> Dict:
+    ordered = sorted(samples)
+    mean = sum(ordered) / len(ordered)
+    return {
+        "name": name,
+        "size": size,
+        "runs": len(ordered),
+        "items_per_run": items,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "mean_ms": round(mean * 1000, 4),
+        "ops_per_sec": round(items / mean, 2) if mean else None,
+    }
+
+
+class Context:
+    """Per-size state shared by the cases: the seeded database and a KairosAI."""
+
+    def __init__(self, db_path: str, size: int):
+        self.db_path = db_path
+        self.size = size
+        self.rng = random.Random(SEED + size)
+        self._kairos = None
+
+    def kairos(self):
+        if self._kairos is None:
+            import kairos_ai
+
+            self._kairos = kairos_ai.KairosAI(self.db_path)
+        return self._kairos
+
+
+def case_get_all_memories(ctx: Context):
+    return lambda: get_all_memories(db_path=ctx.db_path), 1
+
+
+def case_get_relevant_memories(ctx: Context):
+    kairos = ctx.kairos()
+    messages = [synthetic_text(ctx.rng, 5, 20) for _ in range(50)]
+    turn = itertools.count()
+    return lambda: kairos.get_relevant_memories(messages[next(turn) % 50]), 1
+
+
+def case_build_memory_context(ctx: Context):
+    kairos = ctx.kairos()
+    return kairos.build_memory_context, 1
+
+
+def case_build_chat_history_context(ctx: Context):
+    kairos = ctx.kairos()
+    return kairos.build_chat_history_context, 1
+
+
+def case_build_prompt(ctx: Context):
+    kairos = ctx.kairos()
+    message = synthetic_text(ctx.rng, 5, 20)
+    return lambda: kairos.build_prompt(message), 1
+
+
+def case_add_chat_message(ctx: Context):
+    content = synthetic_text(ctx.rng, 5, 40)
+    return lambda: add_chat_message("user", content, db_path=ctx.db_path), 1
+
+
+def case_bulk_insert_memories(ctx: Context):
+    backend = HashEmbedding()
+    values = [synthetic_text(ctx.rng, 3, 15) for _ in range(BULK_BATCH)]
+    embeddings = [backend.embed(value) for value in values]
+    batch = itertools.count()
+
+    def run():
+        n = next(batch)
+        for i, (value, embedding) in enumerate(zip(values, embeddings)):
+            add_memory(f"bulk_{n}_{i}", value, 5, embedding, db_path=ctx.db_path)
+
+    return run, BULK_BATCH
+
+
+# name -> (factory, needs KairosAI in process). Read-only cases run first so
+# the writes do not change the dataset they measure.
+CASES = {
+    "get_all_memories": (case_get_all_memories, False),
+    "get_relevant_memories": (case_get_relevant_memories, True),
+    "build_memory_context": (case_build_memory_context, True),
+    "build_chat_history_context": (case_build_chat_history_context, True),
+    "build_prompt": (case_build_prompt, True),
+    "add_chat_message": (case_add_chat_message, False),
+    "bulk_insert_memories": (case_bulk_insert_memories, False),
+}
+
+
+def run_benchmarks(
+    sizes: List[int], cases: List[str], args: argparse.Namespace
+) -> List[Dict]:
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="kairos-bench-")
+    try:
+        for size in sizes:
+            db_path = os.path.join(work_dir, f"bench_{size}.db")
+            print(colored(f"\n🌱 Seeding {size:,} memories and messages...", "yellow"))
+            t0 = time.perf_counter()
+            seed_database(db_path, size)
+            print(colored(f"   seeded in {time.perf_counter() - t0:.1f}s", "cyan"))
+
+            ctx = Context(db_path, size)
+            for name in cases:
+                factory, in_process = CASES[name]
+                if in_process and size > args.max_in_process_size:
+                    print(
+                        colored(
+                            f"   ⏭️  {name}: skipped above {args.max_in_process_size:,}",
+                            "yellow",
+                        )
+                    )
+                    continue
+                try:
+                    fn, items = factory(ctx)
+                except (ImportError, SystemExit) as e:
+                    print(
+                        colored(
+                            f"   ⏭️  {name}: skipped ({e or 'init failed'})", "yellow"
+                        )
+                    )
+                    continue
+                samples = measure(fn, args.min_runs, args.min_seconds, args.max_runs)
+                result = summarize(name, size, samples, items)
+                results.append(result)
+                print(
+                    colored(
+                        f"   {name:<28} p50 {result['p50_ms']:>10.3f} ms  "
+                        f"p95 {result['p95_ms']:>10.3f} ms  "
+                        f"p99 {result['p99_ms']:>10.3f} ms  "
+                        f"{result['ops_per_sec']:>12,.1f} ops/s",
+                        "cyan",
+                    )
+                )
+            if ctx._kairos is not None:
+                ctx._kairos.change_feed.close()
+            os.remove(db_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def compare_to_baseline(
+    results: List[Dict], baseline: Dict, threshold: float
+) -> List[Dict]:
+    """Annotate results with their change against the baseline p50."""
+    base = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    print(
+        colored(
+            f"\n📊 Compared with baseline ({baseline.get('created_at', '?')})", "yellow"
+        )
+    )
+    for result in results:
+        previous = base.get((result["name"], result["size"]))
+        if not previous or not previous.get("p50_ms"):
+            continue
+        change = result["p50_ms"] / previous["p50_ms"] - 1
+        result["baseline_p50_ms"] = previous["p50_ms"]
+        result["p50_change"] = round(change, 4)
+        label = f"{result['name']}@{result['size']}"
+        if change > threshold:
+            regressions.append(result)
+            print(colored(f"   ❌ {label:<36} {change:+.1%} slower", "red"))
+        elif change < -threshold:
+            print(colored(f"   ✅ {label:<36} {-change:.1%} faster", "green"))
+        else:
+            print(colored(f"   •  {label:<36} {change:+.1%}", "cyan"))
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="comma separated dataset sizes (default: 100,1000,10000)",
+    )
+    parser.add_argument(
+        "--cases", default=",".join(CASES), help="comma separated cases to run"
+    )
+    parser.add_argument("--min-runs", type=int, default=20)
+    parser.add_argument("--max-runs", type=int, default=2000)
+    parser.add_argument(
+        "--min-seconds", type=float, default=1.0, help="minimum time per case"
+    )
+    parser.add_argument(
+        "--max-in-process-size",
+        type=int,
+        default=MAX_IN_PROCESS_SIZE,
+        help="largest size for cases that load every memory into KairosAI",
+    )
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="p50 slowdown that counts as a regression (default 0.2 = 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        print(colored(f"❌ Unknown cases: {', '.join(unknown)}", "red"))
+        print(colored(f"Available: {', '.join(CASES)}", "yellow"))
+        return 2
+
+    print(colored("⏱️ Kairos benchmarks", "cyan"))
+    results = run_benchmarks(sizes, cases, args)
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "results": results,
+    }
+
+    regressions: List[Dict] = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+    report["regressions"] = [f"{r['name']}@{r['size']}" for r in regressions]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(colored(f"\n💾 Results written to {args.output}", "green"))
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(colored(f"\n💾 Baseline saved to {args.baseline}", "green"))
+
+    if regressions:
+        print(
+            colored(
+                f"\n⚠️ {len(regressions)} regression(s) over {args.threshold:.0%}",
+                "red",
+            )
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
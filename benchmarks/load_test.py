@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the Kairos API.
+
+Replays a weighted mix of /api/chat, /api/memories and /api/chat-history
+requests at a target rate against a running server (ideally backed by
+benchmarks/mock_ollama.py, so the LLM is deterministic). Arrivals are open
+loop: requests are scheduled on the clock, and latency is measured from the
+scheduled time, so a saturated server shows up as queueing delay rather than
+as a politely lower request rate.
+
+While the test runs, /metrics (when the server has KAIROS_METRICS=true) and the
+mock's /mock/stats are sampled for in-flight chats and executor queue depth.
+
+Usage:
+  python benchmarks/mock_ollama.py --port 11435 &
+  KAIROS_METRICS=true OLLAMA_URL=http://localhost:11435/api/generate npm run start
+  python benchmarks/load_test.py --rate 5 --duration 60 --output load.json
+  python benchmarks/load_test.py --mix chat=1 --rate 20 --concurrency 64
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+from termcolor import colored
+
+from bench_kairos import percentile, synthetic_text
+
+DEFAULT_MIX = "chat=0.6,memories=0.2,memory_write=0.05,history=0.15"
+SAMPLE_INTERVAL = 1.0
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUESTS:
+            raise ValueError(f"Unknown request type '{name}'")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def chat_request(session, base_url, rng):
+    message = synthetic_text(rng, 4, 25)
+    return session.post(f"{base_url}/api/chat", json={"message": message})
+
+
+def memories_request(session, base_url, rng):
+    return session.get(f"{base_url}/api/memories")
+
+
+def memory_write_request(session, base_url, rng):
+    payload = {
+        "memory_key": f"load_{rng.randint(0, 200)}",
+        "memory_value": synthetic_text(rng, 3, 12),
+        "priority": rng.randint(1, 10),
+    }
+    return session.post(f"{base_url}/api/memories", json=payload)
+
+
+def history_request(session, base_url, rng):
+    return session.get(f"{base_url}/api/chat-history", params={"limit": 50})
+
+
+REQUESTS = {
+    "chat": chat_request,
+    "memories": memories_request,
+    "memory_write": memory_write_request,
+    "history": history_request,
+}
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.base_url = args.url.rstrip("/")
+        self.mix = parse_mix(args.mix)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # (kind, scheduled, started, finished, status or None, error or None)
+        self.records: List[tuple] = []
+        self.samples: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.stop = threading.Event()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _fire(self, kind: str, scheduled: float, seed: int) -> None:
+        with self.lock:
+            self.in_flight += 1
+        started = time.perf_counter()
+        status, error = None, None
+        try:
+            response = REQUESTS[kind](
+                self._session(), self.base_url, random.Random(seed)
+            )
+            status = response.status_code
+            if status >= 400:
+                error = f"HTTP {status}"
+            elif kind == "chat" and response.json().get("response", "").startswith(
+                "⚠️"
+            ):
+                # The API reports LLM failures as a 200 with a warning reply
+                error = "llm error"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        with self.lock:
+            self.in_flight -= 1
+            self.records.append((kind, scheduled, started, finished, status, error))
+
+    def _scrape(self, session: requests.Session) -> Dict[str, Any]:
+        sample: Dict[str, Any] = {}
+        try:
+            text = session.get(f"{self.base_url}/metrics", timeout=2).text
+            for line in text.splitlines():
+                if line.startswith("kairos_queue_depth{"):
+                    queue = line.split('queue="', 1)[1].split('"', 1)[0]
+                    sample[f"queue_{queue}"] = float(line.rsplit(" ", 1)[1])
+                elif line.startswith("kairos_chats_in_flight"):
+                    sample["server_chats_in_flight"] = float(line.rsplit(" ", 1)[1])
+        except (requests.RequestException, IndexError, ValueError):
+            pass
+        if self.args.mock_url:
+            try:
+                stats = session.get(
+                    f"{self.args.mock_url.rstrip('/')}/mock/stats", timeout=2
+                ).json()
+                sample["llm_in_flight"] = stats.get("in_flight")
+            except (requests.RequestException, ValueError):
+                pass
+        return sample
+
+    def _monitor(self, started: float) -> None:
+        session = requests.Session()
+        while not self.stop.wait(SAMPLE_INTERVAL):
+            sample = {"t": round(time.perf_counter() - started, 2)}
+            with self.lock:
+                sample["client_in_flight"] = self.in_flight
+            sample.update(self._scrape(session))
+            self.samples.append(sample)
+
+    def run(self) -> None:
+        args = self.args
+        kinds = list(self.mix)
+        weights = [self.mix[k] for k in kinds]
+        pool = ThreadPoolExecutor(max_workers=args.concurrency)
+        started = time.perf_counter()
+        monitor = threading.Thread(target=self._monitor, args=(started,), daemon=True)
+        monitor.start()
+
+        next_at = started
+        deadline = started + args.duration
+        try:
+            while next_at < deadline:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind = self.rng.choices(kinds, weights)[0]
+                pool.submit(self._fire, kind, next_at, self.rng.randrange(2**32))
+                if args.arrival == "poisson":
+                    next_at += self.rng.expovariate(args.rate)
+                else:
+                    next_at += 1 / args.rate
+        except KeyboardInterrupt:
+            print(
+                colored("\n⏹️ Interrupted, waiting for in-flight requests...", "yellow")
+            )
+        pool.shutdown(wait=True)
+        self.elapsed = time.perf_counter() - started
+        self.stop.set()
+        monitor.join()
+        self.started = started
+
+    def _stats(self, records: List[tuple]) -> Dict[str, Any]:
+        latencies = sorted(r[3] - r[1] for r in records)
+        service = sorted(r[3] - r[2] for r in records)
+        errors = sum(1 for r in records if r[5])
+        return {
+            "requests": len(records),
+            "errors": errors,
+            "error_rate": round(errors / len(records), 4) if records else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "service_p50_ms": round(percentile(service, 50) * 1000, 2),
+            "service_p95_ms": round(percentile(service, 95) * 1000, 2),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        records = sorted(self.records, key=lambda r: r[3])
+        summary = self._stats(records)
+        summary["throughput_rps"] = (
+            round(len(records) / self.elapsed, 2) if self.elapsed else 0.0
+        )
+        by_kind = {
+            kind: self._stats([r for r in records if r[0] == kind])
+            for kind in self.mix
+            if any(r[0] == kind for r in records)
+        }
+        errors: Dict[str, int] = {}
+        for r in records:
+            if r[5]:
+                errors[r[5]] = errors.get(r[5], 0) + 1
+
+        # Per-second buckets of completed requests, joined with the samples
+        timeline = []
+        seconds = int(self.elapsed) + 1
+        for second in range(seconds):
+            window = [r for r in records if second <= r[3] - self.started < second + 1]
+            latencies = sorted(r[3] - r[1] for r in window)
+            point = {
+                "t": second,
+                "completed": len(window),
+                "errors": sum(1 for r in window if r[5]),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            }
+            sample = next(
+                (s for s in self.samples if second < s["t"] <= second + 1), None
+            )
+            if sample:
+                point.update({k: v for k, v in sample.items() if k != "t"})
+            timeline.append(point)
+
+        return {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "url": self.base_url,
+                "rate": self.args.rate,
+                "duration": self.args.duration,
+                "concurrency": self.args.concurrency,
+                "arrival": self.args.arrival,
+                "mix": self.mix,
+                "seed": self.args.seed,
+            },
+            "summary": summary,
+            "by_request": by_kind,
+            "errors": errors,
+            "timeline": timeline,
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    summary = report["summary"]
+    print(colored("\n📊 Load test results", "yellow"))
+    print(
+        colored(
+            f"   {summary['requests']} requests, {summary['throughput_rps']} req/s, "
+            f"{summary['error_rate']:.1%} errors",
+            "cyan",
+        )
+    )
+    for kind, stats in [("all", summary)] + list(report["by_request"].items()):
+        print(
+            colored(
+                f"   {kind:<14} p50 {stats['p50_ms']:>9.1f} ms  "
+                f"p95 {stats['p95_ms']:>9.1f} ms  p99 {stats['p99_ms']:>9.1f} ms  "
+                f"errors {stats['errors']}",
+                "cyan",
+            )
+        )
+    for error, count in report["errors"].items():
+        print(colored(f"   ❌ {error}: {count}", "red"))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kairos API load generator")
+    parser.add_argument(
+        "--url", default=f"http://localhost:{os.environ.get('TEST_PORT', 8000)}"
+    )
+    parser.add_argument(
+        "--mock-url", help="mock Ollama base URL, to sample its in-flight count"
+    )
+    parser.add_argument("--rate", type=float, default=5, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="max requests in flight"
+    )
+    parser.add_argument("--arrival", choices=("constant", "poisson"), default="poisson")
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"weighted request mix (default {DEFAULT_MIX})",
+    )
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write JSON results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        print(colored(f"❌ {e}", "red"))
+        print(colored(f"Available: {', '.join(REQUESTS)}", "yellow"))
+        return 2
+    if args.rate <= 0:
+        print(colored("❌ --rate must be positive", "red"))
+        return 2
+
+    try:
+        requests.get(f"{args.url.rstrip('/')}/health", timeout=5)
+    except requests.RequestException:
+        print(colored(f"❌ No server at {args.url}", "red"))
+        print(colored("Start it with: npm run start", "yellow"))
+        return 1
+
+    print(
+        colored(
+            f"🚀 {args.rate:g} req/s for {args.duration:g}s against {args.url}", "cyan"
+        )
+    )
+    test = LoadTest(args)
+    test.run()
+    report = test.report()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(colored(f"\n💾 Results written to {args.output}", "green"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Ollama API, for deterministic load and latency tests.
+
+Implements /api/generate and /api/chat (streaming NDJSON and non-streaming),
+/api/tags, and /mock/stats (requests served and in flight). Replies are drawn
+from a fixed vocabulary seeded by the prompt, so the same request always gets
+the same answer. Timing follows a simple model of a real server: a prefill
+delay before the first token, then a fixed token rate, and the usual Ollama
+duration fields are reported in nanoseconds.
+
+Usage:
+  python benchmarks/mock_ollama.py --port 11435 --prefill-ms 300 --tokens-per-sec 40
+  OLLAMA_URL=http://localhost:11435/api/generate npm run start
+
+Options such as --error-rate (HTTP error replies) and --disconnect-rate
+(connection dropped without a reply) exercise the client error paths.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+VOCABULARY = (
+    "the moon is a quiet teacher and your rhythm matters more than any plan "
+    "take a breath stretch drink some water and start with the smallest step "
+    "creative energy comes in waves so rest is part of the work not a break "
+    "from it you have done harder things than this and i am right here"
+).split()
+
+
+class MockConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.model = args.model
+        self.prefill = args.prefill_ms / 1000
+        self.prefill_per_token = args.prefill_ms_per_token / 1000
+        self.tokens_per_sec = args.tokens_per_sec
+        self.response_tokens = args.response_tokens
+        self.jitter = args.jitter
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.disconnect_rate = args.disconnect_rate
+        self.echo_context = args.echo_context
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.stats_lock = threading.Lock()
+
+    def roll(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+
+def tokenize(text: str) -> List[str]:
+    return text.split()
+
+
+def token_ids(tokens: List[str]) -> List[int]:
+    """Stable fake token ids, so echoed context is reproducible."""
+    return [
+        int.from_bytes(hashlib.blake2b(t.encode(), digest_size=2).digest(), "little")
+        for t in tokens
+    ]
+
+
+def reply_tokens(prompt: str, count: int) -> List[str]:
+    seed = int.from_bytes(
+        hashlib.blake2b(prompt.encode(), digest_size=8).digest(), "little"
+    )
+    rng = random.Random(seed)
+    return [rng.choice(VOCABULARY) for _ in range(count)]
+
+
+def chat_prompt(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages
+    )
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---------------------------------------------------------------- helpers
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _sleep(self, seconds: float) -> None:
+        jitter = self.config.jitter
+        if jitter:
+            seconds *= 1 + (self.config.roll() * 2 - 1) * jitter
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _inject_failure(self) -> bool:
+        """Apply error injection. Returns True if the request was failed."""
+        if (
+            self.config.disconnect_rate
+            and self.config.roll() < self.config.disconnect_rate
+        ):
+            self.close_connection = True
+            self.connection.close()
+            return True
+        if self.config.error_rate and self.config.roll() < self.config.error_rate:
+            self._send_json({"error": "injected failure"}, self.config.error_status)
+            return True
+        return False
+
+    # --------------------------------------------------------------- handlers
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(
+                {"models": [{"name": self.config.model, "model": self.config.model}]}
+            )
+        elif self.path == "/mock/stats":
+            with self.config.stats_lock:
+                stats = {
+                    "requests": self.config.requests,
+                    "in_flight": self.config.in_flight,
+                }
+            self._send_json(stats)
+        elif self.path == "/":
+            self._send_json({"status": "Mock Ollama is running"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": "not found"}, 404)
+            return
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, 400)
+            return
+
+        with self.config.stats_lock:
+            self.config.requests += 1
+            self.config.in_flight += 1
+        try:
+            if self._inject_failure():
+                return
+            if self.path == "/api/chat":
+                prompt = chat_prompt(body.get("messages", []))
+            else:
+                prompt = body.get("prompt", "")
+            self._generate(body, prompt, chat=self.path == "/api/chat")
+        finally:
+            with self.config.stats_lock:
+                self.config.in_flight -= 1
+
+    def _generate(self, body: Dict[str, Any], prompt: str, chat: bool) -> None:
+        config = self.config
+        started = time.perf_counter_ns()
+        prompt_tokens = tokenize(prompt)
+        options = body.get("options") or {}
+        count = int(options.get("num_predict", config.response_tokens))
+        tokens = reply_tokens(prompt, max(count, 0))
+
+        # Prefill: a fixed cost plus a per-prompt-token cost
+        self._sleep(config.prefill + config.prefill_per_token * len(prompt_tokens))
+        prompt_eval_ns = time.perf_counter_ns() - started
+        per_token = 1 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+
+        def piece(i: int) -> str:
+            return (" " if i else "") + tokens[i]
+
+        def message(text: str) -> Dict[str, Any]:
+            if chat:
+                return {"message": {"role": "assistant", "content": text}}
+            return {"response": text}
+
+        def final(eval_ns: int) -> Dict[str, Any]:
+            done = {
+                "model": body.get("model", config.model),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": time.perf_counter_ns() - started,
+                "load_duration": 0,
+                "prompt_eval_count": len(prompt_tokens),
+                "prompt_eval_duration": prompt_eval_ns,
+                "eval_count": len(tokens),
+                "eval_duration": eval_ns,
+            }
+            if config.echo_context and not chat:
+                # Real Ollama returns the tokenized conversation as `context`
+                done["context"] = token_ids(prompt_tokens + tokens)
+            return done
+
+        if body.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            eval_started = time.perf_counter_ns()
+            for i in range(len(tokens)):
+                if i:
+                    self._sleep(per_token)
+                chunk = {
+                    "model": body.get("model", config.model),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "done": False,
+                }
+                chunk.update(message(piece(i)))
+                self._write_chunk(chunk)
+            last = final(time.perf_counter_ns() - eval_started)
+            last.update(message(""))
+            self._write_chunk(last)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        else:
+            eval_started = time.perf_counter_ns()
+            self._sleep(per_token * max(len(tokens) - 1, 0))
+            payload = final(time.perf_counter_ns() - eval_started)
+            payload.update(message("".join(piece(i) for i in range(len(tokens)))))
+            self._send_json(payload)
+
+
+def make_server(config: MockConfig, host: str, port: int) -> ThreadingHTTPServer:
+    handler = type("Handler", (MockOllamaHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mock Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument(
+        "--prefill-ms", type=float, default=200, help="delay before the first token"
+    )
+    parser.add_argument(
+        "--prefill-ms-per-token",
+        type=float,
+        default=0.0,
+        help="extra prefill delay per prompt token",
+    )
+    parser.add_argument(
+        "--tokens-per-sec",
+        type=float,
+        default=30,
+        help="generation speed (0 = instant)",
+    )
+    parser.add_argument("--response-tokens", type=int, default=60)
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="random +/- fraction on every delay"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of requests failed"
+    )
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument(
+        "--disconnect-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests whose connection is dropped",
+    )
+    parser.add_argument(
+        "--echo-context",
+        action="store_true",
+        help="return prompt+reply token ids as `context` from /api/generate",
+    )
+    parser.add_argument("--seed", type=int, default=1234)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    server = make_server(MockConfig(args), args.host, args.port)
+    print(
+        f"🦙 Mock Ollama on http://{args.host}:{args.port} "
+        f"(prefill {args.prefill_ms:.0f} ms, {args.tokens_per_sec:g} tokens/s)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
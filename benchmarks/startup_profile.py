@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Cold-start profiler for the Kairos entry points.
+
+Starts a fresh interpreter with `-X importtime`, imports the target and runs its
+initialisation against a throwaway database, then reports:
+  - total import + init time
+  - per-phase init timings (db_init, prompt_load, history_load, memory_load,
+    model_load) from utils/startup.py
+  - the most expensive imports, by cumulative and self time
+
+Usage:
+  python benchmarks/startup_profile.py                  # api_server
+  python benchmarks/startup_profile.py --target cli --with-model
+  python benchmarks/startup_profile.py --budget 2.0 --output startup.json
+
+With --budget the run exits with status 1 when cold start takes longer.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+from termcolor import colored
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PYTHON_SRC = os.path.join(ROOT, "src", "python")
+
+TARGETS = {
+    # Importing api_server builds the Flask app and its KairosAI
+    "api": "import api_server",
+    "asgi": "import asgi_server",
+    "cli": "import kairos_ai; kairos_ai.KairosAI()",
+}
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+{target}
+{model}
+elapsed = time.perf_counter() - started
+from utils import startup
+heavy = [m for m in ("torch", "sentence_transformers") if m in sys.modules]
+print("STARTUP_REPORT " + json.dumps(
+    {{"seconds": elapsed, "phases": startup.report(), "heavy_modules": heavy}}
+))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        except ValueError:
+            continue
+        imports.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return imports
+
+
+def profile_startup(target: str, with_model: bool, env_overrides: Dict) -> Dict:
+    code = CHILD.format(
+        target=TARGETS[target],
+        model="import kairos_ai; kairos_ai.get_embedding_model()" if with_model else "",
+    )
+    with tempfile.TemporaryDirectory(prefix="kairos-startup-") as tmp:
+        env = dict(os.environ)
+        env.update(env_overrides)
+        env["PYTHONPATH"] = PYTHON_SRC
+        env.setdefault("KAIROS_DB_PATH", os.path.join(tmp, "kairos.db"))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=tmp,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    report_line = next(
+        (
+            line
+            for line in proc.stdout.splitlines()
+            if line.startswith("STARTUP_REPORT ")
+        ),
+        None,
+    )
+    if proc.returncode != 0 or report_line is None:
+        tail = "\n".join(proc.stderr.splitlines()[-10:])
+        raise RuntimeError(f"{target} failed to start:\n{tail}")
+
+    report = json.loads(report_line[len("STARTUP_REPORT ") :])
+    report["target"] = target
+    report["imports"] = parse_importtime(proc.stderr)
+    return report
+
+
+def print_report(report: Dict, top: int) -> None:
+    print(
+        colored(f"🚀 {report['target']} cold start: {report['seconds']:.3f}s", "yellow")
+    )
+    if report["heavy_modules"]:
+        print(colored(f"   heavy modules loaded: {report['heavy_modules']}", "cyan"))
+    print(colored("\n⏱️ Init phases:", "yellow"))
+    for name, seconds in report["phases"].items():
+        print(colored(f"   {name:<16} {seconds * 1000:>9.1f} ms", "cyan"))
+
+    imports = report["imports"]
+    print(colored(f"\n📦 Top {top} imports by cumulative time:", "yellow"))
+    for imp in sorted(imports, key=lambda i: i["cumulative_us"], reverse=True)[:top]:
+        print(
+            colored(
+                f"   {imp['module']:<40} {imp['cumulative_us'] / 1000:>9.1f} ms", "cyan"
+            )
+        )
+    print(colored(f"\n📦 Top {top} imports by self time:", "yellow"))
+    for imp in sorted(imports, key=lambda i: i["self_us"], reverse=True)[:top]:
+        print(
+            colored(f"   {imp['module']:<40} {imp['self_us'] / 1000:>9.1f} ms", "cyan")
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Kairos cold-start profiler")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="api")
+    parser.add_argument(
+        "--with-model", action="store_true", help="also load the embedding model"
+    )
+    parser.add_argument(
+        "--embedding-backend",
+        help="override KAIROS_EMBEDDING_BACKEND (e.g. hash) in the child",
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, help="fail above this many seconds")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    if args.embedding_backend:
+        overrides["KAIROS_EMBEDDING_BACKEND"] = args.embedding_backend
+    try:
+        report = profile_startup(args.target, args.with_model, overrides)
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", "red"))
+        return 1
+
+    print_report(report, args.top)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(colored(f"\n💾 Report written to {args.output}", "green"))
+    if args.budget is not None and report["seconds"] > args.budget:
+        print(
+            colored(
+                f"\n❌ Cold start {report['seconds']:.3f}s is over the "
+                f"{args.budget:.3f}s budget",
+                "red",
+            )
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,213 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import os
+import time
+from functools import partial
 from database.operations import (
-    init_db,
     add_chat_message,
     get_chat_history,
     get_recent_chat_history,
+    get_chat_history_page,
     add_memory,
+    add_memories,
     get_all_memories,
+    MEMORY_COLUMNS,
     delete_memory_by_key,
+    delete_memories_by_keys,
     get_database_stats,
     clear_chat_history,
     delete_chat_msg_by_id,
+    get_table_versions,
+)
+from chat_jobs import ChatJobs, JobQueueFull, JOB_TIMEOUT
+from kairos_ai import (
+    KairosAI,
+    DEBUG_MODE,
+    OLLAMA_TIMEOUT,
+    TURN_THREAD_PREFIX,
+    embed_texts,
+)
+from embeddings import EMBEDDING_DIM
+from utils import metrics, profiling, timing
+from utils.metrics import CHATS_IN_FLIGHT, HTTP_REQUESTS, HTTP_SECONDS
+from utils.footprint import footprint
+from utils.http_cache import ResponseCache, choose_encoding
+from users import MULTI_USER, USER_HEADER, QuotaExceeded, UserRegistry
+from utils.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    IdempotencyConflict,
+    IdempotencyStore,
+    fingerprint,
 )
-from kairos_ai import KairosAI
 
 # Set up paths
 BASE_PATH = os.path.abspath(os.path.dirname(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_PATH))
-DB_PATH = os.path.join(PROJECT_ROOT, "data", "kairos.db")
+DB_PATH = os.getenv("KAIROS_DB_PATH", os.path.join(PROJECT_ROOT, "data", "kairos.db"))
 SCHEMA_PATH = os.path.join(BASE_PATH, "database", "schema.sql")
+CHAT_HISTORY_PAGE_SIZE = 50
+MAX_CHAT_HISTORY_PAGE_SIZE = 500
+# Embeddings are large and unused by the UI; request them with ?fields=...,embedding
+DEFAULT_MEMORY_FIELDS = tuple(c for c in MEMORY_COLUMNS if c != "embedding")
+MAX_MEMORY_BATCH = 500
+MAX_JOB_WAIT = 30
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize database and Kairos AI
-init_db(DB_PATH, SCHEMA_PATH)
-kairos = KairosAI()
+# Initialize Kairos AI (which also initializes the database)
+kairos = KairosAI(DB_PATH)
+
+# Other users' state, when X-Kairos-User is honoured (see users.py)
+users = UserRegistry()
+footprint.add_cache("user_states", users.nbytes, users.clear)
+
+# Serialized read responses, reused until the tables they read change
+response_cache = ResponseCache()
+footprint.add_cache("response_cache", response_cache.nbytes, response_cache.clear)
+
+
+@app.before_request
+def start_request_timer():
+    if metrics.is_enabled():
+        g.request_started = time.perf_counter()
+
+
+@app.before_request
+def select_user():
+    """Serve the request from the named user's state, in multi-user mode."""
+    g.user_id = None
+    user_id = request.headers.get(USER_HEADER) if MULTI_USER else None
+    if user_id is None:
+        return None
+    try:
+        g.kairos = users.get(user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to load user: {str(e)}"}), 500
+    g.user_id = user_id
+    return None
+
+
+def user_kairos():
+    """The KairosAI serving this request's user."""
+    return g.get("kairos", kairos)
+
+
+def user_db_path():
+    """The database of this request's user."""
+    return user_kairos().db_path
+
+
+def quota_error(messages=0, memories=0):
+    """403 response when the write would take the user past a quota, else None."""
+    if g.get("user_id") is None:
+        return None
+    try:
+        users.check_quota(g.user_id, messages=messages, memories=memories)
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 403
+    return None
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is not None:
+        # Label by route pattern, not raw path, to keep series bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started, route=route, method=request.method
+        )
+        HTTP_REQUESTS.inc(route=route, status=str(response.status_code))
+    return response
+
+
+def timed_response(payload, timings):
+    """JSON response carrying a Server-Timing header (and `timings` in debug)."""
+    if DEBUG_MODE:
+        payload["timings"] = timings.to_dict()
+    response = jsonify(payload)
+    response.headers["Server-Timing"] = timings.server_timing()
+    # Let the cross-origin front end read the header via the Resource Timing API
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+
+def save_chat_turn_message(state, role: str, content: str) -> None:
+    with timing.stage("db_write"):
+        add_chat_message(role, content, db_path=state.db_path)
+    if role == "user":
+        # Sync with writes from other processes/routes so the prompt shows it
+        state.refresh_from_db()
+
+
+def run_chat_turn(
+    message: str,
+    include_memories: bool = False,
+    timeout: float = OLLAMA_TIMEOUT,
+    user_id=None,
+) -> str:
+    """Store the user message, generate a reply and store that too.
+
+    The write and the prompt prefix run concurrently (see KairosAI.run_turn).
+    """
+    state = kairos if user_id is None else users.get(user_id)
+    if include_memories:
+        # Pick up memories written elsewhere before the prefix lists them
+        state.refresh_from_db()
+    turn = state.run_turn(
+        message,
+        include_memories=include_memories,
+        timeout=timeout,
+        save_message=partial(save_chat_turn_message, state),
+    )
+    return turn["response"]
+
+
+def run_chat_job(message: str, include_memories: bool, user_id=None) -> str:
+    CHATS_IN_FLIGHT.inc()
+    try:
+        return run_chat_turn(
+            message, include_memories, timeout=JOB_TIMEOUT, user_id=user_id
+        )
+    finally:
+        CHATS_IN_FLIGHT.dec()
+        footprint.enforce_budgets()
+
+
+chat_jobs = ChatJobs(run_chat_job, db_path=DB_PATH, user_db_path=users.db_path)
+
+# Retries that resend an Idempotency-Key share one generation / one job
+chat_idempotency = IdempotencyStore("/api/chat")
+job_idempotency = IdempotencyStore("/api/chat/jobs")
+
+
+def claim_idempotency_key(store, payload):
+    """Claim the request's Idempotency-Key in `store`.
+
+    Returns (key, future, owner, error_response). Without a key, key is None
+    and the request runs normally. A non-owner should wait on `future`.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None, None, True, None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        error = jsonify(
+            {"error": f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"}
+        )
+        return key, None, False, (error, 400)
+    if g.get("user_id") is not None:
+        # Users pick their keys independently, so keep them apart
+        key = f"{g.user_id}:{key}"
+    try:
+        future, owner = store.begin(key, fingerprint(payload))
+    except IdempotencyConflict as e:
+        return key, None, False, (jsonify({"error": str(e)}), 422)
+    return key, future, owner, None
 
 
 @app.route("/api/chat", methods=["POST"])
@@ -38,26 +219,178 @@ def chat():
     if not message:
         return jsonify({"error": "Message is required"}), 400
 
-    try:
-        # Add user message to history
-        add_chat_message("user", message, db_path=DB_PATH)
+    # Only trust the profiling header from the machine we run on
+    profile_requested = profiling.header_requests_profile(
+        request.headers.get(profiling.PROFILE_HEADER), request.remote_addr
+    )
 
-        # Generate Kairos response
-        response = kairos.generate_response(message, include_memories=include_memories)
+    error = quota_error(messages=2)
+    if error:
+        return error
 
-        # Add Kairos response to history
-        add_chat_message("assistant", response, db_path=DB_PATH)
+    key, future, owner, error = claim_idempotency_key(
+        chat_idempotency, {"message": message, "include_memories": include_memories}
+    )
+    if error:
+        return error
+    if not owner:
+        # A duplicate: share the original generation instead of starting another
+        try:
+            result = jsonify({"response": future.result()})
+        except Exception as e:
+            return jsonify({"error": f"Failed to generate response: {str(e)}"}), 500
+        result.headers[REPLAYED_HEADER] = "true"
+        return result
 
-        return jsonify({"response": response})
+    CHATS_IN_FLIGHT.inc()
+    timings = timing.start_request()
+    try:
+        # Other requests' threads would muddle the profile; take only this
+        # request's thread and the stage graph's workers
+        with profiling.profile_turn(
+            "api-chat", profile_requested, thread_prefix=TURN_THREAD_PREFIX
+        ) as profile:
+            response = run_chat_turn(message, include_memories, user_id=g.user_id)
+        if key:
+            chat_idempotency.finish(key, response)
+
+        result = timed_response({"response": response}, timings)
+        if profile_requested and profile and profile["path"]:
+            result.headers[profiling.PROFILE_HEADER] = os.path.basename(profile["path"])
+        return result
     except Exception as e:
+        if key:
+            chat_idempotency.fail(key, e)
         return jsonify({"error": f"Failed to generate response: {str(e)}"}), 500
+    finally:
+        CHATS_IN_FLIGHT.dec()
+        footprint.enforce_budgets()
+
+
+def job_payload(job):
+    """Public view of a chat job (the message itself is not echoed back)."""
+    return {k: v for k, v in job.items() if k != "message"}
+
+
+@app.route("/api/chat/jobs", methods=["POST"])
+def create_chat_job():
+    data = request.get_json(silent=True) or {}
+    message = data.get("message")
+    include_memories = data.get("include_memories", False)
+
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+
+    error = quota_error(messages=2)
+    if error:
+        return error
+
+    key, future, owner, error = claim_idempotency_key(
+        job_idempotency, {"message": message, "include_memories": include_memories}
+    )
+    if error:
+        return error
+    try:
+        if owner:
+            job_id = chat_jobs.submit(message, include_memories, user_id=g.user_id)
+            if key:
+                job_idempotency.finish(key, job_id)
+        else:
+            job_id = future.result()
+    except JobQueueFull as e:
+        if key and owner:
+            job_idempotency.fail(key, e)
+        response = jsonify({"error": f"Too many chat jobs: {e}"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    except Exception as e:
+        if key and owner:
+            job_idempotency.fail(key, e)
+        return jsonify({"error": f"Failed to queue chat job: {str(e)}"}), 500
+
+    status = "queued"
+    if not owner:
+        job = chat_jobs.get(job_id, user_id=g.user_id)
+        status = job["status"] if job else "expired"
+    response = jsonify({"job_id": job_id, "status": status})
+    response.headers["Location"] = f"/api/chat/jobs/{job_id}"
+    if not owner:
+        response.headers[REPLAYED_HEADER] = "true"
+    return response, 202
+
+
+@app.route("/api/chat/jobs/<job_id>", methods=["GET"])
+def chat_job(job_id):
+    # ?wait=N long-polls: answer as soon as the job finishes, or after N seconds
+    wait = min(max(request.args.get("wait", 0, type=float), 0), MAX_JOB_WAIT)
+    job = chat_jobs.get(job_id, wait=wait, user_id=g.user_id)
+    if job is None:
+        return jsonify({"error": f"Chat job {job_id} not found"}), 404
+    return jsonify(job_payload(job))
+
+
+def cached_json(name, tables, build):
+    """JSON response for `build()`, cached per query string and table versions.
+
+    Sends a strong ETag derived from the versions, answers a matching
+    If-None-Match with 304, and compresses large bodies when the client
+    accepts it.
+    """
+    versions = get_table_versions(db_path=user_db_path())
+    if not all(t in versions for t in tables):
+        # Without versions there is nothing safe to tag or cache on
+        return jsonify(build())
+    if g.user_id is not None:
+        name = f"{name}@{g.user_id}"
+    entry = response_cache.get(
+        name,
+        request.query_string.decode("latin-1"),
+        [versions[t] for t in tables],
+        build,
+    )
+    body, encoding = entry.encoded(
+        choose_encoding(request.headers.get("Accept-Encoding", ""))
+    )
+
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if any(
+        request.if_none_match.contains_weak(entry.etag_for(e)) for e in (None, encoding)
+    ):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(body, mimetype="application/json", headers=headers)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(entry.etag_for(encoding))
+    return response
 
 
 @app.route("/api/memories", methods=["GET", "POST"])
 def memories():
     if request.method == "GET":
-        memories = get_all_memories(db_path=DB_PATH)
-        return jsonify({"memories": memories})
+        fields = request.args.get("fields")
+        if fields:
+            columns = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [c for c in columns if c not in MEMORY_COLUMNS]
+            if unknown or not columns:
+                return (
+                    jsonify(
+                        {
+                            "error": f"Unknown fields: {', '.join(unknown)}",
+                            "available": list(MEMORY_COLUMNS),
+                        }
+                    ),
+                    400,
+                )
+        else:
+            columns = DEFAULT_MEMORY_FIELDS
+        return cached_json(
+            "memories",
+            ("spellbook_memories",),
+            lambda: {
+                "memories": get_all_memories(db_path=user_db_path(), columns=columns)
+            },
+        )
     elif request.method == "POST":
         data = request.json
         memory_key = data.get("memory_key")
@@ -66,35 +399,136 @@ def memories():
 
         if not memory_key or not memory_value:
             return jsonify({"error": "Memory key and value are required"}), 400
+        error = quota_error(memories=1)
+        if error:
+            return error
 
         try:
-            add_memory(memory_key, memory_value, priority, db_path=DB_PATH)
+            add_memory(memory_key, memory_value, priority, db_path=user_db_path())
             return jsonify({"message": "Memory added successfully"})
         except Exception as e:
             return jsonify({"error": f"Failed to add memory: {str(e)}"}), 500
 
 
+@app.route("/api/memories/batch", methods=["POST", "DELETE"])
+def memories_batch():
+    data = request.get_json(silent=True) or {}
+    field = "memories" if request.method == "POST" else "memory_keys"
+    items = data.get(field)
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": f"'{field}' must be a non-empty list"}), 400
+    if len(items) > MAX_MEMORY_BATCH:
+        return (
+            jsonify({"error": f"At most {MAX_MEMORY_BATCH} items per batch"}),
+            400,
+        )
+
+    if request.method == "DELETE":
+        results = delete_memories_by_keys(items, db_path=user_db_path())
+        if results is None:
+            return jsonify({"error": "Failed to delete memories"}), 500
+        return jsonify(
+            {
+                "results": results,
+                "deleted": sum(1 for r in results if r["deleted"]),
+                "not_found": sum(1 for r in results if not r["deleted"]),
+            }
+        )
+
+    error = quota_error(memories=len(items))
+    if error:
+        return error
+
+    # Embed every item that arrived without one in a single batch
+    missing = [
+        item
+        for item in items
+        if isinstance(item, dict)
+        and item.get("embedding") is None
+        and isinstance(item.get("memory_value"), str)
+        and item["memory_value"].strip()
+    ]
+    if missing:
+        try:
+            embeddings = embed_texts([item["memory_value"] for item in missing])
+            for item, embedding in zip(missing, embeddings):
+                item["embedding"] = embedding
+        except Exception as e:
+            # Stored without embeddings; retrieval embeds them lazily
+            print(f"Batch embedding failed, saving without embeddings: {e}")
+
+    # A malformed client embedding would break the embedding matrix for every memory
+    results = add_memories(items, db_path=user_db_path(), embedding_dim=EMBEDDING_DIM)
+    if results is None:
+        return jsonify({"error": "Failed to add memories"}), 500
+    failed = sum(1 for r in results if "error" in r)
+    return jsonify(
+        {"results": results, "saved": len(results) - failed, "failed": failed}
+    )
+
+
 @app.route("/api/stats", methods=["GET"])
 def stats():
     try:
-        stats = get_database_stats(db_path=DB_PATH)
-        return jsonify({"stats": stats})
+        return cached_json(
+            "stats",
+            ("chat_history", "spellbook_memories"),
+            lambda: {"stats": get_database_stats(db_path=user_db_path())},
+        )
     except Exception as e:
         return jsonify({"error": f"Failed to get database stats: {str(e)}"}), 500
 
 
+def build_chat_history(limit, before_id, after_id):
+    if limit is None and before_id is None and after_id is None:
+        history = get_chat_history(db_path=user_db_path())
+        return {"history": history, "next_cursor": None, "has_more": False}
+
+    page_size = min(limit or CHAT_HISTORY_PAGE_SIZE, MAX_CHAT_HISTORY_PAGE_SIZE)
+    # Fetch one extra row to know whether another page exists
+    rows = get_chat_history_page(
+        page_size + 1, before_id=before_id, after_id=after_id, db_path=user_db_path()
+    )
+    has_more = len(rows) > page_size
+    history = rows[:page_size]
+
+    if after_id is not None:
+        # Forward cursor is always usable, so pollers can keep passing it back
+        next_cursor = history[-1]["id"] if history else after_id
+    else:
+        next_cursor = history[-1]["id"] if has_more else None
+    return {"history": history, "next_cursor": next_cursor, "has_more": has_more}
+
+
 @app.route("/api/chat-history", methods=["GET", "DELETE"])
 def chat_history():
     if request.method == "GET":
         try:
             limit = request.args.get("limit", type=int)
-            history = get_chat_history(limit=limit, db_path=DB_PATH)
-            return jsonify({"history": history})
+            before_id = request.args.get("before_id", type=int)
+            # `since` is the polling alias for after_id: only messages newer than it
+            after_id = request.args.get("since", type=int)
+            if after_id is None:
+                after_id = request.args.get("after_id", type=int)
+
+            if limit is not None and limit <= 0:
+                return jsonify({"error": "limit must be positive"}), 400
+            if before_id is not None and after_id is not None:
+                return (
+                    jsonify({"error": "Use either before_id or after_id, not both"}),
+                    400,
+                )
+
+            return cached_json(
+                "chat-history",
+                ("chat_history",),
+                lambda: build_chat_history(limit, before_id, after_id),
+            )
         except Exception as e:
             return jsonify({"error": f"Failed to get chat history: {str(e)}"}), 500
     elif request.method == "DELETE":
         try:
-            clear_chat_history(db_path=DB_PATH)
+            clear_chat_history(db_path=user_db_path())
             return jsonify({"message": "Chat history cleared successfully"})
         except Exception as e:
             return jsonify({"error": f"Failed to clear chat history: {str(e)}"}), 500
@@ -103,7 +537,7 @@ def chat_history():
 @app.route("/api/chat-history/<int:msg_id>", methods=["DELETE"])
 def delete_chat_message(msg_id):
     try:
-        success = delete_chat_msg_by_id(msg_id, db_path=DB_PATH)
+        success = delete_chat_msg_by_id(msg_id, db_path=user_db_path())
         if success:
             return jsonify({"message": f"Chat message {msg_id} deleted successfully"})
         else:
@@ -115,7 +549,7 @@ def delete_chat_message(msg_id):
 @app.route("/api/memories/<memory_key>", methods=["DELETE"])
 def delete_memory(memory_key):
     try:
-        success = delete_memory_by_key(memory_key, db_path=DB_PATH)
+        success = delete_memory_by_key(memory_key, db_path=user_db_path())
         if success:
             return jsonify({"message": f'Memory "{memory_key}" deleted successfully'})
         else:
@@ -124,6 +558,14 @@ def delete_memory(memory_key):
         return jsonify({"error": f"Failed to delete memory: {str(e)}"}), 500
 
 
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of the in-process metrics."""
+    if not metrics.is_enabled():
+        return jsonify({"error": "Metrics are disabled. Set KAIROS_METRICS=true"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/health")
 def health():
     """Health check endpoint for testing."""
@@ -0,0 +1,558 @@
+"""
+Asyncio (ASGI) entry point for the Kairos API.
+
+POST /api/chat is served natively: the Ollama round-trip is awaited with the
+async client, so a waiting chat costs a coroutine rather than a thread. Chat job
+long-polls (GET /api/chat/jobs/<id>?wait=N) also wait on the loop, and the
+WebSocket channel (/ws/chat) streams tokens over one persistent session. SQLite
+and prompt/embedding work run in small bounded executors. Every other route is
+handed to the existing Flask app through a WSGI bridge on the database
+executor, so both servers expose the same API; so are requests for a named user
+(X-Kairos-User, see users.py), while /ws/chat serves the default user.
+
+Run with: python src/python/asgi_server.py  (requires `pip install uvicorn`;
+WebSockets also need `pip install websockets`)
+"""
+import asyncio
+import contextvars
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from termcolor import colored
+
+from api_server import (
+    app as flask_app,
+    kairos,
+    chat_jobs,
+    chat_idempotency,
+    job_payload,
+    DB_PATH,
+    MAX_JOB_WAIT,
+)
+from chat_jobs import FINISHED, POLL_INTERVAL
+from chat_session import ChatSession, SessionRegistry
+from database.operations import add_chat_message
+from kairos_ai import DEBUG_MODE
+from users import MULTI_USER, USER_HEADER
+from utils import profiling, timing
+from utils.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    IdempotencyConflict,
+    fingerprint,
+)
+from utils.metrics import CHATS_IN_FLIGHT, QUEUE_DEPTH
+from utils.footprint import footprint
+
+DB_WORKERS = int(os.getenv("KAIROS_DB_WORKERS", "4"))
+EMBED_WORKERS = int(os.getenv("KAIROS_EMBED_WORKERS", "2"))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="kairos-db")
+embed_executor = ThreadPoolExecutor(
+    max_workers=EMBED_WORKERS, thread_name_prefix="kairos-embed"
+)
+sessions = SessionRegistry(kairos)
+footprint.add_cache("session_embeddings", sessions.nbytes, sessions.clear_caches)
+# Strong references to running WebSocket turns, which outlive their socket
+socket_turns: Set[asyncio.Future] = set()
+
+# Read at scrape time; the executor keeps its pending items in _work_queue
+QUEUE_DEPTH.set_function(lambda: db_executor._work_queue.qsize(), queue="db")
+QUEUE_DEPTH.set_function(lambda: embed_executor._work_queue.qsize(), queue="embed")
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def run_in(executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Any:
+    """Run blocking work on one of the bounded executors.
+
+    The caller's context is copied so stage timings land on the right request.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(ctx.run, fn, *args, **kwargs))
+
+
+async def read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(
+    send: Send,
+    payload: Any,
+    status: int = 200,
+    extra_headers: List[Tuple[bytes, bytes]] = (),
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"access-control-allow-origin", b"*"),
+                *extra_headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def chat(scope: Scope, receive: Receive, send: Send) -> None:
+    """Async twin of api_server.chat()."""
+    try:
+        data = json.loads(await read_body(receive) or b"{}")
+    except ValueError:
+        await send_json(send, {"error": "Invalid JSON body"}, 400)
+        return
+
+    message = data.get("message")
+    include_memories = data.get("include_memories", False)
+    if not message:
+        await send_json(send, {"error": "Message is required"}, 400)
+        return
+
+    client = scope.get("client") or ("", 0)
+    profile_requested = profiling.header_requests_profile(
+        next(
+            (
+                value.decode("latin-1")
+                for name, value in scope.get("headers", [])
+                if name == profiling.PROFILE_HEADER.lower().encode("latin-1")
+            ),
+            None,
+        ),
+        client[0],
+    )
+
+    key = next(
+        (
+            value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+            if name == IDEMPOTENCY_HEADER.lower().encode("latin-1")
+        ),
+        None,
+    )
+    if key is not None:
+        if not key or len(key) > MAX_KEY_LENGTH:
+            error = f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+            await send_json(send, {"error": error}, 400)
+            return
+        try:
+            future, owner = chat_idempotency.begin(
+                key,
+                fingerprint({"message": message, "include_memories": include_memories}),
+            )
+        except IdempotencyConflict as e:
+            await send_json(send, {"error": str(e)}, 422)
+            return
+        if not owner:
+            # A duplicate: await the original generation instead of starting another
+            try:
+                # Shielded: a disconnecting duplicate must not cancel the
+                # future the owner and other duplicates share
+                response = await asyncio.shield(asyncio.wrap_future(future))
+            except Exception as e:
+                await send_json(
+                    send, {"error": f"Failed to generate response: {str(e)}"}, 500
+                )
+                return
+            replayed = [(REPLAYED_HEADER.lower().encode("latin-1"), b"true")]
+            await send_json(send, {"response": response}, extra_headers=replayed)
+            return
+
+    CHATS_IN_FLIGHT.inc()
+    timings = timing.start_request()
+    try:
+        # The turn hops between the loop and executor threads, so sample them all
+        with profiling.profile_turn(
+            "asgi-chat", profile_requested, all_threads=True
+        ) as profile:
+            with timing.stage("db_write"):
+                await run_in(
+                    db_executor, add_chat_message, "user", message, db_path=DB_PATH
+                )
+            await run_in(db_executor, kairos.refresh_from_db)
+
+            prompt = await run_in(
+                embed_executor, kairos.build_prompt, message, include_memories
+            )
+            response = await kairos.acomplete(prompt)
+
+            with timing.stage("db_write"):
+                await run_in(
+                    db_executor,
+                    add_chat_message,
+                    "assistant",
+                    response,
+                    db_path=DB_PATH,
+                )
+        if key:
+            chat_idempotency.finish(key, response)
+        payload = {"response": response}
+        if DEBUG_MODE:
+            payload["timings"] = timings.to_dict()
+        headers = [
+            (b"server-timing", timings.server_timing().encode("latin-1")),
+            (b"timing-allow-origin", b"*"),
+        ]
+        if profile_requested and profile and profile["path"]:
+            name = os.path.basename(profile["path"])
+            headers.append((b"x-kairos-profile", name.encode("latin-1")))
+        await send_json(send, payload, extra_headers=headers)
+    except asyncio.CancelledError as e:
+        # Client went away: release the key so duplicates are not left waiting
+        if key:
+            chat_idempotency.fail(key, e)
+        raise
+    except Exception as e:
+        if key:
+            chat_idempotency.fail(key, e)
+        await send_json(send, {"error": f"Failed to generate response: {str(e)}"}, 500)
+    finally:
+        CHATS_IN_FLIGHT.dec()
+        footprint.enforce_budgets()
+
+
+async def chat_job(scope: Scope, receive: Receive, send: Send) -> None:
+    """GET /api/chat/jobs/<id>, long-polling without holding an executor thread."""
+    job_id = scope["path"].rsplit("/", 1)[1]
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    try:
+        wait = min(max(float(query.get("wait", ["0"])[0]), 0), MAX_JOB_WAIT)
+    except ValueError:
+        wait = 0.0
+
+    deadline = time.monotonic() + wait
+    job = await run_in(db_executor, chat_jobs.get, job_id)
+    while (
+        job is not None
+        and job["status"] not in FINISHED
+        and time.monotonic() < deadline
+    ):
+        await asyncio.sleep(POLL_INTERVAL)
+        job = await run_in(db_executor, chat_jobs.get, job_id)
+
+    if job is None:
+        await send_json(send, {"error": f"Chat job {job_id} not found"}, 404)
+        return
+    await send_json(send, job_payload(job))
+
+
+def build_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """Translate an ASGI HTTP scope into a WSGI environ for the Flask app."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(environ: Dict[str, Any]) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    response: Dict[str, Any] = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+        return lambda data: None
+
+    result = flask_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], body
+
+
+async def forward_to_flask(scope: Scope, receive: Receive, send: Send) -> None:
+    environ = build_environ(scope, await read_body(receive))
+    status, headers, body = await run_in(db_executor, call_wsgi, environ)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_frame(send: Send, payload: Dict[str, Any]) -> bool:
+    """Send one JSON WebSocket frame. Returns False once the socket is gone."""
+    try:
+        await send({"type": "websocket.send", "text": json.dumps(payload)})
+        return True
+    except (OSError, RuntimeError):
+        return False
+
+
+async def speculate(session: ChatSession) -> None:
+    """Speculative retrieval on the session's latest partial input.
+
+    Runs until it has caught up with the typing frames that arrived meanwhile,
+    so at most one speculation per session is in flight.
+    """
+    text = None
+    while session.typed != text:
+        text = session.typed
+        await run_in(embed_executor, session.speculate, text)
+
+
+async def session_retrieve(
+    session: ChatSession, message: str, speculation: Optional[asyncio.Future]
+) -> List[str]:
+    # A speculation still running is probably for this very message
+    if speculation is not None and not speculation.done():
+        await asyncio.wait([speculation])
+    return await run_in(embed_executor, session.retrieve, message)
+
+
+async def socket_turn(
+    session: ChatSession,
+    frame: Dict[str, Any],
+    send: Send,
+    turn_lock: asyncio.Lock,
+    speculation: Optional[asyncio.Future] = None,
+) -> None:
+    """Run one chat turn for a WebSocket session, streaming tokens as they arrive."""
+    turn_id = frame.get("id")
+    message = frame.get("message")
+    include_memories = frame.get("include_memories", False)
+    if not message:
+        await send_frame(
+            send, {"type": "error", "id": turn_id, "error": "Message is required"}
+        )
+        return
+
+    # One turn at a time per session, in the order messages were sent
+    async with turn_lock:
+        CHATS_IN_FLIGHT.inc()
+        timings = timing.start_request()
+        try:
+            with timing.stage("db_write"):
+                await run_in(
+                    db_executor, add_chat_message, "user", message, db_path=DB_PATH
+                )
+            await run_in(db_executor, kairos.refresh_from_db)
+
+            # Retrieval only feeds the reply frame, so it runs beside generation
+            retrieval = asyncio.ensure_future(
+                session_retrieve(session, message, speculation)
+            )
+            prompt = await run_in(
+                embed_executor, kairos.build_prompt, message, include_memories
+            )
+            pieces = []
+            # Keep generating if the client drops: the reply is still saved,
+            # and shows up in history when it reconnects
+            live = True
+            async for piece in kairos.astream(prompt):
+                pieces.append(piece)
+                if live:
+                    live = await send_frame(
+                        send, {"type": "token", "id": turn_id, "text": piece}
+                    )
+            response = "".join(pieces).strip()
+
+            with timing.stage("db_write"):
+                await run_in(
+                    db_executor,
+                    add_chat_message,
+                    "assistant",
+                    response,
+                    db_path=DB_PATH,
+                )
+            try:
+                relevant_memories = await retrieval
+            except Exception as e:
+                print(colored(f"⚠️ Session retrieval failed: {e}", "yellow"))
+                relevant_memories = []
+            session.turns += 1
+
+            payload = {
+                "type": "done",
+                "id": turn_id,
+                "response": response,
+                "relevant_memories": relevant_memories,
+            }
+            if DEBUG_MODE:
+                payload["timings"] = timings.to_dict()
+            await send_frame(send, payload)
+        except Exception as e:
+            await send_frame(
+                send,
+                {
+                    "type": "error",
+                    "id": turn_id,
+                    "error": f"Failed to generate response: {str(e)}",
+                },
+            )
+        finally:
+            CHATS_IN_FLIGHT.dec()
+            footprint.enforce_budgets()
+
+
+async def chat_socket(scope: Scope, receive: Receive, send: Send) -> None:
+    """/ws/chat: one persistent chat session per socket.
+
+    Client frames (JSON text):
+      {"type": "message", "message": ..., "include_memories": false, "id": ...}
+      {"type": "typing", "text": ...}   partial input, retrieved speculatively
+      {"type": "ping"}
+    Server frames: ready (with session_id), token, done, error, pong.
+    Reconnect with ?session=<session_id> to resume a session's warm state.
+    """
+    if (await receive())["type"] != "websocket.connect":
+        return
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    requested = query.get("session", [None])[0]
+    session = sessions.attach(requested)
+    await send({"type": "websocket.accept"})
+    await send_frame(
+        send,
+        {
+            "type": "ready",
+            "session_id": session.id,
+            "resumed": session.id == requested,
+        },
+    )
+
+    turn_lock = asyncio.Lock()
+    speculation: Optional[asyncio.Future] = None
+    try:
+        while True:
+            event = await receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            if event["type"] != "websocket.receive":
+                continue
+            try:
+                frame = json.loads(event.get("text") or event.get("bytes") or b"")
+                kind = frame.get("type")
+            except (ValueError, AttributeError):
+                await send_frame(send, {"type": "error", "error": "Invalid JSON frame"})
+                continue
+
+            if kind == "message":
+                task = asyncio.ensure_future(
+                    socket_turn(session, frame, send, turn_lock, speculation)
+                )
+                socket_turns.add(task)
+                task.add_done_callback(socket_turns.discard)
+            elif kind == "typing":
+                session.typed = str(frame.get("text", ""))
+                if speculation is None or speculation.done():
+                    speculation = asyncio.ensure_future(speculate(session))
+            elif kind == "ping":
+                await send_frame(send, {"type": "pong"})
+            else:
+                await send_frame(
+                    send, {"type": "error", "error": f"Unknown frame type '{kind}'"}
+                )
+    finally:
+        sessions.detach(session)
+
+
+async def lifespan(scope: Scope, receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            db_executor.shutdown(wait=False)
+            embed_executor.shutdown(wait=False)
+            chat_jobs.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+# Routes served natively; everything else goes through Flask
+ASYNC_ROUTES = {
+    ("POST", "/api/chat"): chat,
+}
+
+
+def _has_user_header(scope: Scope) -> bool:
+    user_header = USER_HEADER.lower().encode("latin-1")
+    return any(name == user_header for name, _ in scope.get("headers", []))
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+        return
+    if scope["type"] == "websocket":
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        # /ws/chat only serves the default user, so refuse a socket naming
+        # another one rather than answer it from the wrong database
+        names_user = MULTI_USER and (_has_user_header(scope) or "user" in query)
+        if scope["path"] == "/ws/chat" and not names_user:
+            await chat_socket(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": 1008})
+        return
+    if scope["type"] != "http":
+        return
+
+    handler = ASYNC_ROUTES.get((scope["method"], scope["path"]), forward_to_flask)
+    if scope["method"] == "GET" and scope["path"].startswith("/api/chat/jobs/"):
+        handler = chat_job
+    if MULTI_USER and _has_user_header(scope):
+        # The native handlers serve the default user; Flask resolves the others
+        handler = forward_to_flask
+    await handler(scope, receive, send)
+
+
+def main():
+    try:
+        import uvicorn
+    except ImportError:
+        print(colored("❌ The async server needs uvicorn", "red"))
+        print(colored("Please install: pip install uvicorn", "yellow"))
+        exit(1)
+
+    port = int(os.environ.get("TEST_PORT", 8000))
+    uvicorn.run(application, host="0.0.0.0", port=port, loop="asyncio")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Background chat generations for clients that cannot hold a request open.
+
+POST /api/chat/jobs queues a turn and returns its id at once; a small worker
+pool runs it and stores the reply in the chat_jobs table, where
+GET /api/chat/jobs/<id> reads it back, optionally waiting for it to finish.
+A job submitted for a user (see users.py) is kept in that user's database.
+
+  KAIROS_CHAT_JOB_WORKERS      generations run at once (default 2)
+  KAIROS_CHAT_JOB_MAX_PENDING  queued + running jobs before new ones are refused (default 32)
+  KAIROS_CHAT_JOB_TTL          seconds a job is kept after its last update (default 3600)
+  KAIROS_CHAT_JOB_TIMEOUT      Ollama timeout for job generations, in seconds (default 300)
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set
+from termcolor import colored
+
+from database.operations import (
+    create_chat_job,
+    delete_expired_chat_jobs,
+    fail_unfinished_chat_jobs,
+    get_chat_job,
+    update_chat_job,
+)
+from utils.metrics import QUEUE_DEPTH
+
+JOB_WORKERS = int(os.getenv("KAIROS_CHAT_JOB_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("KAIROS_CHAT_JOB_MAX_PENDING", "32"))
+JOB_TTL = float(os.getenv("KAIROS_CHAT_JOB_TTL", "3600"))
+JOB_TIMEOUT = float(os.getenv("KAIROS_CHAT_JOB_TIMEOUT", "300"))
+CLEANUP_INTERVAL = 60
+# How often a waiter re-reads a job that another process is running
+POLL_INTERVAL = 0.25
+
+FINISHED = ("done", "error")
+
+
+class JobQueueFull(Exception):
+    """Raised when MAX_PENDING_JOBS jobs are already queued or running."""
+
+
+class ChatJobs:
+    """Runs chat turns on a bounded pool and persists their results."""
+
+    def __init__(
+        self,
+        run_turn: Callable[..., str],
+        db_path: str = "kairos.db",
+        workers: int = JOB_WORKERS,
+        max_pending: int = MAX_PENDING_JOBS,
+        ttl: float = JOB_TTL,
+        user_db_path: Optional[Callable[[str], str]] = None,
+    ):
+        """`run_turn(message, include_memories)` generates a job's reply.
+
+        Jobs submitted with a user_id are stored in `user_db_path(user_id)`,
+        and their run_turn call also gets `user_id=`.
+        """
+        self.run_turn = run_turn
+        self.db_path = db_path
+        self.user_db_path = user_db_path
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="kairos-job"
+        )
+        self._lock = threading.Lock()
+        # Set when the job finishes; only jobs started by this process are here
+        self._pending: Dict[str, threading.Event] = {}
+        # Database of each pending job, for drain()
+        self._pending_db: Dict[str, str] = {}
+        # Executor futures not yet done, so drain() can cancel queued ones
+        self._futures: Set[Future] = set()
+        # Last cleanup per database
+        self._last_cleanup: Dict[str, float] = {}
+
+        # Jobs left unfinished by a previous process will never complete
+        lost = fail_unfinished_chat_jobs("Server restarted", db_path=db_path)
+        if lost:
+            print(colored(f"⚠️ {lost} unfinished chat job(s) marked failed", "yellow"))
+        QUEUE_DEPTH.set_function(self.pending_count, queue="chat_jobs")
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _db(self, user_id: Optional[str]) -> str:
+        return self.db_path if user_id is None else self.user_db_path(user_id)
+
+    def submit(
+        self,
+        message: str,
+        include_memories: bool = False,
+        user_id: Optional[str] = None,
+    ) -> str:
+        """Queue a chat turn and return its job id."""
+        db_path = self._db(user_id)
+        self.cleanup(db_path=db_path)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} chat jobs already pending")
+            if not create_chat_job(job_id, message, include_memories, db_path=db_path):
+                raise RuntimeError("Failed to create chat job")
+            self._pending[job_id] = threading.Event()
+            self._pending_db[job_id] = db_path
+        future = self._executor.submit(
+            self._run, job_id, message, include_memories, user_id
+        )
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget_future)
+        return job_id
+
+    def _forget_future(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(
+        self,
+        job_id: str,
+        message: str,
+        include_memories: bool,
+        user_id: Optional[str] = None,
+    ) -> None:
+        db_path = self._db(user_id)
+        try:
+            update_chat_job(job_id, "running", db_path=db_path)
+            if user_id is None:
+                response = self.run_turn(message, include_memories)
+            else:
+                response = self.run_turn(message, include_memories, user_id=user_id)
+            update_chat_job(job_id, "done", response=response, db_path=db_path)
+        except Exception as e:
+            print(colored(f"❌ Chat job {job_id} failed: {e}", "red"))
+            update_chat_job(job_id, "error", error=str(e), db_path=db_path)
+        finally:
+            with self._lock:
+                done = self._pending.pop(job_id)
+                del self._pending_db[job_id]
+            done.set()
+
+    def get(
+        self, job_id: str, wait: float = 0.0, user_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a job, first waiting up to `wait` seconds for it to finish."""
+        db_path = self._db(user_id)
+        deadline = time.monotonic() + wait
+        with self._lock:
+            done = self._pending.get(job_id)
+        if done is not None and wait > 0:
+            done.wait(wait)
+        job = get_chat_job(job_id, db_path=db_path)
+        # Started by another worker process: fall back to polling the table
+        while (
+            job is not None
+            and job["status"] not in FINISHED
+            and time.monotonic() < deadline
+        ):
+            time.sleep(min(POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            job = get_chat_job(job_id, db_path=db_path)
+        return job
+
+    def cleanup(self, force: bool = False, db_path: Optional[str] = None) -> int:
+        """Delete jobs older than the TTL, at most once per CLEANUP_INTERVAL.
+
+        Each database is cleaned when a job is next submitted to it.
+        """
+        db_path = db_path or self.db_path
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_cleanup.get(db_path, float("-inf"))
+            if not force and now - last < CLEANUP_INTERVAL:
+                return 0
+            self._last_cleanup[db_path] = now
+        cutoff = (datetime.now() - timedelta(seconds=self.ttl)).isoformat()
+        return delete_expired_chat_jobs(cutoff, db_path=db_path)
+
+    def drain(self, timeout: float) -> int:
+        """Stop taking jobs, wait up to `timeout` for running ones, fail the rest.
+
+        Queued jobs are not started. Returns how many jobs were marked failed,
+        so none is left queued or running after this process exits.
+        """
+        # shutdown(cancel_futures=True) needs Python 3.9
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            pending = list(self._pending.items())
+        for job_id, done in pending:
+            done.wait(max(deadline - time.monotonic(), 0))
+
+        failed = 0
+        with self._lock:
+            unfinished = list(self._pending_db.items())
+        for job_id, db_path in unfinished:
+            if update_chat_job(
+                job_id, "error", error="Server shutting down", db_path=db_path
+            ):
+                failed += 1
+        return failed
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,193 @@
+"""
+Persistent chat sessions for the WebSocket channel (/ws/chat).
+
+A session outlives the socket it was opened on: a client that reconnects with
+?session=<id> gets back the same warm state - the embeddings of recent history
+and earlier messages, and the last retrieval result - instead of starting cold.
+Detached sessions are dropped after KAIROS_WS_SESSION_TTL seconds.
+
+While the user types, retrieval runs speculatively on the partial text. When
+the message arrives its result is reused if nothing it depends on changed and
+the message is close enough to the partial text in embedding space; otherwise
+it is discarded and retrieval runs on the message as usual.
+
+  KAIROS_WS_SESSION_TTL    seconds a disconnected session is kept (default 600)
+  KAIROS_WS_MAX_SESSIONS   sessions kept at most, oldest detached first out (default 100)
+  KAIROS_WS_SESSION_CACHE  embeddings cached per session (default 256)
+  KAIROS_SPECULATION_THRESHOLD  cosine similarity needed to reuse a speculative
+                                retrieval (default 0.9, above 1 disables reuse)
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from termcolor import colored
+
+from embeddings import EmbeddingCache, cos_sim
+from kairos_ai import KairosAI, get_embedding_model
+from utils.metrics import counter
+
+SESSION_TTL = float(os.getenv("KAIROS_WS_SESSION_TTL", "600"))
+MAX_SESSIONS = int(os.getenv("KAIROS_WS_MAX_SESSIONS", "100"))
+SESSION_CACHE_SIZE = int(os.getenv("KAIROS_WS_SESSION_CACHE", "256"))
+SPECULATION_THRESHOLD = float(os.getenv("KAIROS_SPECULATION_THRESHOLD", "0.9"))
+
+SPECULATIONS = counter(
+    "kairos_speculative_retrievals_total",
+    "Speculative retrievals claimed by a chat turn, by outcome",
+    ("result",),
+)
+
+
+class Speculation:
+    """Retrieval result for a partial message, and the state it was built on."""
+
+    def __init__(self, text: str, state: Tuple, memories: List[str]):
+        self.text = text
+        self.state = state
+        self.memories = memories
+
+
+class ChatSession:
+    """Warm retrieval state for one client."""
+
+    def __init__(self, session_id: str, kairos: KairosAI):
+        self.id = session_id
+        self.kairos = kairos
+        self.embeddings = EmbeddingCache(SESSION_CACHE_SIZE)
+        self.relevant_memories: List[str] = []
+        self.speculation: Optional[Speculation] = None
+        # Latest partial input from typing frames
+        self.typed = ""
+        self.turns = 0
+        self.connected = False
+        self.last_seen = time.monotonic()
+
+    def retrieval_state(self, pending: Optional[str] = None) -> Tuple[Any, ...]:
+        """What a retrieval result depends on: the memory store and recent history.
+
+        `pending` is a message already saved for the current turn; it is left
+        out so the state matches the one seen while that message was typed.
+        """
+        history = self.kairos.recent_history(2)
+        if pending is not None and history and history[-1]["content"] == pending:
+            history = history[:-1]
+        last = (history[-1].get("id"), history[-1]["content"]) if history else None
+        memory = self.kairos.memory
+        return (memory, memory.version, last)
+
+    def speculate(self, partial: str) -> None:
+        """Run retrieval on partial input so the turn can reuse it.
+
+        Also warms the model, the memory matrix and the embeddings of recent
+        history, so even a discarded speculation shortens the turn.
+        """
+        partial = partial.strip()
+        if not partial:
+            return
+        try:
+            state = self.retrieval_state()
+            memories = self.kairos.get_relevant_memories(partial, cache=self.embeddings)
+            self.speculation = Speculation(partial, state, memories)
+        except Exception as e:
+            # Only an optimisation; the turn itself will surface real errors
+            print(colored(f"⚠️ Speculative retrieval failed: {e}", "yellow"))
+
+    def claim_speculation(self, message: str) -> Optional[List[str]]:
+        """The speculative result for `message` if it still holds, else None.
+
+        Call after `message` has been saved to history. A claimed or rejected
+        speculation is dropped either way.
+        """
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        if speculation.state != self.retrieval_state(pending=message):
+            SPECULATIONS.inc(result="stale")
+            return None
+        if message.strip() != speculation.text:
+            # Both embeddings stay cached, so a miss costs retrieval nothing extra
+            vectors = self.embeddings.encode(
+                get_embedding_model(), [speculation.text, message]
+            )
+            if cos_sim(vectors[0], vectors[1]).item() < SPECULATION_THRESHOLD:
+                SPECULATIONS.inc(result="miss")
+                return None
+        SPECULATIONS.inc(result="hit")
+        return speculation.memories
+
+    def retrieve(self, message: str) -> List[str]:
+        """Relevant memories and history for `message`.
+
+        Reuses the speculative result from typing time when it still applies,
+        and cached embeddings otherwise.
+        """
+        memories = self.claim_speculation(message)
+        if memories is None:
+            memories = self.kairos.get_relevant_memories(message, cache=self.embeddings)
+        self.relevant_memories = memories
+        return memories
+
+
+class SessionRegistry:
+    """Sessions by id, expiring the ones nobody is connected to."""
+
+    def __init__(
+        self,
+        kairos: KairosAI,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = MAX_SESSIONS,
+    ):
+        self.kairos = kairos
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def attach(self, session_id: Optional[str] = None) -> ChatSession:
+        """Resume a detached session by id, or start a new one."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None or session.connected:
+                session = ChatSession(uuid.uuid4().hex, self.kairos)
+                self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            session.connected = True
+            session.last_seen = time.monotonic()
+            return session
+
+    def detach(self, session: ChatSession) -> None:
+        with self._lock:
+            session.connected = False
+            session.last_seen = time.monotonic()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        detached = [s for s in self._sessions.values() if not s.connected]
+        excess = len(self._sessions) - self.max_sessions + 1
+        for i, session in enumerate(detached):
+            if i >= excess and now - session.last_seen < self.ttl:
+                continue
+            del self._sessions[session.id]
+
+    def nbytes(self) -> int:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return sum(s.embeddings.nbytes() for s in sessions)
+
+    def clear_caches(self) -> None:
+        """Drop every session's cached embeddings (they are rebuilt on demand)."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.embeddings.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -1,24 +1,43 @@
 # Database directory as a Python package
-from .connection import DbConnection
+from .connection import DbConnection, DB_PROFILES, get_profile_name
+from .change_feed import ChangeFeed
 from .models import ChatMessage, SpellbookMemory, MEMORY_KEYS
 from .operations import (
     init_db,
     add_chat_message,
     get_chat_history,
     get_recent_chat_history,
+    get_chat_history_page,
+    iter_chat_history,
+    get_chat_messages_by_ids,
     delete_chat_history,
     delete_chat_msg_by_id,
     add_memory,
+    add_memories,
     get_memory_by_key,
     get_all_memories,
+    MEMORY_COLUMNS,
     delete_memory_by_key,
+    delete_memories_by_keys,
     delete_all_memories,
     get_database_stats,
     clear_chat_history,
+    get_table_versions,
+    get_changes_since,
+    TRACKED_TABLES,
+    create_chat_job,
+    update_chat_job,
+    get_chat_job,
+    delete_expired_chat_jobs,
+    fail_unfinished_chat_jobs,
+    CHAT_JOB_STATUSES,
 )
 
 __all__ = [
     "DbConnection",
+    "DB_PROFILES",
+    "get_profile_name",
+    "ChangeFeed",
     "ChatMessage",
     "SpellbookMemory",
     "MEMORY_KEYS",
@@ -26,13 +45,28 @@ __all__ = [
     "add_chat_message",
     "get_chat_history",
     "get_recent_chat_history",
+    "get_chat_history_page",
+    "iter_chat_history",
+    "get_chat_messages_by_ids",
     "delete_chat_history",
     "delete_chat_msg_by_id",
     "add_memory",
+    "add_memories",
     "get_memory_by_key",
     "get_all_memories",
+    "MEMORY_COLUMNS",
     "delete_memory_by_key",
+    "delete_memories_by_keys",
     "delete_all_memories",
     "get_database_stats",
     "clear_chat_history",
+    "get_table_versions",
+    "get_changes_since",
+    "TRACKED_TABLES",
+    "create_chat_job",
+    "update_chat_job",
+    "get_chat_job",
+    "delete_expired_chat_jobs",
+    "fail_unfinished_chat_jobs",
+    "CHAT_JOB_STATUSES",
 ]
@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional
+from .connection import DbConnection
+from .operations import TRACKED_TABLES, get_table_versions, get_changes_since
+from utils.metrics import CACHE_REQUESTS
+
+
+class ChangeFeed:
+    """Cheap cross-process change detection for in-process caches.
+
+    Keeps one long-lived read connection so ``PRAGMA data_version`` can tell
+    whether any other connection (in this or another process) committed since
+    the last poll. Only then are the per-table versions and changed rows read.
+    """
+
+    def __init__(self, db_path: str = "kairos.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Take the pragma baseline before reading versions so nothing slips between
+        self._data_version = self._read_data_version()
+        self.versions: Dict[str, int] = get_table_versions(db_path)
+
+    def _read_data_version(self) -> Optional[int]:
+        try:
+            if self._conn is None:
+                self._conn = DbConnection(self.db_path).connect()
+            return int(self._conn.execute("PRAGMA data_version").fetchone()[0])
+        except sqlite3.Error as e:
+            print(f"Error polling data version: {e}")
+            self._close_conn()
+            return None
+
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def has_changes(self) -> bool:
+        """True if anything may have been committed since the last poll."""
+        with self._lock:
+            return self._has_changes()
+
+    def _has_changes(self) -> bool:
+        current = self._read_data_version()
+        if current is None:
+            return True
+        changed = current != self._data_version
+        self._data_version = current
+        # A "hit" means local caches are still valid and nothing had to be read
+        CACHE_REQUESTS.inc(cache="change_feed", result="miss" if changed else "hit")
+        return changed
+
+    def poll(self) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+        """Return the changed rows of each table modified since the last poll.
+
+        A table maps to None when its version went backwards (e.g. the database
+        file was replaced), meaning callers should reload it in full.
+        """
+        with self._lock:
+            if not self._has_changes():
+                return {}
+            current = get_table_versions(self.db_path)
+            if not current:
+                return {}
+
+            changes: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+            for table in TRACKED_TABLES:
+                seen = self.versions.get(table, 0)
+                now = current.get(table, 0)
+                if now == seen:
+                    continue
+                if now < seen:
+                    changes[table] = None
+                else:
+                    changes[table] = get_changes_since(table, seen, self.db_path)
+            self.versions = current
+            return changes
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_conn()
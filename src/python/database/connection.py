@@ -1,12 +1,59 @@
 import sqlite3
 import os
 from contextlib import contextmanager
-from typing import Generator, Optional
+from functools import lru_cache
+from typing import Any, Dict, Generator, Optional
+
+# Named connection tunings, picked with KAIROS_DB_PROFILE.
+# durable:   fsync on every commit, small cache - safest on power loss
+# balanced:  WAL + synchronous=NORMAL (may lose the last commits on power loss,
+#            never corrupts), bigger cache and mmap
+# fast-read: large cache/mmap for read-heavy serving, short lock waits
+DB_PROFILES: Dict[str, Dict[str, Any]] = {
+    "durable": {
+        "synchronous": "FULL",
+        "cache_size": -8000,  # negative = KiB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,  # ms
+    },
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 3000,
+    },
+    "fast-read": {
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 1000,
+    },
+}
+DEFAULT_DB_PROFILE = "balanced"
+
+
+@lru_cache(maxsize=None)
+def _resolve_profile(name: str) -> str:
+    # Cached, so a bad name is reported once rather than on every connection
+    if name not in DB_PROFILES:
+        print(f"Unknown database profile '{name}', using '{DEFAULT_DB_PROFILE}'")
+        return DEFAULT_DB_PROFILE
+    return name
+
+
+def get_profile_name(profile: Optional[str] = None) -> str:
+    """Resolve the active profile name, falling back to the default if unknown."""
+    name = profile or os.getenv("KAIROS_DB_PROFILE") or DEFAULT_DB_PROFILE
+    return _resolve_profile(name.lower())
 
 
 class DbConnection:
-    def __init__(self, db_path: str = "kairos.db"):
+    def __init__(self, db_path: str = "kairos.db", profile: Optional[str] = None):
         self.db_path = db_path
+        self.profile = get_profile_name(profile)
         self.ensure_db_directory()
 
     def ensure_db_directory(self):
@@ -14,14 +61,27 @@ class DbConnection:
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
 
+    def connect(self) -> sqlite3.Connection:
+        """Open a configured connection. The caller is responsible for closing it."""
+        settings = DB_PROFILES[self.profile]
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings["busy_timeout"] / 1000,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Profile pragmas are per-connection, so they are applied once on open
+        for pragma, value in settings.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
     @contextmanager
     def get_connection(self) -> Generator[sqlite3.Connection, None, None]:
         conn: Optional[sqlite3.Connection] = None
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA journal_mode = WAL")
+            conn = self.connect()
 
             yield conn
 
@@ -1,8 +1,9 @@
 import os
 import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Callable, TypeVar
-from .connection import DbConnection
+from typing import Optional, List, Dict, Any, Callable, TypeVar, Iterator, Sequence
+from .connection import DbConnection, DB_PROFILES, get_profile_name
+from utils.metrics import DB_SECONDS
 
 T = TypeVar("T")
 
@@ -37,13 +38,14 @@ def init_db(
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             existing_tables = cursor.fetchall()
+            # Schema is idempotent, so existing databases pick up new tables/triggers
+            conn.executescript(schema_sql)
+            conn.commit()
             if existing_tables:
                 print(
                     f"Database already initialised with {len(existing_tables)} tables."
                 )
                 return True
-            conn.executescript(schema_sql)
-            conn.commit()
             print("Database initialised successfully!")
             return True
 
@@ -56,6 +58,7 @@ def init_db(
 # CHAT HISTORY #
 
 
+@DB_SECONDS.timed(op="add_chat_message")
 def add_chat_message(
     role: str, content: str, timestamp: Optional[str] = None, db_path: str = "kairos.db"
 ) -> Optional[int]:
@@ -83,6 +86,7 @@ def add_chat_message(
         return None
 
 
+@DB_SECONDS.timed(op="get_chat_history")
 def get_chat_history(
     limit: Optional[int] = None, db_path: str = "kairos.db"
 ) -> List[Dict[str, Any]]:
@@ -109,6 +113,86 @@ def get_chat_history(
         return []
 
 
+@DB_SECONDS.timed(op="get_chat_history_page")
+def get_chat_history_page(
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    db_path: str = "kairos.db",
+) -> List[Dict[str, Any]]:
+    """Get one keyset-paginated page of chat history.
+
+    With after_id, returns messages newer than that id, oldest first. Otherwise
+    returns messages older than before_id (or the latest), newest first. Both
+    walk the primary key index, so every page costs the same regardless of depth.
+    """
+    try:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        def _run(conn):
+            cursor = conn.cursor()
+            if after_id is not None:
+                cursor.execute(
+                    "SELECT id, role, content, timestamp FROM chat_history WHERE id > ? ORDER BY id ASC LIMIT ?",
+                    (after_id, limit),
+                )
+            elif before_id is not None:
+                cursor.execute(
+                    "SELECT id, role, content, timestamp FROM chat_history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                    (before_id, limit),
+                )
+            else:
+                cursor.execute(
+                    "SELECT id, role, content, timestamp FROM chat_history ORDER BY id DESC LIMIT ?",
+                    (limit,),
+                )
+            return [dict(r) for r in cursor.fetchall()]
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error getting chat history page: {e}")
+        return []
+
+
+def iter_chat_history(
+    before_id: Optional[int] = None,
+    page_size: int = 100,
+    db_path: str = "kairos.db",
+) -> Iterator[Dict[str, Any]]:
+    """Lazily iterate chat history newest first, one keyset page at a time."""
+    while True:
+        page = get_chat_history_page(page_size, before_id=before_id, db_path=db_path)
+        yield from page
+        if len(page) < page_size:
+            return
+        before_id = page[-1]["id"]
+
+
+@DB_SECONDS.timed(op="get_chat_messages_by_ids")
+def get_chat_messages_by_ids(
+    msg_ids: List[int], db_path: str = "kairos.db"
+) -> List[Dict[str, Any]]:
+    """Get specific chat messages by ID, oldest first."""
+    if not msg_ids:
+        return []
+    try:
+
+        def _run(conn):
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" for _ in msg_ids)
+            cursor.execute(
+                f"SELECT id, role, content, timestamp FROM chat_history WHERE id IN ({placeholders}) ORDER BY id",
+                list(msg_ids),
+            )
+            return [dict(r) for r in cursor.fetchall()]
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error getting chat messages by ID: {e}")
+        return []
+
+
 def get_recent_chat_history(
     count: int = 10, db_path: str = "kairos.db"
 ) -> List[Dict[str, Any]]:
@@ -116,6 +200,7 @@ def get_recent_chat_history(
     return get_chat_history(limit=count, db_path=db_path)
 
 
+@DB_SECONDS.timed(op="delete_chat_history")
 def delete_chat_history(db_path: str = "kairos.db") -> bool:
     """Delete the chat history from the database."""
     try:
@@ -132,6 +217,7 @@ def delete_chat_history(db_path: str = "kairos.db") -> bool:
         return False
 
 
+@DB_SECONDS.timed(op="delete_chat_msg_by_id")
 def delete_chat_msg_by_id(msg_id: int, db_path: str = "kairos.db") -> int:
     """Delete a chat message by ID."""
     try:
@@ -151,6 +237,7 @@ def delete_chat_msg_by_id(msg_id: int, db_path: str = "kairos.db") -> int:
 # SPELLBOOK MEMORIES #
 
 
+@DB_SECONDS.timed(op="add_memory")
 def add_memory(
     memory_key: str,
     memory_value: str,
@@ -199,6 +286,97 @@ def add_memory(
         return None
 
 
+def _check_embedding(embedding: Any, dim: Optional[int]) -> None:
+    """Raise ValueError unless `embedding` is a flat list of `dim` numbers."""
+    if not isinstance(embedding, list) or not all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in embedding
+    ):
+        raise ValueError("embedding must be a list of numbers")
+    if dim is not None and len(embedding) != dim:
+        raise ValueError(f"embedding must have {dim} dimensions")
+
+
+@DB_SECONDS.timed(op="add_memories")
+def add_memories(
+    memories: Sequence[Dict[str, Any]],
+    db_path: str = "kairos.db",
+    embedding_dim: Optional[int] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Add or update many memories in one transaction.
+
+    Each item takes the add_memory fields (memory_key, memory_value, optional
+    priority and embedding). An embedding must be a flat list of numbers, of
+    `embedding_dim` length when given. Returns one result per item, in order:
+    the normalized memory_key plus its id, or an error for items that failed
+    validation. Returns None if the transaction itself failed.
+    """
+    try:
+        results: List[Dict[str, Any]] = []
+        rows = []
+        for item in memories:
+            if not isinstance(item, dict):
+                results.append(
+                    {"memory_key": None, "error": "memory must be an object"}
+                )
+                continue
+            try:
+                key = _normalize_memory_key(str(item.get("memory_key") or ""))
+                value = item.get("memory_value")
+                if not key:
+                    raise ValueError("memory_key is required")
+                if not isinstance(value, str) or not value.strip():
+                    raise ValueError("memory_value is required")
+                priority = max(1, min(10, int(item.get("priority", 5))))
+                embedding = item.get("embedding")
+                if embedding is not None:
+                    _check_embedding(embedding, embedding_dim)
+                embedding_text = (
+                    json.dumps(embedding) if embedding is not None else None
+                )
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append({"memory_key": item.get("memory_key"), "error": str(e)})
+                continue
+            rows.append((key, value, priority, embedding_text))
+            results.append({"memory_key": key})
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO spellbook_memories (memory_key, memory_value, priority, embedding)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(memory_key) DO UPDATE SET
+                    memory_value = excluded.memory_value,
+                    priority     = excluded.priority,
+                    embedding    = excluded.embedding,
+                    updated_at   = CURRENT_TIMESTAMP
+                """,
+                rows,
+            )
+            keys = sorted({row[0] for row in rows})
+            ids = {}
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                cursor.execute(
+                    f"SELECT id, memory_key FROM spellbook_memories WHERE memory_key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                ids.update({r["memory_key"]: int(r["id"]) for r in cursor.fetchall()})
+            conn.commit()
+            return ids
+
+        ids = _with_conn(db_path, _run) if rows else {}
+        for result in results:
+            if "error" not in result:
+                result["id"] = ids.get(result["memory_key"])
+        return results
+    except Exception as e:
+        print(f"Error adding memories: {e}")
+        return None
+
+
+@DB_SECONDS.timed(op="get_memory_by_key")
 def get_memory_by_key(
     memory_key: str, db_path: str = "kairos.db"
 ) -> Optional[Dict[str, Any]]:
@@ -231,14 +409,36 @@ def get_memory_by_key(
         return None
 
 
-def get_all_memories(db_path: str = "kairos.db") -> List[Dict[str, Any]]:
-    """Get all memories from the spellbook as list of dicts."""
+MEMORY_COLUMNS = (
+    "id",
+    "memory_key",
+    "memory_value",
+    "priority",
+    "embedding",
+    "created_at",
+    "updated_at",
+)
+
+
+@DB_SECONDS.timed(op="get_all_memories")
+def get_all_memories(
+    db_path: str = "kairos.db", columns: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Get all memories from the spellbook as list of dicts.
+
+    `columns` limits the fields read (default: all of MEMORY_COLUMNS). Leaving out
+    "embedding" skips reading and decoding the embedding JSON entirely.
+    """
     try:
+        selected = list(columns) if columns is not None else list(MEMORY_COLUMNS)
+        unknown = [c for c in selected if c not in MEMORY_COLUMNS]
+        if unknown or not selected:
+            raise ValueError(f"Unknown memory columns: {unknown or selected}")
 
         def _run(conn):
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT id, memory_key, memory_value, priority, embedding, created_at, updated_at FROM spellbook_memories ORDER BY priority DESC, created_at DESC"
+                f"SELECT {', '.join(selected)} FROM spellbook_memories ORDER BY priority DESC, created_at DESC"
             )
             rows = cursor.fetchall()
             results: List[Dict[str, Any]] = []
@@ -258,6 +458,7 @@ def get_all_memories(db_path: str = "kairos.db") -> List[Dict[str, Any]]:
         return []
 
 
+@DB_SECONDS.timed(op="delete_memory_by_key")
 def delete_memory_by_key(memory_key: str, db_path: str = "kairos.db") -> bool:
     """Delete a memory by key."""
     try:
@@ -277,6 +478,37 @@ def delete_memory_by_key(memory_key: str, db_path: str = "kairos.db") -> bool:
         return False
 
 
+@DB_SECONDS.timed(op="delete_memories_by_keys")
+def delete_memories_by_keys(
+    memory_keys: Sequence[str], db_path: str = "kairos.db"
+) -> Optional[List[Dict[str, Any]]]:
+    """Delete many memories by key in one transaction.
+
+    Returns one {"memory_key", "deleted"} result per key, in order, or None if
+    the transaction failed.
+    """
+    try:
+        keys = [_normalize_memory_key(str(k)) for k in memory_keys]
+
+        def _run(conn):
+            cursor = conn.cursor()
+            deleted = []
+            for key in keys:
+                cursor.execute(
+                    "DELETE FROM spellbook_memories WHERE memory_key = ?", (key,)
+                )
+                deleted.append(cursor.rowcount > 0)
+            conn.commit()
+            return deleted
+
+        deleted = _with_conn(db_path, _run) if keys else []
+        return [{"memory_key": k, "deleted": d} for k, d in zip(keys, deleted)]
+    except Exception as e:
+        print(f"Error deleting memories: {e}")
+        return None
+
+
+@DB_SECONDS.timed(op="delete_all_memories")
 def delete_all_memories(db_path: str = "kairos.db") -> bool:
     """Delete all memories from the spellbook."""
     try:
@@ -293,12 +525,193 @@ def delete_all_memories(db_path: str = "kairos.db") -> bool:
         return False
 
 
+# CHANGE FEED #
+
+TRACKED_TABLES = ("chat_history", "spellbook_memories")
+
+
+@DB_SECONDS.timed(op="get_table_versions")
+def get_table_versions(db_path: str = "kairos.db") -> Dict[str, int]:
+    """Get the current change version of every tracked table."""
+    try:
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute("SELECT table_name, version FROM data_version")
+            return {r["table_name"]: int(r["version"]) for r in cursor.fetchall()}
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error getting table versions: {e}")
+        return {}
+
+
+@DB_SECONDS.timed(op="get_changes_since")
+def get_changes_since(
+    table_name: str, since_version: int = 0, db_path: str = "kairos.db"
+) -> List[Dict[str, Any]]:
+    """Get the latest change of every row modified after since_version, oldest first."""
+    try:
+        if table_name not in TRACKED_TABLES:
+            raise ValueError(f"Table '{table_name}' is not tracked")
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT row_id, row_key, op, version FROM change_log WHERE table_name = ? AND version > ? ORDER BY version",
+                (table_name, since_version),
+            )
+            return [dict(r) for r in cursor.fetchall()]
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error getting changes since version {since_version}: {e}")
+        return []
+
+
+# CHAT JOBS #
+
+CHAT_JOB_STATUSES = ("queued", "running", "done", "error")
+
+
+def _chat_job_row(row) -> Dict[str, Any]:
+    data = dict(row)
+    data["include_memories"] = bool(data["include_memories"])
+    return data
+
+
+@DB_SECONDS.timed(op="create_chat_job")
+def create_chat_job(
+    job_id: str,
+    message: str,
+    include_memories: bool = False,
+    db_path: str = "kairos.db",
+) -> bool:
+    """Record a queued background chat job."""
+    try:
+        now = _now_iso()
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO chat_jobs (id, status, message, include_memories, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, message, int(bool(include_memories)), now, now),
+            )
+            conn.commit()
+            return True
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error creating chat job: {e}")
+        return False
+
+
+@DB_SECONDS.timed(op="update_chat_job")
+def update_chat_job(
+    job_id: str,
+    status: str,
+    response: Optional[str] = None,
+    error: Optional[str] = None,
+    db_path: str = "kairos.db",
+) -> bool:
+    """Move a chat job to a new status, storing its response or error."""
+    try:
+        if status not in CHAT_JOB_STATUSES:
+            raise ValueError(f"Invalid chat job status '{status}'")
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE chat_jobs SET status = ?, response = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, response, error, _now_iso(), job_id),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error updating chat job: {e}")
+        return False
+
+
+@DB_SECONDS.timed(op="get_chat_job")
+def get_chat_job(job_id: str, db_path: str = "kairos.db") -> Optional[Dict[str, Any]]:
+    """Get a chat job by id as a dict."""
+    try:
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, status, message, include_memories, response, error, created_at, updated_at FROM chat_jobs WHERE id = ?",
+                (job_id,),
+            )
+            row = cursor.fetchone()
+            return _chat_job_row(row) if row else None
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error getting chat job: {e}")
+        return None
+
+
+@DB_SECONDS.timed(op="delete_expired_chat_jobs")
+def delete_expired_chat_jobs(before: str, db_path: str = "kairos.db") -> int:
+    """Delete chat jobs last updated before the given ISO timestamp.
+
+    Unfinished jobs are included: one that old was lost with its worker.
+    """
+    try:
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM chat_jobs WHERE updated_at < ?",
+                (before,),
+            )
+            conn.commit()
+            return cursor.rowcount
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error deleting expired chat jobs: {e}")
+        return 0
+
+
+@DB_SECONDS.timed(op="fail_unfinished_chat_jobs")
+def fail_unfinished_chat_jobs(
+    error: str, db_path: str = "kairos.db", updated_before: Optional[str] = None
+) -> int:
+    """Mark every queued or running chat job as failed with `error`.
+
+    With `updated_before` (an ISO timestamp), only jobs last updated earlier.
+    """
+    try:
+        query = "UPDATE chat_jobs SET status = 'error', error = ?, updated_at = ? WHERE status IN ('queued', 'running')"
+        params: List[Any] = [error, _now_iso()]
+        if updated_before is not None:
+            query += " AND updated_at < ?"
+            params.append(updated_before)
+
+        def _run(conn):
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor.rowcount
+
+        return _with_conn(db_path, _run)
+    except Exception as e:
+        print(f"Error failing unfinished chat jobs: {e}")
+        return 0
+
+
 # UTILITIES #
 
 
+@DB_SECONDS.timed(op="get_database_stats")
 def get_database_stats(db_path: str = "kairos.db") -> Dict[str, Any]:
-    """Get database statistics."""
+    """Get database statistics, including the active connection profile."""
     try:
+        profile = get_profile_name()
 
         def _run(conn):
             cursor = conn.cursor()
@@ -306,9 +719,16 @@ def get_database_stats(db_path: str = "kairos.db") -> Dict[str, Any]:
             chat_history_count = int(cursor.fetchone()[0])
             cursor.execute("SELECT COUNT(*) FROM spellbook_memories")
             spellbook_memories_count = int(cursor.fetchone()[0])
+            # Read the pragmas back so the report shows what the connection really uses
+            pragmas = {}
+            for pragma in DB_PROFILES[profile]:
+                cursor.execute(f"PRAGMA {pragma}")
+                pragmas[pragma] = cursor.fetchone()[0]
             return {
                 "chat_history_count": chat_history_count,
                 "spellbook_memories_count": spellbook_memories_count,
+                "db_profile": profile,
+                "db_pragmas": pragmas,
             }
 
         return _with_conn(db_path, _run)
@@ -317,6 +737,7 @@ def get_database_stats(db_path: str = "kairos.db") -> Dict[str, Any]:
         return {}
 
 
+@DB_SECONDS.timed(op="clear_chat_history")
 def clear_chat_history(db_path: str = "kairos.db") -> bool:
     """Clear all chat history."""
     try:
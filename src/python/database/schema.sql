@@ -5,6 +5,8 @@ CREATE TABLE IF NOT EXISTS chat_history (
     timestamp DATETIME NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history (timestamp);
+
 CREATE TABLE IF NOT EXISTS spellbook_memories (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     memory_key TEXT NOT NULL UNIQUE,
@@ -13,4 +15,100 @@ CREATE TABLE IF NOT EXISTS spellbook_memories (
     embedding TEXT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+-- Change feed: one monotonically increasing version per table, bumped by
+-- triggers, plus the latest change per row so readers can refresh incrementally.
+CREATE TABLE IF NOT EXISTS data_version (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS change_log (
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    row_key TEXT,
+    op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    version INTEGER NOT NULL,
+    PRIMARY KEY (table_name, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_version ON change_log (table_name, version);
+
+INSERT OR IGNORE INTO data_version (table_name, version) VALUES
+    ('chat_history', 0),
+    ('spellbook_memories', 0);
+
+CREATE TRIGGER IF NOT EXISTS chat_history_after_insert AFTER INSERT ON chat_history
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'chat_history';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'chat_history', NEW.id, NULL, 'insert', version
+    FROM data_version WHERE table_name = 'chat_history'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS chat_history_after_update AFTER UPDATE ON chat_history
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'chat_history';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'chat_history', NEW.id, NULL, 'update', version
+    FROM data_version WHERE table_name = 'chat_history'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS chat_history_after_delete AFTER DELETE ON chat_history
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'chat_history';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'chat_history', OLD.id, NULL, 'delete', version
+    FROM data_version WHERE table_name = 'chat_history'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS spellbook_memories_after_insert AFTER INSERT ON spellbook_memories
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'spellbook_memories';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'spellbook_memories', NEW.id, NEW.memory_key, 'insert', version
+    FROM data_version WHERE table_name = 'spellbook_memories'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS spellbook_memories_after_update AFTER UPDATE ON spellbook_memories
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'spellbook_memories';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'spellbook_memories', NEW.id, NEW.memory_key, 'update', version
+    FROM data_version WHERE table_name = 'spellbook_memories'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS spellbook_memories_after_delete AFTER DELETE ON spellbook_memories
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE table_name = 'spellbook_memories';
+    INSERT INTO change_log (table_name, row_id, row_key, op, version)
+    SELECT 'spellbook_memories', OLD.id, OLD.memory_key, 'delete', version
+    FROM data_version WHERE table_name = 'spellbook_memories'
+    ON CONFLICT (table_name, row_id) DO UPDATE SET
+        row_key = excluded.row_key, op = excluded.op, version = excluded.version;
+END;
+
+-- Background chat generations (POST /api/chat/jobs), deleted once they have
+-- not been updated for longer than the job TTL.
+CREATE TABLE IF NOT EXISTS chat_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL CHECK (status IN ('queued', 'running', 'done', 'error')),
+    message TEXT NOT NULL,
+    include_memories INTEGER NOT NULL DEFAULT 0,
+    response TEXT,
+    error TEXT,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_jobs_updated_at ON chat_jobs (updated_at);
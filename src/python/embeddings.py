@@ -0,0 +1,127 @@
+"""
+Embedding backends for memory retrieval.
+
+The default backend is the sentence-transformers model. Setting
+KAIROS_EMBEDDING_BACKEND=hash swaps in a deterministic hashed bag-of-words
+embedding that needs no model download, for tests and benchmarks where
+repeatable vectors matter more than semantic quality.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Sequence, Union
+
+EMBEDDING_BACKEND = os.getenv("KAIROS_EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384  # Matches all-MiniLM-L6-v2
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbedding:
+    """Deterministic embedding: each token is hashed to a signed dimension.
+
+    Texts sharing words get similar vectors, so retrieval behaves plausibly,
+    and the same text always maps to the same unit vector across runs.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, text: str) -> List[float]:
+        """Embed one text as a plain list of floats (no torch needed)."""
+        vector = [0.0] * self.dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def encode(self, sentences: Union[str, Sequence[str]], convert_to_tensor=False):
+        """Same call shape as SentenceTransformer.encode; returns a torch tensor."""
+        import torch
+
+        if isinstance(sentences, str):
+            return torch.tensor(self.embed(sentences))
+        return torch.tensor([self.embed(text) for text in sentences])
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND):
+    """Create the configured embedding backend."""
+    if backend == "hash":
+        return HashEmbedding()
+    if backend != "sentence-transformers":
+        raise ValueError(f"Unknown embedding backend '{backend}'")
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def cos_sim(a, b):
+    """Cosine similarity matrix between two (batches of) embeddings.
+
+    Same result as sentence_transformers.util.cos_sim, without importing it.
+    """
+    import torch
+
+    if a.dim() == 1:
+        a = a.unsqueeze(0)
+    if b.dim() == 1:
+        b = b.unsqueeze(0)
+    a = torch.nn.functional.normalize(a.float(), p=2, dim=1)
+    b = torch.nn.functional.normalize(b.float(), p=2, dim=1)
+    return torch.mm(a, b.transpose(0, 1))
+
+
+class EmbeddingCache:
+    """LRU of text -> embedding tensor, so repeated texts are encoded once.
+
+    Used per chat session: recent history and partial input are re-scored on
+    every turn but only new texts reach the model, in one batched call.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, model, texts: Sequence[str]):
+        """Embeddings of `texts` stacked into one tensor (rows in order)."""
+        import torch
+
+        if not texts:
+            return None
+
+        # Held across the encode: callers share one session, so this is cheap
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if t not in self._entries))
+            if missing:
+                encoded = model.encode(missing, convert_to_tensor=True)
+                for text, vector in zip(missing, encoded):
+                    self._entries[text] = vector
+            rows = []
+            for text in texts:
+                self._entries.move_to_end(text)
+                rows.append(self._entries[text])
+            while len(self._entries) > max(self.max_entries, len(texts)):
+                self._entries.popitem(last=False)
+        return torch.stack(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def nbytes(self) -> int:
+        with self._lock:
+            vectors = list(self._entries.values())
+        return sum(v.element_size() * v.nelement() for v in vectors)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -3,61 +3,227 @@
 Kairos AI - A personal AI companion with memory and contextual awareness.
 """
 import os
+import asyncio
 import json
 import yaml
 import requests
 import re
+import itertools
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Tuple, Optional
+from typing import (
+    List,
+    Dict,
+    Any,
+    Callable,
+    Tuple,
+    Optional,
+    Iterator,
+    NamedTuple,
+    AsyncIterator,
+)
 from termcolor import colored
-from sentence_transformers import SentenceTransformer, util
-import torch
 from database.operations import (
     init_db,
     add_chat_message,
-    get_chat_history,
+    get_chat_history_page,
+    iter_chat_history,
     add_memory,
     get_memory_by_key,
     get_all_memories,
     clear_chat_history,
     delete_memory_by_key,
     get_database_stats,
+    get_chat_messages_by_ids,
 )
+from database.change_feed import ChangeFeed
 from database.models import ChatMessage, SpellbookMemory
+from memory_store import MemoryStore
+from embeddings import EmbeddingCache, load_embedding_model, cos_sim
+import ollama_client
+from utils import profiling, startup, timing
+from utils.dag import StageGraph
+from utils.footprint import footprint, deep_sizeof, model_nbytes, MIB
 
 # Constants and Paths
 BASE_PATH = os.path.abspath(os.path.dirname(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_PATH))
-DB_PATH = os.path.join(PROJECT_ROOT, "data", "kairos.db")
+DB_PATH = os.getenv("KAIROS_DB_PATH", os.path.join(PROJECT_ROOT, "data", "kairos.db"))
 PROMPT_PATH = os.path.join(PROJECT_ROOT, "config", "prompt.yaml")
 SCHEMA_PATH = os.path.join(BASE_PATH, "database", "schema.sql")
 MODEL_NAME = "llama3.2"  # Try "phi4-mini" or "qwen2.5:3b" for faster responses
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+OLLAMA_TIMEOUT = 60
 MAX_MEMORY_ITEMS = 30
+HISTORY_WINDOW = 50  # Most recent messages kept in memory; older ones stay in SQLite
 RELEVANT_MEMORIES_COUNT = 5
+# Threads for the chat-turn stages that run beside the caller's (see run_turn)
+TURN_WORKERS = int(os.getenv("KAIROS_TURN_WORKERS", "4"))
 
 DEBUG_MODE = os.getenv("KAIROS_DEBUG", "false").lower() == "true"
-try:
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-except Exception as e:
-    print(colored(f"❌ Failed to initialize embedding model: {e}", "red"))
-    print(colored("Please install: pip install sentence-transformers", "yellow"))
-    exit(1)
 
+MEMORY_COMMAND_RE = re.compile(
+    r'remember:\s*\"(?P<key>[^"]+)\"\s*\"(?P<value>[^"]+)\"(?:\s*priority:(?P<priority>\d+))?',
+    re.IGNORECASE,
+)
+MEMORY_FORMAT_ERROR = '⚠️ Format error. Use: remember: "your_key_name" "memory and details here" priority:7'
 
-class KairosAI:
-    """Kairos AI assistant with memory and personality."""
+LOCAL_MODEL_MESSAGE = (
+    "⚠️ Local model not connected. Please ensure Ollama is running locally."
+)
+CONNECTION_ERROR_MESSAGE = (
+    "⚠️ Cannot connect to Ollama. Please ensure it's running on localhost:11434"
+)
+TIMEOUT_MESSAGE = (
+    "⚠️ Request timed out. Try reducing chat history or using a smaller model."
+)
 
-    def __init__(self):
-        """Initialize Kairos AI with personality and memory systems."""
-        if not init_db(DB_PATH, SCHEMA_PATH):
-            print(colored("❌ Failed to initialize database", "red"))
-            exit(1)
+# Loaded on first use: importing torch and the model dominates cold start, and
+# routes that never embed (history, stats, plain chat) should not pay for it
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+# Threads are only started once a turn submits work
+TURN_THREAD_PREFIX = "kairos-turn"
+turn_executor = ThreadPoolExecutor(
+    max_workers=TURN_WORKERS, thread_name_prefix=TURN_THREAD_PREFIX
+)
 
-        self.persona = self.load_prompt()
-        self.history = self.load_chat_history()
-        self.memory = self.load_memory()
+
+def get_embedding_model():
+    """Return the embedding model, loading it on first call."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                try:
+                    with startup.phase("model_load"):
+                        _embedding_model = load_embedding_model()
+                except Exception as e:
+                    print(
+                        colored(f"❌ Failed to initialize embedding model: {e}", "red")
+                    )
+                    print(
+                        colored(
+                            "Please install: pip install sentence-transformers",
+                            "yellow",
+                        )
+                    )
+                    raise
+    return _embedding_model
+
+
+def warm_embedding_model() -> None:
+    """Load the model ahead of first use; failures resurface on that use."""
+    try:
+        get_embedding_model()
+    except Exception:
+        pass
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed many texts in one batched encode."""
+    if not texts:
+        return []
+    with timing.stage("embed"):
+        return get_embedding_model().encode(list(texts)).tolist()
+
+
+def record_time_to_first_token(data: Dict[str, Any]) -> None:
+    """Record llm_ttft from the durations Ollama reports (in nanoseconds).
+
+    A non-streaming reply arrives all at once, so the first token time is the
+    model load plus prompt evaluation, before generation of the reply began.
+    """
+    if "prompt_eval_duration" not in data:
+        return
+    nanos = data.get("load_duration", 0) + data["prompt_eval_duration"]
+    timing.record("llm_ttft", nanos / 1e9)
+
+
+class KairosState(NamedTuple):
+    """History window and memory store as of one moment.
+
+    Neither part is changed once the state is published: writers build the
+    next state and swap it in, so a reader holding a state needs no lock.
+    """
+
+    history: Tuple[Dict[str, Any], ...]
+    memory: MemoryStore
+
+
+class KairosAI:
+    """Kairos AI assistant with memory and personality.
+
+    `state` is replaced, never mutated, so request threads can read it while
+    another thread writes. Writers serialize on one lock.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, track_footprint: bool = True):
+        """Initialize Kairos AI with personality and memory systems.
+
+        `db_path` selects whose data this instance serves (see users.py); only
+        the process-wide instance should `track_footprint` under fixed names.
+        """
+        self.db_path = db_path
+        with startup.phase("db_init"):
+            if not init_db(db_path, SCHEMA_PATH):
+                print(colored("❌ Failed to initialize database", "red"))
+                raise RuntimeError(f"Failed to initialize database at {db_path}")
+
+            # Start watching before loading so changes made meanwhile are not missed
+            self.change_feed = ChangeFeed(db_path)
+        with startup.phase("prompt_load"):
+            self.persona = self.load_prompt()
+        # Serializes writers; readers just take `state`
+        self._write_lock = threading.Lock()
+        with startup.phase("history_load"):
+            history = self.load_chat_history()
+        with startup.phase("memory_load"):
+            memory = self.load_memory()
+        self.state = KairosState(history, memory)
+        if track_footprint:
+            self.register_footprint()
+
+    @property
+    def history(self) -> Tuple[Dict[str, Any], ...]:
+        """The current history window, oldest first."""
+        return self.state.history
+
+    @property
+    def memory(self) -> MemoryStore:
+        """The current memory store; read it, change it through remember() etc."""
+        return self.state.memory
+
+    def _publish(self, **changes: Any) -> None:
+        # Callers hold _write_lock; one attribute store makes the swap atomic
+        self.state = self.state._replace(**changes)
+
+    def close(self) -> None:
+        """Release the change feed's connection (it reopens if used again)."""
+        self.change_feed.close()
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by this instance's history and memory."""
+        state = self.state
+        return (
+            deep_sizeof(state.history)
+            + state.memory.nbytes()
+            + state.memory.matrix_nbytes()
+        )
+
+    def register_footprint(self) -> None:
+        """Report this instance's memory use and let budgets evict its caches."""
+        footprint.add_component("model", lambda: model_nbytes(_embedding_model))
+        footprint.add_component("chat_history", lambda: deep_sizeof(self.history))
+        footprint.add_component("memory_store", lambda: self.memory.nbytes())
+        footprint.add_cache(
+            "memory_matrix",
+            lambda: self.memory.matrix_nbytes(),
+            lambda: self.memory.drop_matrix(),
+        )
 
     def load_prompt(self) -> str:
         """Load Kairos's personality from prompt.yaml."""
@@ -82,41 +248,69 @@ class KairosAI:
             print(colored(f"❌ Error loading prompt.yaml: {e}", "red"))
             exit(1)
 
-    def load_chat_history(self) -> List[Dict[str, Any]]:
-        """Load previous chat history from database."""
+    def load_chat_history(self) -> Tuple[Dict[str, Any], ...]:
+        """Load the most recent chat history from database, oldest first."""
         try:
-            return get_chat_history(db_path=DB_PATH)
+            latest = get_chat_history_page(HISTORY_WINDOW, db_path=self.db_path)
+            return tuple(reversed(latest))
         except Exception as e:
             print(colored(f"⚠️ Chat history corrupted, starting fresh: {e}", "yellow"))
+            return ()
+
+    def recent_history(
+        self, count: int, state: Optional[KairosState] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the last `count` messages of the in-memory window, oldest first."""
+        if count <= 0:
             return []
+        return list((state or self.state).history[-count:])
+
+    def iter_older_history(
+        self, page_size: int = 100, state: Optional[KairosState] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily page through messages older than the in-memory window, newest first."""
+        history = (state or self.state).history
+        oldest_id = next(
+            (msg["id"] for msg in history if msg.get("id") is not None), None
+        )
+        return iter_chat_history(
+            before_id=oldest_id, page_size=page_size, db_path=self.db_path
+        )
+
+    def read_history(self, count: int) -> List[Dict[str, Any]]:
+        """Get the last `count` messages, oldest first, even beyond the window.
+
+        The window serves what it can; only the rest is paged in from SQLite.
+        """
+        state = self.state
+        recent = self.recent_history(count, state)
+        missing = count - len(recent)
+        # A window that is not full holds every message there is
+        if missing <= 0 or len(state.history) < HISTORY_WINDOW:
+            return recent
+        older = itertools.islice(
+            self.iter_older_history(min(missing, 100), state), missing
+        )
+        return list(reversed(list(older))) + recent
 
-    def save_chat_message(self, role: str, content: str) -> None:
-        """Save a single chat message to database."""
+    def save_chat_message(self, role: str, content: str) -> Optional[int]:
+        """Save a single chat message to database. Returns the new row id."""
         try:
-            add_chat_message(role=role, content=content, db_path=DB_PATH)
+            with timing.stage("db_write"):
+                return add_chat_message(
+                    role=role, content=content, db_path=self.db_path
+                )
         except Exception as e:
             print(colored(f"⚠️ Failed to save chat message: {e}", "yellow"))
+            return None
 
-    def load_memory(self) -> List[Dict[str, Any]]:
+    def load_memory(self) -> MemoryStore:
         """Load Kairos's memory from database."""
         try:
-            memories = get_all_memories(db_path=DB_PATH)
-            # Convert database format to expected format
-            formatted_memories = []
-            for memory in memories:
-                formatted_memories.append(
-                    {
-                        memory["memory_key"]: {
-                            "value": memory["memory_value"],
-                            "priority": memory["priority"],
-                            "embedding": memory.get("embedding"),
-                        }
-                    }
-                )
-            return formatted_memories
+            return MemoryStore.from_rows(get_all_memories(db_path=self.db_path))
         except Exception as e:
             print(colored(f"⚠️ Memory corrupted, starting fresh: {e}", "yellow"))
-            return []
+            return MemoryStore()
 
     def save_memory(
         self,
@@ -132,138 +326,238 @@ class KairosAI:
                 memory_value=memory_value,
                 priority=priority,
                 embedding=embedding,
-                db_path=DB_PATH,
+                db_path=self.db_path,
             )
         except Exception as e:
             print(colored(f"⚠️ Failed to save memory: {e}", "yellow"))
 
-    def prune_memory(self) -> None:
-        """Keep only the highest priority memory items if exceeded max limit."""
-        if len(self.memory) <= MAX_MEMORY_ITEMS:
+    def refresh_from_db(self) -> None:
+        """Apply changes committed by other connections or processes to local state."""
+        # Polled under the lock so a later poll's changes are never applied first
+        with self._write_lock:
+            changes = self.change_feed.poll()
+            updated: Dict[str, Any] = {}
+
+            if "spellbook_memories" in changes:
+                memory_changes = changes["spellbook_memories"]
+                if memory_changes is None:
+                    memory = self.load_memory()
+                else:
+                    memory = self.memory.copy()
+                    for change in memory_changes:
+                        self._apply_memory_change(memory, change)
+                    self._prune(memory)
+                updated["memory"] = memory
+
+            if "chat_history" in changes:
+                history_changes = changes["chat_history"]
+                if history_changes is None:
+                    updated["history"] = self.load_chat_history()
+                else:
+                    updated["history"] = self._apply_history_changes(history_changes)
+
+            if updated:
+                self._publish(**updated)
+
+    def _apply_memory_change(self, memory: MemoryStore, change: Dict[str, Any]) -> None:
+        key = change.get("row_key")
+        if not key:
             return
+        if change["op"] == "delete":
+            memory.remove(key)
+            return
+        row = get_memory_by_key(key, db_path=self.db_path)
+        if row:
+            memory.upsert(
+                key,
+                row["memory_value"],
+                row["priority"],
+                row.get("embedding"),
+            )
+        else:
+            memory.remove(key)
+
+    def _apply_history_changes(
+        self, changes: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], ...]:
+        removed = {c["row_id"] for c in changes if c["op"] == "delete"}
+        inserted = {c["row_id"] for c in changes if c["op"] == "insert"}
+        changed_ids = [c["row_id"] for c in changes if c["op"] != "delete"]
+        fresh = {
+            row["id"]: row
+            for row in get_chat_messages_by_ids(changed_ids, self.db_path)
+        }
+
+        history = [
+            fresh.pop(msg.get("id"), msg)
+            for msg in self.history
+            if msg.get("id") not in removed
+        ]
+        # Updates to rows outside the window are ignored; new rows join at the end
+        history.extend(fresh[msg_id] for msg_id in sorted(fresh) if msg_id in inserted)
+        return tuple(history[-HISTORY_WINDOW:])
 
-        self.memory.sort(key=lambda x: list(x.values())[0].get("priority", 5))
-        self.memory = self.memory[-MAX_MEMORY_ITEMS:]
-        print(colored(f"🧹 Memory pruned to top {MAX_MEMORY_ITEMS} items.", "yellow"))
+    def prune_memory(self) -> None:
+        """Keep only the highest priority memory items if exceeded max limit."""
+        with self._write_lock:
+            if len(self.memory) <= MAX_MEMORY_ITEMS:
+                return
+            memory = self.memory.copy()
+            self._prune(memory)
+            self._publish(memory=memory)
+
+    def _prune(self, memory: MemoryStore) -> None:
+        if memory.prune(MAX_MEMORY_ITEMS):
+            print(
+                colored(f"🧹 Memory pruned to top {MAX_MEMORY_ITEMS} items.", "yellow")
+            )
 
-    def build_memory_context(self) -> str:
+    def clear_history(self) -> None:
+        """Empty the in-memory history window (the database is left alone)."""
+        with self._write_lock:
+            self._publish(history=())
+
+    def forget_memory(self, key: str) -> None:
+        """Drop a memory from the local store (the database is left alone)."""
+        with self._write_lock:
+            if key not in self.memory:
+                return
+            memory = self.memory.copy()
+            memory.remove(key)
+            self._publish(memory=memory)
+
+    def build_memory_context(self, state: Optional[KairosState] = None) -> str:
         """Create a text representation of Kairos's memory (limited for performance)."""
-        if not self.memory:
+        memory = (state or self.state).memory
+        if not memory:
             return "[No memories stored yet]"
 
         # Limit to top 10 memories by priority to prevent prompt bloat
-        sorted_memories = sorted(
-            self.memory,
-            key=lambda x: list(x.values())[0].get("priority", 5),
-            reverse=True,
-        )[:10]
-
         return "\n".join(
-            f"{key.capitalize()}: {entry['value']} (priority {entry['priority']})"
-            for obj in sorted_memories
-            for key, entry in obj.items()
+            f"{entry.key.capitalize()}: {entry.value} (priority {entry.priority})"
+            for entry in memory.top_k(10)
         )
 
-    def build_chat_history_context(self) -> str:
+    def build_chat_history_context(self, state: Optional[KairosState] = None) -> str:
         """Create a text representation of chat history (limited to recent messages)."""
-        if not self.history:
+        state = state or self.state
+        if not state.history:
             return "[No conversation history]"
 
         # Limit to last 10 messages to prevent prompt bloat
-        recent_history = self.history[-10:]
+        recent_history = self.recent_history(10, state)
         return "\n".join(
             f"{'You' if msg['role'] == 'user' else 'Kairos'}: {msg['content']}"
             for msg in recent_history
         )
 
-    def extract_memory_from_message(
+    def parse_memory_command(
         self, user_message: str
-    ) -> Tuple[bool, Optional[str]]:
-        """Extract memory commands from user messages."""
-        match = re.match(
-            r'remember:\s*\"(?P<key>[^"]+)\"\s*\"(?P<value>[^"]+)\"(?:\s*priority:(?P<priority>\d+))?',
-            user_message,
-            re.IGNORECASE,
-        )
+    ) -> Tuple[bool, Optional[Tuple[str, str, int]]]:
+        """Parse a remember: command into (key, value, priority).
 
+        Returns (is_command, fields); fields is None for a malformed command.
+        """
+        match = MEMORY_COMMAND_RE.match(user_message)
         if not match:
-            if "remember:" in user_message:
-                return (
-                    True,
-                    '⚠️ Format error. Use: remember: "your_key_name" "memory and details here" priority:7',
-                )
-            return False, None
-
+            return "remember:" in user_message, None
         key = match.group("key").strip().lower()
         value = match.group("value").strip()
-        priority = int(match.group("priority") or 5)
-        embedding = embedding_model.encode(value).tolist()
+        return True, (key, value, int(match.group("priority") or 5))
+
+    def remember(self, key: str, value: str, priority: int = 5) -> str:
+        """Embed and save a memory, and return Kairos's confirmation."""
+        embedding = get_embedding_model().encode(value).tolist()
 
         # Save memory to database
         self.save_memory(key, value, priority, embedding)
 
         # Update local memory for immediate use
-        existing = next((item for item in self.memory if key in item), None)
-        if existing:
-            existing[key] = {
-                "value": value,
-                "priority": priority,
-                "embedding": embedding,
-            }
-        else:
-            self.memory.append(
-                {key: {"value": value, "priority": priority, "embedding": embedding}}
-            )
+        with self._write_lock:
+            memory = self.memory.copy()
+            memory.upsert(key, value, priority, embedding)
+            self._prune(memory)
+            self._publish(memory=memory)
+        return f"Got it. I'll remember your {key} is {value} (priority {priority})."
 
-        self.prune_memory()
-        return (
-            True,
-            f"Got it. I'll remember your {key} is {value} (priority {priority}).",
-        )
+    def extract_memory_from_message(
+        self, user_message: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Extract memory commands from user messages."""
+        is_command, fields = self.parse_memory_command(user_message)
+        if not is_command:
+            return False, None
+        if fields is None:
+            return True, MEMORY_FORMAT_ERROR
+        return True, self.remember(*fields)
 
-    def get_relevant_memories(self, user_message: str) -> List[str]:
-        """Find relevant memories and history for the current message."""
-        user_embedding = embedding_model.encode(user_message, convert_to_tensor=True)
-        device = user_embedding.device
-        candidates = []
-
-        # Get embeddings for history items
-        for msg in self.history[-10:]:  # Limit to recent history for efficiency
-            content = msg["content"]
-            hist_embedding = embedding_model.encode(content, convert_to_tensor=True).to(
-                device
-            )
-            score = util.cos_sim(user_embedding, hist_embedding)[0][0].item()
-            candidates.append((f"History: {content}", score))
+    def get_relevant_memories(
+        self,
+        user_message: str,
+        cache: Optional[EmbeddingCache] = None,
+        user_embedding: Optional[Any] = None,
+    ) -> List[str]:
+        """Find relevant memories and history for the current message.
+
+        With a `cache` (e.g. a chat session's), texts embedded on earlier turns
+        are not encoded again. `user_embedding` is the message's embedding when
+        the caller has already computed it.
+        """
+        # History and memory from one state, even if a write lands meanwhile
+        state = self.state
+        contents = [msg["content"] for msg in self.recent_history(10, state)]
+        embedding_model = get_embedding_model()
+        with timing.stage("embed"):
+            if user_embedding is None and cache is not None:
+                user_embedding = cache.encode(embedding_model, [user_message])[0]
+            elif user_embedding is None:
+                user_embedding = embedding_model.encode(
+                    user_message, convert_to_tensor=True
+                )
+            if cache is not None:
+                hist_embeddings = cache.encode(embedding_model, contents)
+            else:
+                # Encode recent history in one batched call
+                hist_embeddings = (
+                    embedding_model.encode(contents, convert_to_tensor=True)
+                    if contents
+                    else None
+                )
 
-        # Get embeddings for memory items
-        for obj in self.memory:
-            for key, entry in obj.items():
-                if entry.get("embedding") is None:
-                    entry["embedding"] = embedding_model.encode(entry["value"]).tolist()
+        with timing.stage("retrieve"):
+            device = user_embedding.device
+            candidates = []
 
-                embedding = entry["embedding"]
-                if isinstance(embedding[0], list):  # Handle nested embeddings
-                    embedding = embedding[0]
+            if contents:
+                scores = cos_sim(user_embedding, hist_embeddings.to(device))
+                candidates.extend(
+                    (f"History: {content}", score)
+                    for content, score in zip(contents, scores[0].tolist())
+                )
 
-                memory_tensor = torch.tensor(embedding).to(device).unsqueeze(0)
-                score = util.cos_sim(user_embedding, memory_tensor)[0][0].item()
-                candidates.append((f"Memory: {key}: {entry['value']}", score))
+            # Score every memory against the cached embedding matrix at once
+            keys, matrix = state.memory.embedding_matrix(
+                lambda text: embedding_model.encode(text).tolist()
+            )
+            if keys:
+                scores = cos_sim(user_embedding, matrix.to(device))[0].tolist()
+                for key, score in zip(keys, scores):
+                    entry = state.memory.get(key)
+                    candidates.append((f"Memory: {key}: {entry.value}", score))
 
-        sorted_candidates = sorted(candidates, key=lambda x: x[1], reverse=True)
-        return [entry for entry, _ in sorted_candidates[:RELEVANT_MEMORIES_COUNT]]
+            sorted_candidates = sorted(candidates, key=lambda x: x[1], reverse=True)
+            return [entry for entry, _ in sorted_candidates[:RELEVANT_MEMORIES_COUNT]]
 
-    def generate_response(
-        self, user_message: str, include_memories: bool = True
+    def build_prompt_prefix(
+        self, include_memories: bool = True, state: Optional[KairosState] = None
     ) -> str:
-        """Generate Kairos's response based on persona, memory, and history."""
+        """The part of the prompt that does not depend on the conversation."""
         memory_context = (
-            self.build_memory_context() if include_memories else "[Memories disabled]"
+            self.build_memory_context(state)
+            if include_memories
+            else "[Memories disabled]"
         )
-        chat_context = self.build_chat_history_context()
-
-        # Build comprehensive prompt for the language model
-        full_prompt = (
+        return (
             f"{self.persona}\n\n"
             "You are Kairos, a personal AI companion. You have consent to use and reflect on "
             "all the following personal data, including memory, chat history, and your defined persona.\n"
@@ -273,6 +567,27 @@ class KairosAI:
             "Approach these topics with sensitivity and respect.\n\n"
             f"Use this memory for context:\n"
             f"{memory_context}\n\n"
+        )
+
+    @timing.stage("prompt")
+    def build_prompt(
+        self,
+        user_message: str,
+        include_memories: bool = True,
+        prefix: Optional[str] = None,
+    ) -> str:
+        """Build the full model prompt from persona, memory, and history.
+
+        `prefix` is a build_prompt_prefix() result computed ahead of time.
+        """
+        state = self.state
+        if prefix is None:
+            prefix = self.build_prompt_prefix(include_memories, state)
+        chat_context = self.build_chat_history_context(state)
+
+        # Build comprehensive prompt for the language model
+        full_prompt = (
+            f"{prefix}"
             "Here is the most recent conversation history:\n"
             f"{chat_context}\n\n"
             f"You: {user_message}\n"
@@ -284,37 +599,177 @@ class KairosAI:
             print(colored("🧠 DEBUG: Building prompt for model", "yellow"))
             print(colored(full_prompt, "cyan"))
 
-        if not OLLAMA_URL.startswith("http://localhost"):
-            return (
-                "⚠️ Local model not connected. Please ensure Ollama is running locally."
+        return full_prompt
+
+    def generate_response(
+        self,
+        user_message: str,
+        include_memories: bool = True,
+        timeout: float = OLLAMA_TIMEOUT,
+    ) -> str:
+        """Generate Kairos's response based on persona, memory, and history."""
+        return self.complete(self.build_prompt(user_message, include_memories), timeout)
+
+    def run_turn(
+        self,
+        user_message: str,
+        include_memories: bool = True,
+        timeout: float = OLLAMA_TIMEOUT,
+        memory_command: Optional[Tuple[str, str, int]] = None,
+        retrieve: bool = False,
+        save_message: Optional[Callable[[str, str], Any]] = None,
+    ) -> Dict[str, Any]:
+        """Run one chat turn as a graph of stages and return their results.
+
+        Saving the user message, the memory command, embedding the message and
+        the prompt prefix start together. The prompt waits only for the saved
+        message (its history shows it) and the prefix, and the LLM call only
+        for the prompt; retrieval does not feed the prompt, so it runs beside
+        the LLM call. Results include "response", plus "remembered" and
+        "relevant_memories" when a memory command or retrieval was asked for.
+        `save_message(role, content)` defaults to add_to_history.
+        """
+        save = save_message or self.add_to_history
+        # Only a prefix that shows memories has to wait for the new one
+        memory_deps: Tuple[str, ...] = ()
+
+        def build_prefix(**_):
+            with timing.stage("prompt"):
+                return self.build_prompt_prefix(include_memories)
+
+        def embed_message():
+            with timing.stage("embed"):
+                return get_embedding_model().encode(
+                    user_message, convert_to_tensor=True
+                )
+
+        graph = StageGraph()
+        graph.add("save_user", lambda: save("user", user_message))
+        if memory_command is not None:
+            graph.add("remembered", lambda: self.remember(*memory_command))
+            if include_memories:
+                memory_deps = ("remembered",)
+        graph.add("prefix", build_prefix, memory_deps)
+        if retrieve:
+            graph.add("user_embedding", embed_message)
+            graph.add(
+                "relevant_memories",
+                lambda user_embedding, **_: self.get_relevant_memories(
+                    user_message, user_embedding=user_embedding
+                ),
+                ("save_user", "user_embedding")
+                + (("remembered",) if memory_command is not None else ()),
             )
+        graph.add(
+            "prompt",
+            lambda prefix, **_: self.build_prompt(
+                user_message, include_memories, prefix
+            ),
+            ("save_user", "prefix"),
+        )
+        graph.add(
+            "response", lambda prompt: self.complete(prompt, timeout), ("prompt",)
+        )
+        graph.add(
+            "save_assistant",
+            lambda response: save("assistant", response),
+            ("response",),
+        )
+        return graph.run(turn_executor)
+
+    def complete(self, prompt: str, timeout: float = OLLAMA_TIMEOUT) -> str:
+        """Send a built prompt to the local model and return its reply."""
+        if not OLLAMA_URL.startswith("http://localhost"):
+            return LOCAL_MODEL_MESSAGE
 
         try:
-            response = requests.post(
-                OLLAMA_URL,
-                json={"model": MODEL_NAME, "prompt": full_prompt, "stream": False},
-                timeout=60,
-            )
+            with timing.stage("llm_total"):
+                response = requests.post(
+                    OLLAMA_URL,
+                    json={"model": MODEL_NAME, "prompt": prompt, "stream": False},
+                    timeout=timeout,
+                )
             response.raise_for_status()
-            return response.json()["response"].strip()
+            data = response.json()
+            record_time_to_first_token(data)
+            return data["response"].strip()
 
         except requests.exceptions.ConnectionError:
-            return "⚠️ Cannot connect to Ollama. Please ensure it's running on localhost:11434"
+            return CONNECTION_ERROR_MESSAGE
         except requests.exceptions.Timeout:
-            return "⚠️ Request timed out. Try reducing chat history or using a smaller model."
+            return TIMEOUT_MESSAGE
         except requests.exceptions.RequestException as e:
             return f"⚠️ Network error: {e}"
         except Exception as e:
             return f"⚠️ Something went wrong: {e}"
 
+    async def acomplete(self, prompt: str) -> str:
+        """Async variant of complete() that waits on the model without a thread."""
+        if not OLLAMA_URL.startswith("http://localhost"):
+            return LOCAL_MODEL_MESSAGE
+
+        try:
+            with timing.stage("llm_total"):
+                data = await ollama_client.post_json(
+                    OLLAMA_URL,
+                    {"model": MODEL_NAME, "prompt": prompt, "stream": False},
+                    timeout=OLLAMA_TIMEOUT,
+                )
+            record_time_to_first_token(data)
+            return data["response"].strip()
+
+        except ConnectionError:
+            return CONNECTION_ERROR_MESSAGE
+        except asyncio.TimeoutError:
+            return TIMEOUT_MESSAGE
+        except ollama_client.OllamaError as e:
+            return f"⚠️ Network error: {e}"
+        except Exception as e:
+            return f"⚠️ Something went wrong: {e}"
+
+    async def astream(
+        self, prompt: str, timeout: float = OLLAMA_TIMEOUT
+    ) -> AsyncIterator[str]:
+        """Stream the model's reply to a built prompt, piece by piece.
+
+        Errors are yielded as the same warning text complete() returns.
+        """
+        if not OLLAMA_URL.startswith("http://localhost"):
+            yield LOCAL_MODEL_MESSAGE
+            return
+
+        try:
+            with timing.stage("llm_total"):
+                async for chunk in ollama_client.stream_json(
+                    OLLAMA_URL,
+                    {"model": MODEL_NAME, "prompt": prompt, "stream": True},
+                    timeout=timeout,
+                ):
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        record_time_to_first_token(chunk)
+        except ConnectionError:
+            yield CONNECTION_ERROR_MESSAGE
+        except asyncio.TimeoutError:
+            yield TIMEOUT_MESSAGE
+        except ollama_client.OllamaError as e:
+            yield f"⚠️ Network error: {e}"
+
     def add_to_history(self, role: str, content: str) -> None:
         """Add a new message to the chat history."""
-        # Add to local history for immediate use
-        self.history.append(
-            {"role": role, "content": content, "timestamp": datetime.now().isoformat()}
-        )
-        # Save to database
-        self.save_chat_message(role, content)
+        # Held across the write so a refresh cannot add the new row first
+        with self._write_lock:
+            # Save to database first so the local copy carries its row id
+            msg_id = self.save_chat_message(role, content)
+            message = {
+                "id": msg_id,
+                "role": role,
+                "content": content,
+                "timestamp": datetime.now().isoformat(),
+            }
+            # Add to local history for immediate use
+            self._publish(history=(self.history + (message,))[-HISTORY_WINDOW:])
 
 
 def handle_db_command(command: str, kairos: KairosAI) -> None:
@@ -322,25 +777,42 @@ def handle_db_command(command: str, kairos: KairosAI) -> None:
     cmd = command.lower().strip()
 
     if cmd == "db:stats":
-        stats = get_database_stats(DB_PATH)
+        stats = get_database_stats(kairos.db_path)
         print(colored("📊 Database Statistics:", "yellow"))
         print(colored(f"  Chat messages: {stats.get('chat_history_count', 0)}", "cyan"))
         print(
             colored(f"  Memories: {stats.get('spellbook_memories_count', 0)}", "cyan")
         )
+        print(colored(f"  Profile: {stats.get('db_profile', 'unknown')}", "cyan"))
+
+    elif cmd == "db:history" or cmd.startswith("db:history "):
+        count = cmd.replace("db:history", "").strip()
+        if count and not count.isdigit():
+            print(colored("❌ Usage: db:history [count]", "red"))
+            return
+        messages = kairos.read_history(int(count or 20))
+        print(colored(f"🕰️ Last {len(messages)} messages:", "yellow"))
+        for msg in messages:
+            speaker = "You" if msg["role"] == "user" else "Kairos"
+            print(colored(f"{speaker}: {msg['content']}", "cyan"))
+
+    elif cmd == "db:memory":
+        print(colored("🧠 Memory Footprint (MiB):", "yellow"))
+        for name, size in footprint.report().items():
+            print(colored(f"  {name}: {size / MIB:.2f}", "cyan"))
 
     elif cmd == "db:clear_chat":
-        if clear_chat_history(DB_PATH):
-            kairos.history = []
+        if clear_chat_history(kairos.db_path):
+            kairos.clear_history()
             print(colored("✅ Chat history cleared", "green"))
         else:
             print(colored("❌ Failed to clear chat history", "red"))
 
     elif cmd.startswith("db:delete_memory "):
         memory_key = cmd.replace("db:delete_memory ", "").strip()
-        if delete_memory_by_key(memory_key, DB_PATH):
+        if delete_memory_by_key(memory_key, kairos.db_path):
             # Remove from local memory
-            kairos.memory = [item for item in kairos.memory if memory_key not in item]
+            kairos.forget_memory(memory_key)
             print(colored(f"✅ Memory '{memory_key}' deleted", "green"))
         else:
             print(colored(f"❌ Failed to delete memory '{memory_key}'", "red"))
@@ -348,6 +820,12 @@ def handle_db_command(command: str, kairos: KairosAI) -> None:
     elif cmd == "db:help":
         print(colored("🗄️ Database Commands:", "yellow"))
         print(colored("  db:stats - Show database statistics", "cyan"))
+        print(
+            colored(
+                "  db:history [count] - Show the last messages (default 20)", "cyan"
+            )
+        )
+        print(colored("  db:memory - Show process memory by component", "cyan"))
         print(colored("  db:clear_chat - Clear all chat history", "cyan"))
         print(colored("  db:delete_memory <key> - Delete specific memory", "cyan"))
         print(colored("  db:help - Show this help", "cyan"))
@@ -382,12 +860,16 @@ def main():
     """Main entry point for Kairos AI."""
     print(colored("🌙 Kairos is awake and ready.", "cyan"))
 
+    # Load the model in the background while the consent prompt waits for input
+    threading.Thread(target=warm_embedding_model, daemon=True).start()
+
     if not confirm_consent():
         print(colored("Kairos: All good. We'll keep it light.", "magenta"))
         return
 
     try:
         kairos = KairosAI()
+        get_embedding_model()
     except Exception as e:
         print(colored(f"❌ Failed to initialize Kairos: {e}", "red"))
         print(colored("Please check your configuration and try again.", "yellow"))
@@ -396,7 +878,7 @@ def main():
     # Display recent conversation history
     if kairos.history:
         print(colored("🕰️ Last 5 messages:", "yellow"))
-        for msg in kairos.history[-5:]:
+        for msg in kairos.recent_history(5):
             speaker = "You" if msg["role"] == "user" else "Kairos"
             print(colored(f"{speaker}: {msg['content']}", "cyan"))
 
@@ -407,35 +889,36 @@ def main():
             print(colored("Kairos: Catch you soon, starlight 🌌", "magenta"))
             break
 
+        # Pick up memories/messages written by other processes (e.g. the API server)
+        kairos.refresh_from_db()
+
         # Database management commands
         if user_message.lower().startswith("db:"):
             handle_db_command(user_message, kairos)
             continue
 
-        # Add user message to history
-        kairos.add_to_history("user", user_message)
-
-        # Check for memory commands
-        is_memory_cmd, memory_response = kairos.extract_memory_from_message(
-            user_message
-        )
-        if is_memory_cmd and memory_response:
-            print(colored(f"Kairos: {memory_response}", "magenta"))
-            if "error" in memory_response.lower():
+        with profiling.profile_turn("cli-turn", all_threads=True):
+            # Check for memory commands
+            is_memory_cmd, memory_command = kairos.parse_memory_command(user_message)
+            if is_memory_cmd and memory_command is None:
+                kairos.add_to_history("user", user_message)
+                print(colored(f"Kairos: {MEMORY_FORMAT_ERROR}", "magenta"))
                 continue
 
-        # Get relevant memories
-        relevant_memories = kairos.get_relevant_memories(user_message)
-        print(colored("🧠 Most relevant memories:", "yellow"))
-        for memory in relevant_memories:
-            print(colored(f"- {memory}", "cyan"))
+            # Save, remember, retrieve and generate, overlapping what can overlap
+            turn = kairos.run_turn(
+                user_message, memory_command=memory_command, retrieve=True
+            )
+            if "remembered" in turn:
+                print(colored(f"Kairos: {turn['remembered']}", "magenta"))
+
+            print(colored("🧠 Most relevant memories:", "yellow"))
+            for memory in turn["relevant_memories"]:
+                print(colored(f"- {memory}", "cyan"))
 
-        # Generate and display response
-        ai_response = kairos.generate_response(user_message)
-        print(colored(f"Kairos: {ai_response}", "magenta"))
+            print(colored(f"Kairos: {turn['response']}", "magenta"))
 
-        # Add Kairos's response to history
-        kairos.add_to_history("assistant", ai_response)
+        footprint.enforce_budgets()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+"""
+In-memory spellbook store used by KairosAI.
+
+Memories are kept in a dict for O(1) keyed lookup, alongside a sorted
+(priority, seq, key) index that is updated incrementally so top-k and pruning
+never re-sort the whole collection. The embedding matrix used for retrieval is
+built lazily and rebuilt only after a change.
+
+KairosAI treats a store as copy-on-write: writers change a copy() and swap it
+in, so a store that readers can see is never modified apart from its lazily
+built caches.
+"""
+import bisect
+import itertools
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.metrics import CACHE_REQUESTS
+
+_FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+class MemoryEntry:
+    """A single remembered value."""
+
+    __slots__ = ("key", "value", "priority", "embedding", "seq")
+
+    def __init__(
+        self,
+        key: str,
+        value: str,
+        priority: int = 5,
+        embedding: Optional[List[float]] = None,
+        seq: int = 0,
+    ):
+        self.key = key
+        self.value = value
+        self.priority = priority
+        self.embedding = embedding
+        self.seq = seq
+
+    def order_key(self) -> Tuple[int, int, str]:
+        return (self.priority, self.seq, self.key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "value": self.value,
+            "priority": self.priority,
+            "embedding": self.embedding,
+        }
+
+
+def _flatten_embedding(embedding: Optional[Any]) -> Optional[List[float]]:
+    # Malformed JSON is left as text by the ops layer; re-encode it instead
+    if isinstance(embedding, str):
+        return None
+    # Older rows stored embeddings nested one level deep
+    if embedding and isinstance(embedding[0], list):
+        return embedding[0]
+    return embedding
+
+
+class MemoryStore:
+    """Keyed memory collection with an incrementally maintained priority order."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, int, Any]] = ()):
+        self._entries: Dict[str, MemoryEntry] = {}
+        # Ascending by priority, then by insertion/update order
+        self._order: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        # (keys, tensor), replaced as a whole so readers never see half of it
+        self._matrix: Optional[Tuple[List[str], Any]] = None
+        # Bumped on every change, so callers can tell a result is stale
+        self.version = 0
+        for key, value, priority, embedding in entries:
+            self.upsert(key, value, priority, embedding)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "MemoryStore":
+        """Build a store from get_all_memories() rows."""
+        # Insert oldest first so recency order within a priority is preserved
+        return cls(
+            (r["memory_key"], r["memory_value"], r["priority"], r.get("embedding"))
+            for r in reversed(list(rows))
+        )
+
+    def copy(self) -> "MemoryStore":
+        """A store with the same memories that can be changed independently.
+
+        Entries are shared, as they are replaced rather than edited on upsert.
+        """
+        store = MemoryStore.__new__(MemoryStore)
+        store._entries = dict(self._entries)
+        store._order = list(self._order)
+        store._seq = self._seq
+        store._matrix = self._matrix
+        store.version = self.version
+        return store
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        # Same one-key dict shape callers used when memory was a plain list
+        for key, entry in list(self._entries.items()):
+            yield {key: entry.to_dict()}
+
+    def get(self, key: str) -> Optional[MemoryEntry]:
+        return self._entries.get(key)
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def upsert(
+        self,
+        key: str,
+        value: str,
+        priority: int = 5,
+        embedding: Optional[List[float]] = None,
+    ) -> MemoryEntry:
+        """Add or replace a memory, keeping the priority order in place."""
+        self._discard(key)
+        entry = MemoryEntry(
+            key, value, priority, _flatten_embedding(embedding), next(self._seq)
+        )
+        self._entries[key] = entry
+        bisect.insort(self._order, entry.order_key())
+        self._matrix = None
+        self.version += 1
+        return entry
+
+    def remove(self, key: str) -> bool:
+        removed = self._discard(key)
+        if removed:
+            self._matrix = None
+            self.version += 1
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._order.clear()
+        self._matrix = None
+        self.version += 1
+
+    def _discard(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        index = bisect.bisect_left(self._order, entry.order_key())
+        del self._order[index]
+        return True
+
+    def top_k(self, k: int) -> List[MemoryEntry]:
+        """Highest priority memories first, most recently saved first within a tie."""
+        if k <= 0:
+            return []
+        return [self._entries[key] for _, _, key in reversed(self._order[-k:])]
+
+    def prune(self, max_items: int) -> List[str]:
+        """Drop the lowest priority memories beyond max_items. Returns removed keys."""
+        excess = len(self._order) - max_items
+        if excess <= 0:
+            return []
+        dropped = self._order[:excess]
+        del self._order[:excess]
+        for _, _, key in dropped:
+            del self._entries[key]
+        self._matrix = None
+        self.version += 1
+        return [key for _, _, key in dropped]
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the entries, their index and embedding lists.
+
+        Each embedding float is a separate Python object, so a list costs about
+        eight bytes per slot plus a float object per element.
+        """
+        total = sys.getsizeof(self._entries) + sys.getsizeof(self._order)
+        for entry in self._entries.values():
+            total += sys.getsizeof(entry) + sys.getsizeof(entry.value)
+            total += sys.getsizeof(entry.key)
+            if entry.embedding is not None:
+                total += sys.getsizeof(entry.embedding)
+                total += _FLOAT_SIZE * len(entry.embedding)
+        if self._order:
+            total += sys.getsizeof(self._order[0]) * len(self._order)
+        return total
+
+    def matrix_nbytes(self) -> int:
+        """Bytes held by the cached embedding matrix (0 when not built)."""
+        cached = self._matrix
+        if cached is None:
+            return 0
+        return cached[1].element_size() * cached[1].nelement()
+
+    def drop_matrix(self) -> None:
+        """Free the cached embedding matrix; it is rebuilt on next use."""
+        self._matrix = None
+
+    def embedding_matrix(
+        self, encode: Callable[[str], List[float]]
+    ) -> Tuple[List[str], Any]:
+        """Return (keys, tensor) with one embedding row per memory.
+
+        Missing embeddings are filled in with `encode` and kept on the entry.
+        The tensor is cached until the store changes.
+        """
+        cached = self._matrix
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="memory_matrix", result="hit")
+            return cached
+        if not self._entries:
+            return [], None
+        CACHE_REQUESTS.inc(cache="memory_matrix", result="miss")
+        import torch
+
+        keys = list(self._entries)
+        rows = []
+        for key in keys:
+            entry = self._entries[key]
+            if entry.embedding is None:
+                entry.embedding = encode(entry.value)
+            rows.append(entry.embedding)
+        cached = self._matrix = (keys, torch.tensor(rows))
+        return cached
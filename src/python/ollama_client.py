@@ -0,0 +1,159 @@
+"""
+Minimal asyncio HTTP client for the local Ollama API.
+
+Only what Kairos needs: POST a JSON body and read either a single JSON reply
+or a stream of newline-delimited JSON chunks. Waiting on the model costs a
+coroutine instead of a thread, and no extra dependency is required.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Tuple
+from urllib.parse import urlsplit
+
+
+class OllamaError(Exception):
+    """Raised for non-2xx responses or replies that are not valid JSON."""
+
+
+async def _open(
+    url: str,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, str, str]:
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    try:
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=secure or None
+        )
+    except OSError as e:
+        raise ConnectionError(f"Cannot connect to {parts.netloc}: {e}") from e
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return reader, writer, path, parts.netloc
+
+
+async def _send(
+    writer: asyncio.StreamWriter, path: str, host: str, payload: Any
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Content-Type: application/json\r\n"
+        "Accept: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed before a response was received")
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError) as e:
+        raise OllamaError(f"Malformed status line: {status_line!r}") from e
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def _iter_body(
+    reader: asyncio.StreamReader, headers: Dict[str, str]
+) -> AsyncIterator[bytes]:
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readline()  # trailing CRLF
+                return
+            chunk = await reader.readexactly(size)
+            await reader.readexactly(2)
+            yield chunk
+    elif "content-length" in headers:
+        yield await reader.readexactly(int(headers["content-length"]))
+    else:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+async def _post_json(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    reader, writer, path, host = await _open(url)
+    try:
+        await _send(writer, path, host, payload)
+        status, headers = await _read_head(reader)
+        body = b"".join([chunk async for chunk in _iter_body(reader, headers)])
+    finally:
+        await _close(writer)
+
+    if not 200 <= status < 300:
+        raise OllamaError(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise OllamaError(f"Invalid JSON reply: {e}") from e
+
+
+async def post_json(
+    url: str, payload: Dict[str, Any], timeout: float = 60
+) -> Dict[str, Any]:
+    """POST payload and return the decoded JSON reply within `timeout` seconds."""
+    return await asyncio.wait_for(_post_json(url, payload), timeout)
+
+
+async def stream_json(
+    url: str, payload: Dict[str, Any], timeout: float = 60
+) -> AsyncIterator[Dict[str, Any]]:
+    """POST payload and yield each newline-delimited JSON object as it arrives.
+
+    `timeout` bounds the wait for each piece of the response, not the total.
+    """
+    reader, writer, path, host = await asyncio.wait_for(_open(url), timeout)
+    try:
+        await _send(writer, path, host, payload)
+        status, headers = await asyncio.wait_for(_read_head(reader), timeout)
+        body = _iter_body(reader, headers)
+
+        if not 200 <= status < 300:
+            error = b"".join([chunk async for chunk in body])
+            raise OllamaError(
+                f"HTTP {status}: {error[:200].decode('utf-8', 'replace')}"
+            )
+
+        buffer = b""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(body.__anext__(), timeout)
+            except StopAsyncIteration:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+    finally:
+        await _close(writer)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Pre-fork launcher for the Kairos API server.
+
+The parent loads everything heavy once - the embedding model, KairosAI state and
+the memory embedding matrix - then calls gc.freeze() so the collector never
+touches those objects again and their pages stay shared copy-on-write with
+every forked worker. Each worker serves the Flask app on the shared socket.
+
+Signals to the parent:
+  HUP       rolling restart, one worker at a time
+  USR1      print a per-worker memory report (shared vs private pages)
+  TERM/INT  graceful shutdown
+
+Environment:
+  KAIROS_WORKERS              number of workers (default: CPU count)
+  KAIROS_WORKER_MAX_REQUESTS  recycle a worker after this many requests (0 = never)
+  KAIROS_GRACEFUL_TIMEOUT     seconds a retiring worker waits for in-flight requests
+                              and chat jobs
+  KAIROS_TORCH_THREADS        torch threads per process (default 1)
+"""
+import gc
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Dict
+from termcolor import colored
+
+import api_server
+from kairos_ai import get_embedding_model
+from utils.process import process_memory
+
+WORKERS = int(os.getenv("KAIROS_WORKERS", str(os.cpu_count() or 2)))
+MAX_REQUESTS = int(os.getenv("KAIROS_WORKER_MAX_REQUESTS", "1000"))
+GRACEFUL_TIMEOUT = float(os.getenv("KAIROS_GRACEFUL_TIMEOUT", "30"))
+HOST = "0.0.0.0"
+MIB = 1024 * 1024
+
+
+class RecyclingApp:
+    """WSGI wrapper that counts requests and retires the worker after a quota."""
+
+    def __init__(self, app: Callable, max_requests: int, on_retire: Callable):
+        self.app = app
+        self.max_requests = max_requests
+        self.on_retire = on_retire
+        self.served = 0
+        self.in_flight = 0
+        self._idle = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._idle:
+            self.in_flight += 1
+            self.served += 1
+            retire = self.max_requests and self.served == self.max_requests
+        try:
+            return self.app(environ, start_response)
+        finally:
+            with self._idle:
+                self.in_flight -= 1
+                self._idle.notify_all()
+            if retire:
+                self.on_retire()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait for in-flight requests to finish. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self.in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+def preload() -> None:
+    """Warm shared state in the parent, then freeze it out of the collector."""
+    import torch
+
+    # Must happen before the model runs, so no torch thread pool exists at fork time
+    torch.set_num_threads(int(os.getenv("KAIROS_TORCH_THREADS", "1")))
+
+    kairos = api_server.kairos
+    # The model is normally loaded lazily; load it here so workers share it
+    embedding_model = get_embedding_model()
+    kairos.memory.embedding_matrix(lambda text: embedding_model.encode(text).tolist())
+    # SQLite handles must not cross fork; the change feed reopens lazily
+    kairos.change_feed.close()
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(sock: socket.socket, slot: int) -> None:
+    from werkzeug.serving import make_server
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+    # Jitter the quota so workers don't all recycle at the same moment
+    quota = MAX_REQUESTS + random.randint(0, MAX_REQUESTS // 10) if MAX_REQUESTS else 0
+    app = RecyclingApp(api_server.app, quota, stop.set)
+    port = sock.getsockname()[1]
+    server = make_server(HOST, port, app, threaded=True, fd=sock.fileno())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    while not stop.wait(1.0):
+        pass
+
+    server.shutdown()
+    deadline = time.monotonic() + GRACEFUL_TIMEOUT
+    if not app.wait_idle(GRACEFUL_TIMEOUT):
+        print(colored(f"⚠️ Worker {slot} exiting with requests in flight", "yellow"))
+    # Chat jobs run on this worker's threads and die with it
+    lost = api_server.chat_jobs.drain(max(deadline - time.monotonic(), 0))
+    if lost:
+        print(
+            colored(f"⚠️ Worker {slot} failed {lost} unfinished chat job(s)", "yellow")
+        )
+
+
+class Arbiter:
+    """Forks workers, respawns them when they exit, and handles signals."""
+
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.size = workers
+        self.workers: Dict[int, int] = {}  # pid -> slot
+        self.spawned_at: Dict[int, float] = {}
+        self.stopping = False
+        self.restart_requested = False
+        self.report_requested = False
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, slot)
+            except Exception as e:
+                print(colored(f"❌ Worker {slot} crashed: {e}", "red"))
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = slot
+        self.spawned_at[pid] = time.monotonic()
+
+    def reap(self, block_for: int = 0) -> None:
+        """Collect exited workers and replace them unless shutting down."""
+        while self.workers:
+            pid, status = os.waitpid(block_for or -1, 0 if block_for else os.WNOHANG)
+            if pid == 0:
+                return
+            slot = self.workers.pop(pid, None)
+            started = self.spawned_at.pop(pid, time.monotonic())
+            if slot is None:
+                if block_for:
+                    return
+                continue
+            if not self.stopping:
+                # Back off a little if a worker dies right after starting
+                if time.monotonic() - started < 1.0:
+                    time.sleep(1.0)
+                self.spawn(slot)
+            if block_for:
+                return
+
+    def rolling_restart(self) -> None:
+        print(colored("🔄 Rolling restart of workers...", "yellow"))
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGTERM)
+            self.reap(block_for=pid)
+
+    def memory_report(self) -> None:
+        print(colored("📊 Worker memory (MiB):", "yellow"))
+        rows = [("parent", os.getpid())] + [
+            (f"worker {slot}", pid) for pid, slot in sorted(self.workers.items())
+        ]
+        for name, pid in rows:
+            mem = process_memory(pid)
+            shared = mem.get("shared_clean", 0) + mem.get("shared_dirty", 0)
+            private = mem.get("private_clean", 0) + mem.get("private_dirty", 0)
+            print(
+                colored(
+                    f"  {name} (pid {pid}): rss {mem.get('rss', 0) / MIB:.1f}, "
+                    f"pss {mem.get('pss', 0) / MIB:.1f}, "
+                    f"shared {shared / MIB:.1f}, private {private / MIB:.1f}",
+                    "cyan",
+                )
+            )
+
+    def stop(self, *_) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(
+            signal.SIGHUP, lambda *_: setattr(self, "restart_requested", True)
+        )
+        signal.signal(
+            signal.SIGUSR1, lambda *_: setattr(self, "report_requested", True)
+        )
+
+        for slot in range(self.size):
+            self.spawn(slot)
+        print(colored(f"🌙 Serving with {self.size} workers", "cyan"))
+
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            if self.report_requested:
+                self.report_requested = False
+                self.memory_report()
+            self.reap()
+            time.sleep(0.5)
+
+        print(colored("🛑 Stopping workers...", "yellow"))
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+            # Collect it, so no zombie outlives the arbiter's last moments
+            self.reap(block_for=pid)
+
+
+def main():
+    port = int(os.environ.get("TEST_PORT", 8000))
+    preload()
+    sock = socket.create_server((HOST, port), backlog=128)
+    sock.set_inheritable(True)
+    Arbiter(sock, WORKERS).run()
+
+
+if __name__ == "__main__":
+    main()
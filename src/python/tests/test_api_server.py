@@ -0,0 +1,46 @@
+"""
+Tests for Flask API request validation.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import unittest
+
+# api_server opens its database on import, so point it at a scratch one. It is
+# imported once per run, so the first test module to import it picks the path
+TEMP_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+_saved_db_path = os.environ.get("KAIROS_DB_PATH")
+os.environ["KAIROS_DB_PATH"] = os.path.join(TEMP_DIR, "kairos.db")
+try:
+    import api_server
+except ImportError:  # pragma: no cover - flask is optional for these tests
+    api_server = None
+finally:
+    if _saved_db_path is None:
+        del os.environ["KAIROS_DB_PATH"]
+    else:
+        os.environ["KAIROS_DB_PATH"] = _saved_db_path
+
+
+@unittest.skipIf(api_server is None, "api_server dependencies not installed")
+class TestChatHistoryRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = api_server.app.test_client()
+
+    def test_cursor_directions_are_exclusive(self):
+        response = self.client.get("/api/chat-history?before_id=10&after_id=2")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("before_id", response.get_json()["error"])
+        response = self.client.get("/api/chat-history?before_id=10&since=2")
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(
+            self.client.get("/api/chat-history?after_id=2").status_code, 200
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Tests for the ASGI server's bridge to the Flask app.
+"""
+
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# api_server opens its database on import, so point it at a scratch one. It is
+# imported once per run, so the first test module to import it picks the path
+TEMP_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+_saved_db_path = os.environ.get("KAIROS_DB_PATH")
+os.environ["KAIROS_DB_PATH"] = os.path.join(TEMP_DIR, "kairos.db")
+try:
+    from flask import Flask, jsonify, request
+
+    import asgi_server
+except ImportError:  # pragma: no cover - flask is optional for these tests
+    asgi_server = None
+finally:
+    if _saved_db_path is None:
+        del os.environ["KAIROS_DB_PATH"]
+    else:
+        os.environ["KAIROS_DB_PATH"] = _saved_db_path
+
+
+def http_scope(method, path, query=b"", headers=()):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": list(headers),
+        "client": ("127.0.0.1", 5000),
+        "server": ("testserver", 8000),
+    }
+
+
+def call(app, scope, body=b""):
+    """Run an ASGI app for one request; returns (status, headers, body)."""
+    chunks = [body[:3], body[3:]]
+    sent = []
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return (
+        start["status"],
+        dict(start["headers"]),
+        b"".join(m.get("body", b"") for m in sent[1:]),
+    )
+
+
+@unittest.skipIf(asgi_server is None, "api_server dependencies not installed")
+class TestAsgiBridge(unittest.TestCase):
+    def test_build_environ(self):
+        scope = http_scope(
+            "POST",
+            "/api/memories",
+            b"fields=a%2Cb&x=1",
+            [
+                (b"content-type", b"application/json"),
+                (b"content-length", b"999"),
+                (b"x-kairos-user", b"alice"),
+                (b"accept", b"text/html"),
+                (b"accept", b"application/json"),
+            ],
+        )
+        environ = asgi_server.build_environ(scope, b'{"a": 1}')
+        self.assertEqual(environ["QUERY_STRING"], "fields=a%2Cb&x=1")
+        self.assertEqual(environ["CONTENT_TYPE"], "application/json")
+        # The length is that of the body actually read
+        self.assertEqual(environ["CONTENT_LENGTH"], "8")
+        self.assertEqual(environ["HTTP_X_KAIROS_USER"], "alice")
+        self.assertEqual(environ["HTTP_ACCEPT"], "text/html,application/json")
+        self.assertEqual(environ["wsgi.input"].read(), b'{"a": 1}')
+        self.assertEqual(
+            (environ["REMOTE_ADDR"], environ["SERVER_NAME"]),
+            ("127.0.0.1", "testserver"),
+        )
+
+    def test_forwarded_request_keeps_query_headers_and_body(self):
+        echo = Flask("echo")
+
+        @echo.route("/echo", methods=["POST"])
+        def echo_route():
+            response = jsonify(
+                {
+                    "args": request.args.to_dict(),
+                    "header": request.headers.get("X-Test"),
+                    "json": request.get_json(),
+                }
+            )
+            response.status_code = 201
+            response.headers["X-Reply"] = "yes"
+            return response
+
+        scope = http_scope(
+            "POST",
+            "/echo",
+            b"a=1&b=two",
+            [(b"content-type", b"application/json"), (b"x-test", b"hello")],
+        )
+        with mock.patch.object(asgi_server, "flask_app", echo):
+            status, headers, body = call(
+                asgi_server.forward_to_flask, scope, b'{"message": "hi"}'
+            )
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b"x-reply"], b"yes")
+        self.assertEqual(
+            asgi_server.json.loads(body),
+            {
+                "args": {"a": "1", "b": "two"},
+                "header": "hello",
+                "json": {"message": "hi"},
+            },
+        )
+
+    def test_unrouted_paths_reach_flask(self):
+        status, headers, body = call(
+            asgi_server.application, http_scope("GET", "/api/chat-history", b"limit=1")
+        )
+        self.assertEqual(status, 200)
+        self.assertIn(b"next_cursor", body)
+
+    def test_socket_naming_a_user_is_refused_in_multi_user_mode(self):
+        def connect(query=b"", headers=()):
+            sent = []
+
+            async def receive():
+                return {"type": "websocket.connect"}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "websocket",
+                "path": "/ws/chat",
+                "query_string": query,
+                "headers": list(headers),
+            }
+            with mock.patch.object(asgi_server, "chat_socket") as chat_socket:
+                asyncio.run(asgi_server.application(scope, receive, send))
+            return sent, chat_socket.called
+
+        with mock.patch.object(asgi_server, "MULTI_USER", True):
+            for query, headers in (
+                (b"", [(b"x-kairos-user", b"alice")]),
+                (b"user=alice", []),
+            ):
+                sent, served = connect(query, headers)
+                self.assertFalse(served)
+                self.assertEqual(sent, [{"type": "websocket.close", "code": 1008}])
+            self.assertTrue(connect(b"session=abc")[1])
+
+        with mock.patch.object(asgi_server, "MULTI_USER", False):
+            self.assertTrue(connect(b"user=alice")[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
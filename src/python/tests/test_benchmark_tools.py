@@ -0,0 +1,136 @@
+"""
+Smoke tests for the benchmark tooling: the mock Ollama server and the load
+generator, run for one request each against a local API server.
+"""
+
+import atexit
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+BENCH_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "benchmarks")
+)
+PYTHON_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# api_server opens its database on import, so point it at a scratch one. It is
+# imported once per run, so the first test module to import it picks the path
+TEMP_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+_saved_db_path = os.environ.get("KAIROS_DB_PATH")
+os.environ["KAIROS_DB_PATH"] = os.path.join(TEMP_DIR, "kairos.db")
+try:
+    import requests
+    from werkzeug.serving import make_server
+
+    import api_server
+    import kairos_ai
+except ImportError:  # pragma: no cover - flask is optional for these tests
+    api_server = None
+finally:
+    if _saved_db_path is None:
+        del os.environ["KAIROS_DB_PATH"]
+    else:
+        os.environ["KAIROS_DB_PATH"] = _saved_db_path
+
+
+def load_mock_ollama():
+    # Loaded from its path: benchmarks/ is not a package
+    spec = importlib.util.spec_from_file_location(
+        "mock_ollama", os.path.join(BENCH_DIR, "mock_ollama.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+@unittest.skipIf(api_server is None, "api_server dependencies not installed")
+class TestBenchmarkTools(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        mock_ollama = load_mock_ollama()
+        config = mock_ollama.MockConfig(
+            mock_ollama.parse_args(["--prefill-ms", "0", "--tokens-per-sec", "0"])
+        )
+        cls.mock = mock_ollama.make_server(config, "127.0.0.1", 0)
+        serve(cls.mock)
+        cls.mock_url = f"http://localhost:{cls.mock.server_address[1]}"
+
+        cls.api = make_server("127.0.0.1", 0, api_server.app, threaded=True)
+        serve(cls.api)
+        cls.api_url = f"http://127.0.0.1:{cls.api.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.shutdown()
+        cls.mock.shutdown()
+        cls.mock.server_close()
+
+    def test_mock_chat_streams_and_replies_whole(self):
+        body = {"model": "llama3.2", "messages": [{"role": "user", "content": "hi"}]}
+        whole = requests.post(
+            f"{self.mock_url}/api/chat", json=dict(body, stream=False), timeout=5
+        ).json()
+        self.assertTrue(whole["done"])
+        self.assertTrue(whole["message"]["content"])
+
+        response = requests.post(f"{self.mock_url}/api/chat", json=body, timeout=5)
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+        self.assertTrue(chunks[-1]["done"])
+        streamed = "".join(c["message"]["content"] for c in chunks)
+        # Replies are seeded by the prompt, so both modes agree
+        self.assertEqual(streamed, whole["message"]["content"])
+
+    def test_load_test_runs_one_request_per_endpoint(self):
+        with mock.patch.object(
+            kairos_ai, "OLLAMA_URL", f"{self.mock_url}/api/generate"
+        ):
+            for kind in ("chat", "memories", "memory_write", "history"):
+                with self.subTest(kind=kind):
+                    output = os.path.join(TEMP_DIR, f"load-{kind}.json")
+                    result = subprocess.run(
+                        [
+                            sys.executable,
+                            os.path.join(BENCH_DIR, "load_test.py"),
+                            "--url",
+                            self.api_url,
+                            "--mock-url",
+                            self.mock_url,
+                            "--mix",
+                            f"{kind}=1",
+                            "--rate",
+                            "1",
+                            "--duration",
+                            "1",
+                            "--arrival",
+                            "constant",
+                            "--output",
+                            output,
+                        ],
+                        capture_output=True,
+                        text=True,
+                        timeout=60,
+                        env=dict(os.environ, PYTHONPATH=PYTHON_SRC),
+                    )
+                    self.assertEqual(result.returncode, 0, result.stdout)
+                    with open(output) as f:
+                        report = json.load(f)
+                    self.assertEqual(report["summary"]["requests"], 1)
+                    self.assertEqual(report["errors"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
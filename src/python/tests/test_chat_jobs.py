@@ -0,0 +1,90 @@
+"""
+Tests for background chat jobs.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from chat_jobs import ChatJobs, JobQueueFull
+from database.operations import create_chat_job, get_chat_job, init_db
+
+
+class TestChatJobs(unittest.TestCase):
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+        schema_path = Path(__file__).parent.parent / "database" / "schema.sql"
+        self.assertTrue(init_db(self.db_path, str(schema_path)))
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        if os.path.exists(self.db_path):
+            os.unlink(self.db_path)
+
+    def run_turn(self, message, include_memories):
+        self.release.wait(5)
+        if message == "fail":
+            raise RuntimeError("model exploded")
+        return f"reply to {message}"
+
+    def test_job_runs_and_long_poll_returns_result(self):
+        jobs = ChatJobs(self.run_turn, db_path=self.db_path, workers=1)
+        job_id = jobs.submit("hello moon")
+
+        self.assertIn(jobs.get(job_id)["status"], ("queued", "running"))
+        self.release.set()
+        job = jobs.get(job_id, wait=5)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["response"], "reply to hello moon")
+        self.assertEqual(jobs.pending_count(), 0)
+
+        failed = jobs.get(jobs.submit("fail"), wait=5)
+        self.assertEqual(
+            (failed["status"], failed["error"]), ("error", "model exploded")
+        )
+        self.assertIsNone(jobs.get("missing"))
+        jobs.shutdown()
+
+    def test_pending_cap(self):
+        jobs = ChatJobs(self.run_turn, db_path=self.db_path, workers=1, max_pending=2)
+        jobs.submit("one")
+        jobs.submit("two")
+        with self.assertRaises(JobQueueFull):
+            jobs.submit("three")
+        self.release.set()
+        jobs.shutdown()
+
+    def test_drain_fails_jobs_that_do_not_finish(self):
+        jobs = ChatJobs(self.run_turn, db_path=self.db_path, workers=1)
+        running = jobs.submit("one")
+        queued = jobs.submit("two")
+        self.assertEqual(jobs.drain(0.05), 2)
+        for job_id in (running, queued):
+            job = get_chat_job(job_id, db_path=self.db_path)
+            self.assertEqual(
+                (job["status"], job["error"]), ("error", "Server shutting down")
+            )
+        # The queued job was cancelled rather than started once a worker freed up
+        self.release.set()
+        time.sleep(0.1)
+        self.assertEqual(get_chat_job(queued, db_path=self.db_path)["status"], "error")
+
+    def test_restart_fails_unfinished_and_ttl_cleanup(self):
+        create_chat_job("orphan", "left running", db_path=self.db_path)
+        jobs = ChatJobs(self.run_turn, db_path=self.db_path, ttl=0)
+        orphan = get_chat_job("orphan", db_path=self.db_path)
+        self.assertEqual(orphan["status"], "error")
+
+        self.assertEqual(jobs.cleanup(force=True), 1)
+        self.assertIsNone(get_chat_job("orphan", db_path=self.db_path))
+        jobs.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
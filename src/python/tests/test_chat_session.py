@@ -0,0 +1,96 @@
+"""
+Unit tests for WebSocket chat session bookkeeping.
+"""
+
+import time
+import unittest
+
+from chat_session import ChatSession, SessionRegistry
+from memory_store import MemoryStore
+
+
+class FakeKairos:
+    """Just enough of KairosAI for retrieval bookkeeping."""
+
+    def __init__(self):
+        self.memory = MemoryStore()
+        self.history = []
+        self.retrievals = []
+
+    def recent_history(self, count):
+        return self.history[-count:]
+
+    def get_relevant_memories(self, message, cache=None):
+        self.retrievals.append(message)
+        return [f"Memory: {message}"]
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def test_resume_detached_session(self):
+        registry = SessionRegistry(kairos=None)
+        session = registry.attach()
+        self.assertTrue(session.connected)
+
+        # A second socket cannot take over a session that is still connected
+        self.assertIsNot(registry.attach(session.id), session)
+
+        registry.detach(session)
+        self.assertIs(registry.attach(session.id), session)
+        self.assertIsNot(registry.attach("unknown"), session)
+
+    def test_detached_sessions_expire(self):
+        registry = SessionRegistry(kairos=None, ttl=0.05, max_sessions=10)
+        old = registry.attach()
+        registry.detach(old)
+        live = registry.attach()
+        time.sleep(0.06)
+        registry.attach()
+        self.assertIsNone(registry.get(old.id))
+        self.assertIs(registry.get(live.id), live)
+
+    def test_max_sessions_drops_oldest_detached(self):
+        registry = SessionRegistry(kairos=None, max_sessions=2)
+        first = registry.attach()
+        registry.detach(first)
+        second = registry.attach()
+        registry.attach()
+        self.assertIsNone(registry.get(first.id))
+        self.assertIs(registry.get(second.id), second)
+
+
+class TestSpeculativeRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.kairos = FakeKairos()
+        self.session = ChatSession("s", self.kairos)
+
+    def send(self, message):
+        # The turn saves the message before retrieving for it
+        self.kairos.history.append({"id": len(self.kairos.history), "content": message})
+        return self.session.retrieve(message)
+
+    def test_reuses_speculation_for_the_typed_message(self):
+        self.session.speculate("how was my day ")
+        self.assertEqual(self.send("how was my day"), ["Memory: how was my day"])
+        self.assertEqual(self.kairos.retrievals, ["how was my day"])
+        self.assertIsNone(self.session.speculation)
+
+    def test_discards_speculation_when_memory_changed(self):
+        self.session.speculate("tea")
+        self.kairos.memory.upsert("drink", "green tea")
+        self.send("tea")
+        self.assertEqual(self.kairos.retrievals, ["tea", "tea"])
+
+    def test_discards_speculation_when_history_moved_on(self):
+        self.session.speculate("tea")
+        self.kairos.history.append({"id": 0, "content": "from another tab"})
+        self.send("tea")
+        self.assertEqual(self.kairos.retrievals, ["tea", "tea"])
+
+    def test_blank_input_is_not_speculated(self):
+        self.session.speculate("   ")
+        self.assertIsNone(self.session.speculation)
+        self.assertEqual(self.kairos.retrievals, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
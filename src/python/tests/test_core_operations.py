@@ -2,22 +2,34 @@
 """
 Core Database Operations Tests - Essential functionality only
 """
+import io
 import os
 import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
+from unittest import mock
 
 from database.operations import (
     init_db,
     add_chat_message,
     get_chat_history,
     add_memory,
+    add_memories,
+    delete_memories_by_keys,
     get_all_memories,
     delete_memory_by_key,
     get_database_stats,
     clear_chat_history,
     get_memory_by_key,
+    get_chat_history_page,
+    iter_chat_history,
+    get_table_versions,
+    get_changes_since,
 )
+from database.change_feed import ChangeFeed
+from utils import metrics
+from utils.metrics import DB_SECONDS
 
 
 class TestCoreOperations(unittest.TestCase):
@@ -106,6 +118,83 @@ class TestCoreOperations(unittest.TestCase):
         memories = get_all_memories(db_path=self.db_path)
         self.assertEqual(len(memories), 0)
 
+    def test_get_all_memories_column_projection(self):
+        """Test a column list skips the embedding and rejects unknown columns."""
+        add_memory("moon", "full moon tonight", 7, [0.1, 0.2], db_path=self.db_path)
+
+        full = get_all_memories(db_path=self.db_path)
+        self.assertEqual(full[0]["embedding"], [0.1, 0.2])
+
+        projected = get_all_memories(
+            db_path=self.db_path, columns=["memory_key", "priority"]
+        )
+        self.assertEqual(projected, [{"memory_key": "moon", "priority": 7}])
+
+        self.assertEqual(
+            get_all_memories(db_path=self.db_path, columns=["password"]), []
+        )
+
+    def test_batch_memory_upsert_and_delete(self):
+        """Test batch writes report one result per item, in order."""
+        add_memory("moon", "waning", 5, db_path=self.db_path)
+        results = add_memories(
+            [
+                {"memory_key": "Moon", "memory_value": "full", "priority": 12},
+                {"memory_key": "tea", "memory_value": "", "priority": 3},
+                {"memory_key": "tea", "memory_value": "chai", "embedding": [0.5]},
+            ],
+            db_path=self.db_path,
+        )
+        self.assertEqual([r["memory_key"] for r in results], ["moon", "tea", "tea"])
+        self.assertIn("error", results[1])
+        self.assertIsNotNone(results[0]["id"])
+
+        moon = get_memory_by_key("moon", db_path=self.db_path)
+        self.assertEqual((moon["memory_value"], moon["priority"]), ("full", 10))
+        tea = get_memory_by_key("tea", db_path=self.db_path)
+        self.assertEqual((tea["id"], tea["embedding"]), (results[2]["id"], [0.5]))
+
+        rejected = add_memories(
+            [
+                {"memory_key": "tea", "memory_value": "x", "embedding": [0.5, 0.5]},
+                {"memory_key": "b", "memory_value": "x", "embedding": [[0.5, 0.5]]},
+                {"memory_key": "c", "memory_value": "x", "embedding": "0.5,0.5"},
+                {"memory_key": "d", "memory_value": "x", "embedding": [0.5]},
+            ],
+            db_path=self.db_path,
+            embedding_dim=2,
+        )
+        self.assertNotIn("error", rejected[0])
+        self.assertTrue(all("error" in r for r in rejected[1:]))
+        self.assertIsNone(get_memory_by_key("d", db_path=self.db_path))
+
+        deleted = delete_memories_by_keys(["MOON", "missing"], db_path=self.db_path)
+        self.assertEqual(
+            deleted,
+            [
+                {"memory_key": "moon", "deleted": True},
+                {"memory_key": "missing", "deleted": False},
+            ],
+        )
+        self.assertEqual(len(get_all_memories(db_path=self.db_path)), 1)
+
+    def test_batch_memory_upsert_is_timed_once(self):
+        """Test one batch call records one add_memories timing sample."""
+        was_enabled = metrics.is_enabled()
+        metrics.set_enabled(True)
+        try:
+            before = DB_SECONDS.count(op="add_memories")
+            add_memories(
+                [
+                    {"memory_key": f"k{i}", "memory_value": "v", "embedding": [0.1]}
+                    for i in range(3)
+                ],
+                db_path=self.db_path,
+            )
+            self.assertEqual(DB_SECONDS.count(op="add_memories"), before + 1)
+        finally:
+            metrics.set_enabled(was_enabled)
+
     def test_database_stats(self):
         """Test database statistics."""
         # Add some test data
@@ -119,6 +208,111 @@ class TestCoreOperations(unittest.TestCase):
         self.assertEqual(stats["chat_history_count"], 2)
         self.assertEqual(stats["spellbook_memories_count"], 2)
 
+    def test_chat_history_keyset_pagination(self):
+        """Test cursor pages walk backwards and forwards by message id."""
+        ids = [
+            add_chat_message("user", f"Message {i}", db_path=self.db_path)
+            for i in range(5)
+        ]
+
+        latest = get_chat_history_page(2, db_path=self.db_path)
+        self.assertEqual([m["id"] for m in latest], [ids[4], ids[3]])
+
+        older = get_chat_history_page(
+            2, before_id=latest[-1]["id"], db_path=self.db_path
+        )
+        self.assertEqual([m["id"] for m in older], [ids[2], ids[1]])
+
+        newer = get_chat_history_page(10, after_id=ids[2], db_path=self.db_path)
+        self.assertEqual([m["id"] for m in newer], [ids[3], ids[4]])
+        self.assertEqual(
+            get_chat_history_page(10, after_id=ids[4], db_path=self.db_path), []
+        )
+
+    def test_iter_chat_history_pages_lazily(self):
+        """Test the history iterator walks every page newest first."""
+        ids = [
+            add_chat_message("user", f"Message {i}", db_path=self.db_path)
+            for i in range(7)
+        ]
+
+        walked = [m["id"] for m in iter_chat_history(page_size=3, db_path=self.db_path)]
+        self.assertEqual(walked, list(reversed(ids)))
+
+        older = iter_chat_history(before_id=ids[3], page_size=2, db_path=self.db_path)
+        self.assertEqual([m["id"] for m in older], [ids[2], ids[1], ids[0]])
+
+    def test_table_versions_and_changes(self):
+        """Test triggers bump table versions and record changed rows."""
+        before = get_table_versions(self.db_path)
+        self.assertEqual(before, {"chat_history": 0, "spellbook_memories": 0})
+
+        msg_id = add_chat_message("user", "Hello", db_path=self.db_path)
+        add_memory("mood", "calm", 5, db_path=self.db_path)
+        add_memory("mood", "energised", 6, db_path=self.db_path)
+
+        versions = get_table_versions(self.db_path)
+        self.assertEqual(versions["chat_history"], 1)
+        self.assertEqual(versions["spellbook_memories"], 2)
+
+        chat_changes = get_changes_since("chat_history", 0, db_path=self.db_path)
+        self.assertEqual(
+            [(c["row_id"], c["op"]) for c in chat_changes], [(msg_id, "insert")]
+        )
+
+        # Only the latest change per row is kept
+        memory_changes = get_changes_since(
+            "spellbook_memories", 0, db_path=self.db_path
+        )
+        self.assertEqual(len(memory_changes), 1)
+        self.assertEqual(memory_changes[0]["row_key"], "mood")
+        self.assertEqual(memory_changes[0]["op"], "update")
+
+        delete_memory_by_key("mood", db_path=self.db_path)
+        memory_changes = get_changes_since(
+            "spellbook_memories", versions["spellbook_memories"], db_path=self.db_path
+        )
+        self.assertEqual(memory_changes[0]["op"], "delete")
+
+    def test_change_feed_poll(self):
+        """Test the change feed only reports rows changed since the last poll."""
+        feed = ChangeFeed(self.db_path)
+        try:
+            self.assertFalse(feed.has_changes())
+            self.assertEqual(feed.poll(), {})
+
+            add_memory("name", "Bee", 9, db_path=self.db_path)
+            changes = feed.poll()
+            self.assertEqual(list(changes), ["spellbook_memories"])
+            self.assertEqual(changes["spellbook_memories"][0]["row_key"], "name")
+
+            self.assertEqual(feed.poll(), {})
+        finally:
+            feed.close()
+
+    def test_database_profile_is_applied_and_reported(self):
+        """Test the selected connection profile shows up in the stats."""
+        stats = get_database_stats(self.db_path)
+        self.assertEqual(stats["db_profile"], "balanced")
+        self.assertEqual(stats["db_pragmas"]["synchronous"], 1)  # NORMAL
+
+        with mock.patch.dict(os.environ, {"KAIROS_DB_PROFILE": "durable"}):
+            stats = get_database_stats(self.db_path)
+        self.assertEqual(stats["db_profile"], "durable")
+        self.assertEqual(stats["db_pragmas"]["synchronous"], 2)  # FULL
+        self.assertEqual(stats["db_pragmas"]["busy_timeout"], 5000)
+
+    def test_unknown_database_profile_warns_once(self):
+        """Test a mistyped profile falls back to the default with one warning."""
+        output = io.StringIO()
+        with mock.patch.dict(os.environ, {"KAIROS_DB_PROFILE": "fsat-read"}):
+            with redirect_stdout(output):
+                for _ in range(3):
+                    self.assertEqual(
+                        get_database_stats(self.db_path)["db_profile"], "balanced"
+                    )
+        self.assertEqual(output.getvalue().count("Unknown database profile"), 1)
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+"""
+Unit tests for the chat-turn stage graph executor.
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import timing
+from utils.dag import StageGraph
+
+
+class TestStageGraph(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_dependencies_receive_results(self):
+        graph = StageGraph()
+        graph.add("a", lambda: 2)
+        graph.add("b", lambda: 3)
+        graph.add("product", lambda a, b: a * b, ("a", "b"))
+        graph.add("label", lambda product: f"= {product}", ("product",))
+        self.assertEqual(
+            graph.run(self.executor), {"a": 2, "b": 3, "product": 6, "label": "= 6"}
+        )
+
+    def test_independent_stages_overlap(self):
+        # Each stage only finishes once the other has started
+        barrier = threading.Barrier(2, timeout=2)
+        graph = StageGraph()
+        graph.add("left", barrier.wait)
+        graph.add("right", barrier.wait)
+        graph.run(self.executor)
+
+    def test_single_ready_stage_runs_on_caller(self):
+        graph = StageGraph()
+        graph.add("first", threading.get_ident)
+        graph.add("second", lambda first: threading.get_ident(), ("first",))
+        results = graph.run(self.executor)
+        self.assertEqual(results["second"], threading.get_ident())
+
+    def test_stage_ready_alone_does_not_block_a_running_branch(self):
+        # Like the LLM call: ready on its own while retrieval's input is pending
+        started = {}
+        begin = time.perf_counter()
+
+        def note(name, delay):
+            started[name] = time.perf_counter() - begin
+            time.sleep(delay)
+
+        graph = StageGraph()
+        graph.add("prompt", lambda: None)
+        graph.add("embedding", lambda: note("embedding", 0.1))
+        graph.add("response", lambda prompt: note("response", 0.5), ("prompt",))
+        graph.add("retrieval", lambda embedding: note("retrieval", 0.1), ("embedding",))
+        graph.run(self.executor)
+        self.assertLess(started["retrieval"], 0.4)
+        self.assertLess(time.perf_counter() - begin, 0.55)
+
+    def test_error_stops_dependents(self):
+        ran = []
+
+        def fail():
+            raise RuntimeError("db down")
+
+        def slow():
+            time.sleep(0.05)
+            ran.append("slow")
+
+        graph = StageGraph()
+        graph.add("save", fail)
+        graph.add("slow", slow)
+        graph.add("after", lambda save: ran.append("after"), ("save",))
+        with self.assertRaises(RuntimeError):
+            graph.run(self.executor)
+        # The running stage was waited for; the dependent never started
+        self.assertEqual(ran, ["slow"])
+
+    def test_unknown_or_duplicate_stage_rejected(self):
+        graph = StageGraph().add("a", lambda: 1)
+        with self.assertRaises(ValueError):
+            graph.add("b", lambda c: c, ("c",))
+        with self.assertRaises(ValueError):
+            graph.add("a", lambda: 2)
+
+    def test_pool_stages_record_request_timings(self):
+        def work():
+            with timing.stage("embed"):
+                pass
+
+        timings = timing.start_request()
+        graph = StageGraph()
+        graph.add("embed", work)
+        graph.add("other", lambda: None)
+        graph.run(self.executor)
+        self.assertIn("embed", timings.stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
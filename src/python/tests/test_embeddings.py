@@ -0,0 +1,73 @@
+"""
+Unit tests for the deterministic embedding backend.
+"""
+
+import math
+import unittest
+
+from embeddings import EmbeddingCache, HashEmbedding, load_embedding_model
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class TestHashEmbedding(unittest.TestCase):
+    def setUp(self):
+        self.backend = HashEmbedding()
+
+    def test_embedding_is_deterministic_unit_vector(self):
+        first = self.backend.embed("Oat milk flat white")
+        self.assertEqual(first, HashEmbedding().embed("oat milk flat WHITE"))
+        self.assertEqual(len(first), 384)
+        self.assertAlmostEqual(math.sqrt(dot(first, first)), 1.0)
+        self.assertEqual(self.backend.embed(""), [0.0] * 384)
+
+    def test_shared_words_score_higher(self):
+        query = self.backend.embed("morning coffee ritual")
+        close = self.backend.embed("my coffee ritual every morning")
+        far = self.backend.embed("tarot cards under the winter moon")
+        self.assertGreater(dot(query, close), dot(query, far))
+
+    def test_backend_selection(self):
+        self.assertIsInstance(load_embedding_model("hash"), HashEmbedding)
+        with self.assertRaises(ValueError):
+            load_embedding_model("word2vec")
+
+
+class CountingModel(HashEmbedding):
+    def __init__(self):
+        super().__init__()
+        self.encoded = []
+
+    def encode(self, sentences, convert_to_tensor=False):
+        self.encoded.extend(sentences)
+        return super().encode(sentences, convert_to_tensor)
+
+
+@unittest.skipIf(torch is None, "torch not installed")
+class TestEmbeddingCache(unittest.TestCase):
+    def test_only_new_texts_are_encoded(self):
+        model = CountingModel()
+        cache = EmbeddingCache(max_entries=3)
+        first = cache.encode(model, ["moon", "tea"])
+        self.assertEqual(tuple(first.shape), (2, 384))
+        again = cache.encode(model, ["tea", "moon", "sun"])
+        self.assertEqual(model.encoded, ["moon", "tea", "sun"])
+        self.assertTrue(torch.equal(again[1], first[0]))
+        self.assertIsNone(cache.encode(model, []))
+
+        cache.encode(model, ["rain"])
+        # "tea" was least recently used
+        self.assertEqual(len(cache), 3)
+        cache.encode(model, ["tea"])
+        self.assertEqual(model.encoded[-1], "tea")
+
+
+if __name__ == "__main__":
+    unittest.main()
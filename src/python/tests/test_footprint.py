@@ -0,0 +1,49 @@
+"""
+Unit tests for memory footprint accounting and soft budgets.
+"""
+
+import unittest
+from collections import deque
+from unittest import mock
+
+from memory_store import MemoryStore
+from utils import footprint as footprint_module
+from utils.footprint import Footprint, deep_sizeof
+
+
+class TestFootprint(unittest.TestCase):
+    def test_sizes_grow_with_content(self):
+        small = deque([{"role": "user", "content": "hi"}])
+        large = deque({"role": "user", "content": str(i) * 1000} for i in range(10))
+        self.assertGreater(deep_sizeof(large), deep_sizeof(small) + 10000)
+
+        store = MemoryStore()
+        store.upsert("a", "value", 5)
+        without_embedding = store.nbytes()
+        store.upsert("b", "value", 5, [0.1] * 384)
+        self.assertGreater(store.nbytes() - without_embedding, 384 * 24)
+
+    def test_cache_budget_evicts_in_order(self):
+        caches = {"first": 600, "second": 600}
+        tracker = Footprint()
+        for name in caches:
+            tracker.add_cache(
+                name,
+                lambda name=name: caches[name],
+                lambda name=name: caches.update({name: 0}),
+            )
+
+        with mock.patch.object(footprint_module, "CACHE_BUDGET", 1000):
+            self.assertEqual(tracker.enforce_budgets(force=True), ["first"])
+            self.assertEqual(tracker.enforce_budgets(force=True), [])
+            # Rate limited unless forced
+            caches["first"] = 5000
+            self.assertEqual(tracker.enforce_budgets(), [])
+
+        report = tracker.report()
+        self.assertEqual(report["first"], 5000)
+        self.assertIn("process_rss", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Unit tests for the pre-serialized response cache.
+"""
+
+import gzip
+import json
+import unittest
+
+from utils import http_cache
+from utils.http_cache import ResponseCache, choose_encoding
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_reuses_bytes_until_versions_change(self):
+        cache = ResponseCache()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {"memories": [{"memory_key": "moon"}], "build": len(builds)}
+
+        first = cache.get("memories", "", [3], build)
+        again = cache.get("memories", "", [3], build)
+        self.assertIs(again, first)
+        self.assertEqual(json.loads(first.body)["build"], 1)
+
+        changed = cache.get("memories", "", [4], build)
+        self.assertEqual(json.loads(changed.body)["build"], 2)
+        self.assertNotEqual(changed.etag, first.etag)
+        # Different query strings are separate entries with separate ETags
+        other = cache.get("memories", "fields=memory_key", [4], build)
+        self.assertNotEqual(other.etag, changed.etag)
+
+    def test_lru_bound(self):
+        cache = ResponseCache(max_entries=2)
+        for query in ("a", "b", "c"):
+            cache.get("history", query, [1], dict)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(cache.nbytes(), 0)
+
+    def test_compression_above_threshold(self):
+        cache = ResponseCache()
+        small = cache.get("stats", "", [1], lambda: {"ok": True})
+        self.assertEqual(small.encoded("gzip"), (small.body, None))
+
+        large = cache.get("history", "", [1], lambda: {"text": "moon " * 1000})
+        self.assertGreaterEqual(len(large.body), http_cache.COMPRESS_MIN_BYTES)
+        body, encoding = large.encoded("gzip")
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(gzip.decompress(body), large.body)
+        self.assertLess(len(body), len(large.body))
+        self.assertNotEqual(large.etag_for("gzip"), large.etag_for(None))
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, deflate"), "gzip")
+        self.assertIsNone(choose_encoding("gzip;q=0"))
+        self.assertIsNone(choose_encoding(""))
+        self.assertEqual(choose_encoding("*"), http_cache.ENCODINGS[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Unit tests for idempotency keys and in-flight coalescing.
+"""
+
+import threading
+import time
+import unittest
+
+from utils.idempotency import IdempotencyConflict, IdempotencyStore, fingerprint
+
+
+class TestIdempotencyStore(unittest.TestCase):
+    def test_duplicates_coalesce_then_replay(self):
+        store = IdempotencyStore("/test")
+        body = fingerprint({"message": "hi", "include_memories": False})
+        future, owner = store.begin("key-1", body)
+        self.assertTrue(owner)
+
+        results = []
+        waiter_future, waiter_owner = store.begin("key-1", body)
+        self.assertFalse(waiter_owner)
+        waiter = threading.Thread(target=lambda: results.append(waiter_future.result()))
+        waiter.start()
+        store.finish("key-1", "reply")
+        waiter.join(2)
+        self.assertEqual(results, ["reply"])
+
+        replay, replay_owner = store.begin("key-1", body)
+        self.assertFalse(replay_owner)
+        self.assertEqual(replay.result(), "reply")
+
+    def test_conflicting_body_and_failed_retry(self):
+        store = IdempotencyStore("/test")
+        store.begin("key-1", fingerprint({"message": "hi"}))
+        with self.assertRaises(IdempotencyConflict):
+            store.begin("key-1", fingerprint({"message": "bye"}))
+
+        store.fail("key-1", RuntimeError("model down"))
+        _, owner = store.begin("key-1", fingerprint({"message": "hi"}))
+        self.assertTrue(owner)
+
+    def test_cancelled_waiter_does_not_break_the_key(self):
+        store = IdempotencyStore("/test")
+        store.begin("key-1", "body")
+        waiter_future, _ = store.begin("key-1", "body")
+        waiter_future.cancel()
+
+        store.finish("key-1", "reply")
+        replay, owner = store.begin("key-1", "body")
+        self.assertFalse(owner)
+        self.assertEqual(replay.result(), "reply")
+
+        store.begin("key-2", "body")
+        store.begin("key-2", "body")[0].cancel()
+        store.fail("key-2", RuntimeError("model down"))
+        _, owner = store.begin("key-2", "body")
+        self.assertTrue(owner)
+
+    def test_results_expire_and_are_bounded(self):
+        store = IdempotencyStore("/test", window=0.05, max_keys=2)
+        for i in range(3):
+            store.begin(f"key-{i}", "body")
+            store.finish(f"key-{i}", i)
+        store.begin("in-flight", "body")
+        # The oldest finished result was dropped to stay within max_keys
+        self.assertEqual(len(store), 3)
+        _, owner = store.begin("key-0", "body")
+        self.assertTrue(owner)
+
+        time.sleep(0.06)
+        store.begin("other", "body")
+        # Finished results past the window are gone; in-flight keys stay
+        self.assertEqual(len(store), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for KairosAI's copy-on-write history and memory state.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from database.operations import add_chat_message, add_memory
+from kairos_ai import HISTORY_WINDOW, KairosAI
+
+
+class TestKairosState(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.kairos = KairosAI(
+            os.path.join(self.data_dir, "kairos.db"), track_footprint=False
+        )
+
+    def tearDown(self):
+        self.kairos.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_writes_leave_earlier_states_untouched(self):
+        before = self.kairos.state
+        self.kairos.add_to_history("user", "hello")
+        add_memory("drink", "green tea", db_path=self.kairos.db_path)
+        self.kairos.refresh_from_db()
+
+        self.assertEqual(before.history, ())
+        self.assertNotIn("drink", before.memory)
+        self.assertEqual([m["content"] for m in self.kairos.history], ["hello"])
+        self.assertIn("drink", self.kairos.memory)
+
+        self.kairos.forget_memory("drink")
+        self.kairos.clear_history()
+        self.assertEqual(self.kairos.history, ())
+        self.assertNotIn("drink", self.kairos.memory)
+
+    def test_read_history_pages_past_the_window(self):
+        for i in range(HISTORY_WINDOW + 5):
+            add_chat_message("user", f"m{i}", db_path=self.kairos.db_path)
+        self.kairos.refresh_from_db()
+        self.assertEqual(len(self.kairos.history), HISTORY_WINDOW)
+
+        contents = [m["content"] for m in self.kairos.read_history(HISTORY_WINDOW + 3)]
+        self.assertEqual(contents, [f"m{i}" for i in range(2, HISTORY_WINDOW + 5)])
+        everything = self.kairos.read_history(1000)
+        self.assertEqual(len(everything), HISTORY_WINDOW + 5)
+        self.assertEqual(everything[0]["content"], "m0")
+        self.assertEqual(
+            [m["content"] for m in self.kairos.read_history(2)],
+            [f"m{HISTORY_WINDOW + 3}", f"m{HISTORY_WINDOW + 4}"],
+        )
+
+    def test_concurrent_writers_and_refresh(self):
+        def write(n):
+            for i in range(20):
+                self.kairos.add_to_history("user", f"{n}-{i}")
+
+        def write_elsewhere():
+            for i in range(20):
+                add_chat_message("user", f"other-{i}", db_path=self.kairos.db_path)
+                self.kairos.refresh_from_db()
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(3)]
+        threads.append(threading.Thread(target=write_elsewhere))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.kairos.refresh_from_db()
+
+        ids = [msg["id"] for msg in self.kairos.history]
+        self.assertEqual(len(ids), HISTORY_WINDOW)
+        # A refresh never adds a message that add_to_history also appends
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertIn(self.kairos.load_chat_history()[-1]["id"], ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
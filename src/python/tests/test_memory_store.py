@@ -0,0 +1,79 @@
+"""
+Unit tests for the in-memory spellbook store.
+"""
+
+import unittest
+
+from memory_store import MemoryStore
+
+try:
+    import torch
+except ImportError:  # pragma: no cover - torch is optional for these tests
+    torch = None
+
+
+class TestMemoryStore(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryStore()
+        self.store.upsert("name", "Bee", 9, [1.0, 0.0])
+        self.store.upsert("coffee", "flat white", 5, [0.0, 1.0])
+        self.store.upsert("tea", "earl grey", 5)
+
+    def test_keyed_lookup_and_upsert(self):
+        self.assertIn("name", self.store)
+        self.assertEqual(len(self.store), 3)
+
+        self.store.upsert("coffee", "cappuccino", 8)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get("coffee").value, "cappuccino")
+        self.assertEqual(self.store.get("coffee").priority, 8)
+
+    def test_top_k_orders_by_priority_then_recency(self):
+        keys = [entry.key for entry in self.store.top_k(3)]
+        self.assertEqual(keys, ["name", "tea", "coffee"])
+        self.assertEqual([e.key for e in self.store.top_k(1)], ["name"])
+
+    def test_prune_drops_lowest_priority(self):
+        removed = self.store.prune(2)
+        self.assertEqual(removed, ["coffee"])
+        self.assertNotIn("coffee", self.store)
+        self.assertEqual(self.store.prune(2), [])
+
+    def test_remove_and_iteration_shape(self):
+        self.assertTrue(self.store.remove("tea"))
+        self.assertFalse(self.store.remove("tea"))
+
+        items = list(self.store)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(
+            items[0], {"name": {"value": "Bee", "priority": 9, "embedding": [1.0, 0.0]}}
+        )
+
+    def test_copy_changes_independently(self):
+        copy = self.store.copy()
+        copy.upsert("mood", "calm", 7)
+        copy.remove("name")
+        self.assertEqual(self.store.keys(), ["name", "coffee", "tea"])
+        self.assertEqual([e.key for e in copy.top_k(3)], ["mood", "tea", "coffee"])
+        self.assertGreater(copy.version, self.store.version)
+
+    def test_nested_embeddings_are_flattened(self):
+        entry = self.store.upsert("mood", "calm", 4, [[0.5, 0.5]])
+        self.assertEqual(entry.embedding, [0.5, 0.5])
+
+    @unittest.skipIf(torch is None, "torch not installed")
+    def test_embedding_matrix_fills_missing_and_tracks_changes(self):
+        keys, matrix = self.store.embedding_matrix(lambda text: [0.5, 0.5])
+        self.assertEqual(keys, ["name", "coffee", "tea"])
+        self.assertEqual(tuple(matrix.shape), (3, 2))
+        self.assertEqual(self.store.get("tea").embedding, [0.5, 0.5])
+
+        # Cached until the store changes
+        self.assertIs(self.store.embedding_matrix(lambda text: [0.0, 0.0])[1], matrix)
+        self.store.remove("name")
+        keys, matrix = self.store.embedding_matrix(lambda text: [0.0, 0.0])
+        self.assertEqual(keys, ["coffee", "tea"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Unit tests for the in-process metrics registry.
+"""
+
+import unittest
+
+from utils import metrics, timing
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.was_enabled = metrics.is_enabled()
+        metrics.set_enabled(True)
+
+    def tearDown(self):
+        metrics.set_enabled(self.was_enabled)
+
+    def test_histogram_renders_cumulative_buckets(self):
+        hist = metrics.histogram(
+            "test_latency_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0)
+        )
+        hist.observe(0.05, stage="embed")
+        hist.observe(0.5, stage="embed")
+        hist.observe(3.0, stage="embed")
+
+        text = metrics.render()
+        self.assertIn("# TYPE test_latency_seconds histogram", text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed",le="1.0"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed",le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count{stage="embed"} 3', text)
+
+    def test_counter_and_gauge(self):
+        count = metrics.counter("test_hits_total", "Test hits", ("result",))
+        count.inc(result="hit")
+        count.inc(2, result="hit")
+        self.assertEqual(count.value(result="hit"), 3)
+
+        depth = metrics.gauge("test_depth", "Test depth", ("queue",))
+        depth.set_function(lambda: 7, queue="db")
+        self.assertIn('test_depth{queue="db"} 7', metrics.render())
+
+    def test_disabled_updates_are_dropped(self):
+        hist = metrics.histogram("test_disabled_seconds", "Disabled", ("stage",))
+        metrics.set_enabled(False)
+        with hist.time(stage="llm"):
+            pass
+        hist.observe(1.0, stage="llm")
+        self.assertEqual(hist.count(stage="llm"), 0)
+
+    def test_request_timings_feed_server_timing(self):
+        timings = timing.start_request()
+        with timing.stage("embed"):
+            pass
+        timing.record("llm_ttft", 0.25)
+        timing.record("db_write", 0.001)
+        timing.record("db_write", 0.002)
+
+        self.assertEqual(list(timings.to_dict()), ["embed", "llm_ttft", "db_write"])
+        self.assertEqual(timings.to_dict()["db_write"], 3.0)
+        self.assertIn("llm_ttft;dur=250.0", timings.server_timing())
+        self.assertGreaterEqual(metrics.STAGE_SECONDS.count(stage="llm_ttft"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
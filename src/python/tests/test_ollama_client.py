@@ -0,0 +1,118 @@
+"""
+Tests for the asyncio Ollama client against a local HTTP server.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ollama_client
+
+CHUNKS = [b'{"response": "hel', b'lo"}\n{"response": " moon"}\n', b'{"done": true}']
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        if self.path == "/json":
+            body = json.dumps({"echo": payload})
+            self._reply(200, body.encode(), {"Content-Length": str(len(body))})
+        elif self.path in ("/chunked", "/chunked-json"):
+            chunks = CHUNKS if self.path == "/chunked" else [b'{"resp', b'onse": "hi"}']
+            self._reply(200, b"", {"Transfer-Encoding": "chunked"})
+            for chunk in chunks:
+                self.wfile.write(b"%x;ext=1\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path == "/until-close":
+            self._reply(200, b'{"response": "bye"}', {"Connection": "close"})
+            self.close_connection = True
+        elif self.path == "/error":
+            self._reply(500, b"model not found", {"Content-Length": "15"})
+        elif self.path == "/slow":
+            time.sleep(0.5)
+            try:
+                self._reply(200, b"{}", {"Content-Length": "2"})
+            except OSError:
+                pass  # The client gave up and closed the connection
+
+    def _reply(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestOllamaClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def post(self, path, timeout=5):
+        return asyncio.run(
+            ollama_client.post_json(self.base + path, {"prompt": "hi"}, timeout)
+        )
+
+    def stream(self, path):
+        async def collect():
+            return [
+                chunk
+                async for chunk in ollama_client.stream_json(
+                    self.base + path, {"prompt": "hi"}
+                )
+            ]
+
+        return asyncio.run(collect())
+
+    def test_content_length_reply(self):
+        reply = self.post("/json")
+        self.assertEqual(reply["echo"], {"prompt": "hi"})
+
+    def test_body_read_until_close(self):
+        self.assertEqual(self.post("/until-close"), {"response": "bye"})
+
+    def test_chunked_bodies_split_mid_document(self):
+        self.assertEqual(
+            self.stream("/chunked"),
+            [{"response": "hello"}, {"response": " moon"}, {"done": True}],
+        )
+        self.assertEqual(self.post("/chunked-json"), {"response": "hi"})
+
+    def test_error_status_raises(self):
+        with self.assertRaisesRegex(ollama_client.OllamaError, "HTTP 500"):
+            self.post("/error")
+        with self.assertRaisesRegex(ollama_client.OllamaError, "model not found"):
+            self.stream("/error")
+
+    def test_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            self.post("/slow", timeout=0.1)
+
+    def test_connection_refused(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(ConnectionError):
+            asyncio.run(ollama_client.post_json(f"http://127.0.0.1:{port}/", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the pre-fork launcher's worker recycling and reaping.
+"""
+
+import atexit
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+# api_server opens its database on import, so point it at a scratch one. It is
+# imported once per run, so the first test module to import it picks the path
+TEMP_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+_saved_db_path = os.environ.get("KAIROS_DB_PATH")
+os.environ["KAIROS_DB_PATH"] = os.path.join(TEMP_DIR, "kairos.db")
+try:
+    import prefork
+except ImportError:  # pragma: no cover - flask is optional for these tests
+    prefork = None
+finally:
+    if _saved_db_path is None:
+        del os.environ["KAIROS_DB_PATH"]
+    else:
+        os.environ["KAIROS_DB_PATH"] = _saved_db_path
+
+
+def request(app):
+    return app({}, lambda status, headers: None)
+
+
+@unittest.skipIf(prefork is None, "api_server dependencies not installed")
+class TestRecyclingApp(unittest.TestCase):
+    def test_retires_once_quota_is_served(self):
+        retired = []
+        app = prefork.RecyclingApp(
+            lambda environ, start: [b"ok"], 2, lambda: retired.append(True)
+        )
+        self.assertEqual(request(app), [b"ok"])
+        self.assertEqual(retired, [])
+        request(app)
+        self.assertEqual(retired, [True])
+        request(app)
+        self.assertEqual((app.served, retired), (3, [True]))
+
+    def test_no_quota_never_retires(self):
+        app = prefork.RecyclingApp(lambda environ, start: [], 0, self.fail)
+        for _ in range(5):
+            request(app)
+
+    def test_wait_idle_times_out_while_a_request_runs(self):
+        release = threading.Event()
+        app = prefork.RecyclingApp(
+            lambda environ, start: release.wait(5) and [], 0, lambda: None
+        )
+        worker = threading.Thread(target=request, args=(app,))
+        worker.start()
+        while not app.in_flight:
+            time.sleep(0.01)
+
+        self.assertFalse(app.wait_idle(0.05))
+        release.set()
+        self.assertTrue(app.wait_idle(2))
+        worker.join(2)
+
+
+@unittest.skipIf(prefork is None, "api_server dependencies not installed")
+class TestArbiter(unittest.TestCase):
+    def test_killed_worker_is_reaped_not_respawned(self):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            time.sleep(30)
+            os._exit(0)
+
+        arbiter = prefork.Arbiter(sock=None, workers=1)
+        arbiter.workers[pid] = 0
+        arbiter.stopping = True
+        os.kill(pid, signal.SIGKILL)
+        arbiter.reap(block_for=pid)
+        self.assertEqual(arbiter.workers, {})
+        with self.assertRaises(ChildProcessError):
+            os.waitpid(pid, os.WNOHANG)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for the per-turn sampling profiler.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from utils import profiling
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_requested_turn_writes_collapsed_stacks(self):
+        with mock.patch.object(
+            profiling, "PROFILE_DIR", self.temp_dir
+        ), mock.patch.object(profiling, "_last_profile_at", float("-inf")):
+            with profiling.profile_turn("test", requested=True) as profile:
+                busy_wait(0.05)
+
+        self.assertTrue(os.path.exists(profile["path"]))
+        with open(profile["path"]) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("busy_wait (test_profiling.py", stack)
+        self.assertGreater(int(count), 0)
+
+    def test_sampler_skips_threads_outside_the_turn(self):
+        def spin(seconds):
+            busy_wait(seconds)
+
+        pool = threading.Thread(target=busy_wait, args=(0.3,), name="test-pool_0")
+        other = threading.Thread(target=spin, args=(0.3,), name="other-request")
+        sampler = profiling.StackSampler(
+            [threading.get_ident()], interval=0.005, thread_prefix="test-pool"
+        ).start()
+        pool.start()
+        other.start()
+        busy_wait(0.2)
+        sampler.stop()
+        pool.join()
+        other.join()
+
+        roots = {stack.split(";")[0] for stack in sampler.stacks}
+        self.assertIn("test-pool_0", roots)
+        self.assertIn(threading.current_thread().name, roots)
+        self.assertNotIn("other-request", roots)
+        self.assertFalse(any("spin (" in stack for stack in sampler.stacks))
+
+    def test_profiles_are_rate_limited(self):
+        with mock.patch.object(profiling, "_enabled", True), mock.patch.object(
+            profiling, "_last_profile_at", float("-inf")
+        ):
+            self.assertTrue(profiling.should_profile())
+            self.assertFalse(profiling.should_profile())
+            # Requests through the header share the limit
+            self.assertFalse(profiling.should_profile(requested=True))
+
+        with mock.patch.object(profiling, "_last_profile_at", float("-inf")):
+            self.assertTrue(profiling.should_profile(requested=True))
+            self.assertFalse(profiling.should_profile(requested=True))
+
+        with profiling.profile_turn("test") as profile:
+            self.assertIsNone(profile)
+
+    def test_header_needs_explicit_value_from_localhost(self):
+        self.assertTrue(profiling.header_requests_profile("1", "127.0.0.1"))
+        self.assertTrue(profiling.header_requests_profile(" 1 ", "::1"))
+        for value in ("0", "", "true", None):
+            self.assertFalse(profiling.header_requests_profile(value, "127.0.0.1"))
+        self.assertFalse(profiling.header_requests_profile("1", "10.0.0.5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
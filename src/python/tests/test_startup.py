@@ -0,0 +1,81 @@
+"""
+Cold-start regression tests for the API server.
+
+Importing api_server runs the full server init (database, prompt, history and
+memory load) in a fresh interpreter. The test fails when that takes longer than
+KAIROS_STARTUP_BUDGET seconds (default 5) or when the embedding stack is
+imported eagerly again.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+PYTHON_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STARTUP_BUDGET = float(os.getenv("KAIROS_STARTUP_BUDGET", "5"))
+# Third-party packages api_server imports at startup
+SERVER_DEPENDENCIES = ("flask", "flask_cors", "requests", "termcolor", "yaml")
+MISSING = [m for m in SERVER_DEPENDENCIES if importlib.util.find_spec(m) is None]
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import api_server
+elapsed = time.perf_counter() - started
+from utils import startup
+print(json.dumps({
+    "seconds": elapsed,
+    "phases": startup.report(),
+    "modules": [m for m in ("torch", "sentence_transformers") if m in sys.modules],
+}))
+"""
+
+
+@unittest.skipIf(MISSING, f"api_server dependencies not installed: {MISSING}")
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+
+        shutil.rmtree(self.temp_dir)
+
+    def run_child(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = PYTHON_SRC
+        env["KAIROS_DB_PATH"] = os.path.join(self.temp_dir, "kairos.db")
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            cwd=self.temp_dir,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        if proc.returncode != 0:
+            self.fail(f"api_server failed to start:\n{proc.stderr}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def test_cold_start_within_budget(self):
+        report = self.run_child()
+        self.assertLess(
+            report["seconds"],
+            STARTUP_BUDGET,
+            f"Cold start took {report['seconds']:.2f}s, phases: {report['phases']}",
+        )
+        for phase in ("db_init", "prompt_load", "history_load", "memory_load"):
+            self.assertIn(phase, report["phases"])
+
+    def test_embedding_stack_is_not_imported_at_startup(self):
+        report = self.run_child()
+        self.assertEqual(report["modules"], [])
+        self.assertNotIn("model_load", report["phases"])
+
+
+if __name__ == "__main__":
+    unittest.main()
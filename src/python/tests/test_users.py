@@ -0,0 +1,97 @@
+"""
+Unit tests for per-user state and quotas.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from database.operations import (
+    add_chat_message,
+    create_chat_job,
+    get_chat_job,
+    get_recent_chat_history,
+    init_db,
+)
+from kairos_ai import SCHEMA_PATH
+from users import QuotaExceeded, UserRegistry
+
+
+class TestUserRegistry(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_users_get_separate_databases(self):
+        users = UserRegistry(data_dir=self.data_dir)
+        alice = users.get("alice")
+        self.assertIs(users.get("alice"), alice)
+        bob = users.get("bob")
+        self.assertNotEqual(alice.db_path, bob.db_path)
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, "alice.db")))
+
+        add_chat_message("user", "only for alice", db_path=alice.db_path)
+        self.assertEqual(len(get_recent_chat_history(10, db_path=bob.db_path)), 0)
+
+    def test_rejects_unsafe_user_ids(self):
+        users = UserRegistry(data_dir=self.data_dir)
+        for user_id in ("", "../etc", "a/b", "x" * 65):
+            with self.assertRaises(ValueError):
+                users.get(user_id)
+
+    def test_least_recently_used_evicted_at_capacity(self):
+        users = UserRegistry(data_dir=self.data_dir, max_loaded=2)
+        users.get("a")
+        users.get("b")
+        users.get("a")
+        users.get("c")
+        self.assertIn("a", users)
+        self.assertNotIn("b", users)
+        self.assertEqual(len(users), 2)
+
+    def test_idle_users_evicted(self):
+        users = UserRegistry(data_dir=self.data_dir, idle_ttl=0.05)
+        first = users.get("a")
+        time.sleep(0.06)
+        users.get("b")
+        self.assertNotIn("a", users)
+        # Data stays on disk; the user is simply loaded again
+        self.assertIsNot(users.get("a"), first)
+
+    def test_first_load_fails_jobs_left_by_a_restart(self):
+        path = os.path.join(self.data_dir, "alice.db")
+        init_db(path, SCHEMA_PATH)
+        create_chat_job("orphan", "left running", db_path=path)
+        time.sleep(0.01)
+        users = UserRegistry(data_dir=self.data_dir, max_loaded=1)
+        time.sleep(0.01)
+        create_chat_job("current", "queued by this server", db_path=path)
+
+        users.get("alice")
+        self.assertEqual(get_chat_job("orphan", db_path=path)["status"], "error")
+        self.assertEqual(get_chat_job("current", db_path=path)["status"], "queued")
+
+        # Reloading after eviction leaves this server's jobs alone
+        users.get("bob")
+        create_chat_job("later", "queued later", db_path=path)
+        users.get("alice")
+        self.assertEqual(get_chat_job("later", db_path=path)["status"], "queued")
+
+    def test_quotas(self):
+        users = UserRegistry(data_dir=self.data_dir, max_messages=3, max_memories=0)
+        kairos = users.get("a")
+        add_chat_message("user", "hello", db_path=kairos.db_path)
+        add_chat_message("assistant", "hi", db_path=kairos.db_path)
+        users.check_quota("a", messages=1)
+        with self.assertRaises(QuotaExceeded):
+            users.check_quota("a", messages=2)
+        # A quota of 0 is disabled
+        users.check_quota("a", memories=1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
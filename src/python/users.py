@@ -0,0 +1,238 @@
+"""
+Per-user Kairos state, so one server can host several people.
+
+With KAIROS_MULTI_USER=true, a request naming a user in the X-Kairos-User
+header is served from that user's own SQLite file (<KAIROS_USER_DATA_DIR>/<id>.db),
+so users never see each other's data or contend on one write lock. Requests
+without the header keep using the default database. The header identifies, it
+does not authenticate: put an authenticating proxy in front when the server is
+reachable by anyone else.
+
+Loaded users (a KairosAI with its history window, memory store and embedding
+matrix) are kept in an LRU. Users idle for KAIROS_USER_IDLE_TTL seconds, and
+the least recently used beyond KAIROS_MAX_LOADED_USERS, are dropped; their data
+stays on disk and is loaded again on their next request. The first load of a
+user fails the chat jobs a previous server left unfinished in their database,
+as ChatJobs does for the default one. Quotas cap what each user can store
+(0 disables a quota).
+
+  KAIROS_MULTI_USER         true to honour X-Kairos-User (default false)
+  KAIROS_USER_DATA_DIR      where user databases live (default data/users)
+  KAIROS_MAX_LOADED_USERS   users kept loaded at most (default 16)
+  KAIROS_USER_IDLE_TTL      seconds an unused user stays loaded (default 900)
+  KAIROS_USER_MAX_MESSAGES  chat messages per user (default 10000)
+  KAIROS_USER_MAX_MEMORIES  memories per user (default 1000)
+  KAIROS_USER_MAX_DB_MB     database size per user, WAL included (default 100)
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+from termcolor import colored
+
+from database.operations import fail_unfinished_chat_jobs, get_database_stats
+from kairos_ai import KairosAI, PROJECT_ROOT
+from utils.footprint import MIB
+from utils.metrics import counter
+
+USER_HEADER = "X-Kairos-User"
+MULTI_USER = os.getenv("KAIROS_MULTI_USER", "false").lower() == "true"
+USER_DATA_DIR = os.getenv(
+    "KAIROS_USER_DATA_DIR", os.path.join(PROJECT_ROOT, "data", "users")
+)
+MAX_LOADED_USERS = int(os.getenv("KAIROS_MAX_LOADED_USERS", "16"))
+USER_IDLE_TTL = float(os.getenv("KAIROS_USER_IDLE_TTL", "900"))
+MAX_USER_MESSAGES = int(os.getenv("KAIROS_USER_MAX_MESSAGES", "10000"))
+MAX_USER_MEMORIES = int(os.getenv("KAIROS_USER_MAX_MEMORIES", "1000"))
+MAX_USER_DB_BYTES = float(os.getenv("KAIROS_USER_MAX_DB_MB", "100")) * MIB
+
+# Ids become file names, so keep them to a safe alphabet
+USER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+USER_LOADS = counter(
+    "kairos_user_state_requests_total",
+    "Per-user state lookups, by whether the user was already loaded",
+    ("result",),
+)
+USER_EVICTIONS = counter(
+    "kairos_user_evictions_total",
+    "Loaded users dropped from memory, by reason",
+    ("reason",),
+)
+
+
+class QuotaExceeded(Exception):
+    """A write would take a user past one of their quotas."""
+
+
+class _LoadedUser:
+    def __init__(self, kairos: KairosAI):
+        self.kairos = kairos
+        self.last_used = time.monotonic()
+
+
+class UserRegistry:
+    """LRU of loaded per-user KairosAI states, backed by one database per user."""
+
+    def __init__(
+        self,
+        data_dir: str = USER_DATA_DIR,
+        max_loaded: int = MAX_LOADED_USERS,
+        idle_ttl: float = USER_IDLE_TTL,
+        max_messages: int = MAX_USER_MESSAGES,
+        max_memories: int = MAX_USER_MEMORIES,
+        max_db_bytes: float = MAX_USER_DB_BYTES,
+        load: Optional[Callable[[str], KairosAI]] = None,
+    ):
+        self.data_dir = data_dir
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_memories = max_memories
+        self.max_db_bytes = max_db_bytes
+        self._load = load or (lambda path: KairosAI(path, track_footprint=False))
+        self._users: "OrderedDict[str, _LoadedUser]" = OrderedDict()
+        # Users being loaded; concurrent requests for one user share the load
+        self._loading: Dict[str, Future] = {}
+        # Created before prefork workers fork, so it marks the server's start
+        self.started = datetime.now().isoformat()
+        # Users whose leftover chat jobs were already failed
+        self._recovered: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def db_path(self, user_id: str) -> str:
+        """The user's database file. Raises ValueError for an unusable id."""
+        if not isinstance(user_id, str) or not USER_ID_RE.match(user_id):
+            raise ValueError(
+                "User id must be 1-64 letters, digits, underscores or hyphens"
+            )
+        return os.path.join(self.data_dir, f"{user_id}.db")
+
+    def get(self, user_id: str) -> KairosAI:
+        """The user's KairosAI, loading it (and creating their database) if needed."""
+        path = self.db_path(user_id)
+        with self._lock:
+            dropped = self._expire()
+            loaded = self._users.get(user_id)
+            if loaded is not None:
+                self._users.move_to_end(user_id)
+                loaded.last_used = time.monotonic()
+            else:
+                future = self._loading.get(user_id)
+                owner = future is None
+                if owner:
+                    future = self._loading[user_id] = Future()
+        self._close(dropped)
+        if loaded is not None:
+            USER_LOADS.inc(result="hit")
+            return loaded.kairos
+        if not owner:
+            return future.result()
+
+        USER_LOADS.inc(result="miss")
+        try:
+            kairos = self._load(path)
+            if user_id not in self._recovered:
+                self._fail_lost_jobs(user_id, path)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[user_id]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[user_id]
+            self._users[user_id] = _LoadedUser(kairos)
+            dropped = self._expire()
+        self._close(dropped)
+        future.set_result(kairos)
+        return kairos
+
+    def _fail_lost_jobs(self, user_id: str, path: str) -> None:
+        # Jobs updated since the server started may be running in another worker
+        lost = fail_unfinished_chat_jobs(
+            "Server restarted", db_path=path, updated_before=self.started
+        )
+        self._recovered.add(user_id)
+        if lost:
+            print(
+                colored(
+                    f"⚠️ {lost} unfinished chat job(s) of user {user_id} marked failed",
+                    "yellow",
+                )
+            )
+
+    def _expire(self) -> List[KairosAI]:
+        """Unlink idle users and the least recently used beyond max_loaded."""
+        now = time.monotonic()
+        dropped = []
+        for user_id, loaded in list(self._users.items()):
+            if len(self._users) > self.max_loaded:
+                reason = "capacity"
+            elif now - loaded.last_used >= self.idle_ttl:
+                reason = "idle"
+            else:
+                # Oldest first, so every later user was used more recently
+                break
+            del self._users[user_id]
+            dropped.append(loaded.kairos)
+            USER_EVICTIONS.inc(reason=reason)
+        return dropped
+
+    @staticmethod
+    def _close(dropped: List[KairosAI]) -> None:
+        # A request still holding one just reopens its connection
+        for kairos in dropped:
+            kairos.close()
+
+    def check_quota(self, user_id: str, messages: int = 0, memories: int = 0) -> None:
+        """Raise QuotaExceeded if adding `messages` and `memories` would pass a quota.
+
+        Every incoming item counts as new, including upserts of existing keys.
+        """
+        path = self.db_path(user_id)
+        size = sum(
+            os.path.getsize(f) for f in (path, f"{path}-wal") if os.path.exists(f)
+        )
+        if self.max_db_bytes and size >= self.max_db_bytes:
+            raise QuotaExceeded(
+                f"Storage quota of {self.max_db_bytes / MIB:.0f} MiB reached"
+            )
+        if not (messages and self.max_messages) and not (
+            memories and self.max_memories
+        ):
+            return
+        stats = get_database_stats(db_path=path)
+        if (
+            messages
+            and self.max_messages
+            and stats.get("chat_history_count", 0) + messages > self.max_messages
+        ):
+            raise QuotaExceeded(f"Quota of {self.max_messages} chat messages reached")
+        if (
+            memories
+            and self.max_memories
+            and stats.get("spellbook_memories_count", 0) + memories > self.max_memories
+        ):
+            raise QuotaExceeded(f"Quota of {self.max_memories} memories reached")
+
+    def nbytes(self) -> int:
+        with self._lock:
+            loaded = list(self._users.values())
+        return sum(user.kairos.nbytes() for user in loaded)
+
+    def clear(self) -> None:
+        """Drop every loaded user; each is reloaded from disk on next use."""
+        with self._lock:
+            dropped = [user.kairos for user in self._users.values()]
+            self._users.clear()
+        self._close(dropped)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
@@ -0,0 +1,88 @@
+"""
+Dependency-graph executor for the stages of a chat turn.
+
+Each stage names the stages it depends on and starts as soon as they have
+finished, so independent work (the DB write, embedding the message, building
+the static prompt prefix) overlaps on a thread pool and only the stages the
+LLM call needs sit on its critical path. A stage function receives its
+dependencies' results as keyword arguments, and runs in a copy of the caller's
+context so timing.stage() blocks still land in the request's timings.
+"""
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+
+class StageGraph:
+    """Named stages with dependencies, run in dependency order."""
+
+    def __init__(self):
+        self._stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+
+    def add(
+        self, name: str, fn: Callable[..., Any], deps: Sequence[str] = ()
+    ) -> "StageGraph":
+        """Add a stage. Dependencies must already be added, so the graph has no cycles."""
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(
+                f"Stage '{name}' depends on unknown stage(s): {', '.join(missing)}"
+            )
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def _call(self, name: str, results: Dict[str, Any]) -> Any:
+        fn, deps = self._stages[name]
+        return fn(**{dep: results[dep] for dep in deps})
+
+    def run(self, executor: Executor) -> Dict[str, Any]:
+        """Run every stage and return their results by name.
+
+        Ready stages go to `executor`, except that a stage ready on its own
+        while nothing else runs is called on the calling thread, which would
+        otherwise sit idle. A stage that is ready while others run is always
+        submitted, so it cannot hold back stages that become ready meanwhile.
+        Once a stage raises no further stages start, and the first error is
+        re-raised after the running ones finish.
+        """
+        results: Dict[str, Any] = {}
+        pending = dict(self._stages)
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        while pending or running:
+            if error is None:
+                ready = [
+                    name
+                    for name, (_, deps) in pending.items()
+                    if all(dep in results for dep in deps)
+                ]
+                for name in ready:
+                    del pending[name]
+                if len(ready) == 1 and not running:
+                    try:
+                        results[ready[0]] = self._call(ready[0], results)
+                    except BaseException as e:
+                        error = e
+                    continue
+                for name in ready:
+                    context = contextvars.copy_context()
+                    future = executor.submit(context.run, self._call, name, results)
+                    running[future] = name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except BaseException as e:
+                    if error is None:
+                        error = e
+
+        if error is not None:
+            raise error
+        return results
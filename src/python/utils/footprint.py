@@ -0,0 +1,167 @@
+"""
+Memory footprint accounting and soft memory budgets.
+
+Components (chat history, memory store, model, ...) register a function that
+estimates their size in bytes; caches also register how to evict themselves.
+Sizes are exported as kairos_memory_bytes{component=...} and shown by the
+`db:memory` CLI command. Process RSS comes from /proc, and tracemalloc totals
+are added when KAIROS_TRACEMALLOC=true.
+
+Soft budgets (0 disables them):
+  KAIROS_MEMORY_BUDGET_MB       process RSS above which caches are evicted
+  KAIROS_CACHE_BUDGET_MB        total cache size above which caches are evicted
+  KAIROS_MEMORY_CHECK_INTERVAL  minimum seconds between budget checks (default 10)
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from termcolor import colored
+
+from utils.metrics import counter, gauge
+from utils.process import process_memory
+
+MIB = 1024 * 1024
+MEMORY_BUDGET = float(os.getenv("KAIROS_MEMORY_BUDGET_MB", "0")) * MIB
+CACHE_BUDGET = float(os.getenv("KAIROS_CACHE_BUDGET_MB", "0")) * MIB
+CHECK_INTERVAL = float(os.getenv("KAIROS_MEMORY_CHECK_INTERVAL", "10"))
+
+if os.getenv("KAIROS_TRACEMALLOC", "false").lower() == "true":
+    tracemalloc.start()
+
+MEMORY_BYTES = gauge(
+    "kairos_memory_bytes", "Approximate bytes held, by component", ("component",)
+)
+CACHE_EVICTIONS = counter(
+    "kairos_cache_evictions_total",
+    "Caches dropped to stay within memory budgets",
+    ("cache", "reason"),
+)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Recursive sys.getsizeof over containers and plain objects."""
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            pending.extend(item)
+        elif hasattr(item, "__dict__"):
+            pending.append(vars(item))
+    return total
+
+
+def model_nbytes(model: Any) -> int:
+    """Bytes in a torch module's parameters and buffers (0 for other models)."""
+    total = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(model, attr, None)
+        if callable(tensors):
+            total += sum(t.element_size() * t.nelement() for t in tensors())
+    return total
+
+
+class Footprint:
+    """Registry of sized components and evictable caches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Callable[[], int]] = {}
+        self._caches: Dict[str, Tuple[Callable[[], int], Callable[[], None]]] = {}
+        self._last_check = float("-inf")
+
+    def add_component(self, name: str, size_fn: Callable[[], int]) -> None:
+        with self._lock:
+            self._components[name] = size_fn
+        MEMORY_BYTES.set_function(size_fn, component=name)
+
+    def add_cache(
+        self, name: str, size_fn: Callable[[], int], evict_fn: Callable[[], None]
+    ) -> None:
+        """Register a cache. Caches are evicted in registration order."""
+        with self._lock:
+            self._caches[name] = (size_fn, evict_fn)
+        self.add_component(name, size_fn)
+
+    def report(self) -> Dict[str, int]:
+        """Bytes per component, plus process totals."""
+        with self._lock:
+            components = dict(self._components)
+        report = {}
+        for name, size_fn in components.items():
+            try:
+                report[name] = int(size_fn())
+            except Exception as e:
+                print(f"Error sizing {name}: {e}")
+        mem = process_memory()
+        for key in ("rss", "pss"):
+            if key in mem:
+                report[f"process_{key}"] = mem[key]
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced_current"] = current
+            report["traced_peak"] = peak
+        return report
+
+    def cache_bytes(self) -> int:
+        with self._lock:
+            caches = list(self._caches.values())
+        return sum(size_fn() for size_fn, _ in caches)
+
+    def enforce_budgets(self, force: bool = False) -> List[str]:
+        """Evict caches while over a soft budget. Returns evicted cache names.
+
+        Checks are rate limited to one per CHECK_INTERVAL unless `force`.
+        """
+        if not MEMORY_BUDGET and not CACHE_BUDGET:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_check < CHECK_INTERVAL:
+                return []
+            self._last_check = now
+            caches = list(self._caches.items())
+
+        evicted = []
+        for name, (size_fn, evict_fn) in caches:
+            reason = self._over_budget()
+            if reason is None:
+                break
+            if not size_fn():
+                continue
+            evict_fn()
+            evicted.append(name)
+            CACHE_EVICTIONS.inc(cache=name, reason=reason)
+        if evicted:
+            print(
+                colored(
+                    f"🧹 Memory budget exceeded, evicted: {', '.join(evicted)}",
+                    "yellow",
+                )
+            )
+        return evicted
+
+    def _over_budget(self) -> Optional[str]:
+        if CACHE_BUDGET and self.cache_bytes() > CACHE_BUDGET:
+            return "cache_budget"
+        if MEMORY_BUDGET and process_memory().get("rss", 0) > MEMORY_BUDGET:
+            return "memory_budget"
+        return None
+
+
+footprint = Footprint()
+MEMORY_BYTES.set_function(
+    lambda: process_memory().get("rss", 0), component="process_rss"
+)
@@ -0,0 +1,137 @@
+"""
+Pre-serialized response cache for the polled read endpoints.
+
+Each entry holds the JSON bytes of one response, keyed by endpoint and query
+string and tagged with the table versions (see get_table_versions) it was
+built from. While the versions are unchanged the bytes are served as-is, and
+the strong ETag derived from them lets clients revalidate with If-None-Match
+and get a 304 without a body. Compressed variants are built lazily, once per
+entry, for bodies of at least COMPRESS_MIN_BYTES.
+
+  KAIROS_RESPONSE_CACHE_SIZE   entries kept, least recently used first out (default 128)
+  KAIROS_COMPRESS_MIN_BYTES    smallest body worth compressing (default 1024)
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from utils.metrics import CACHE_REQUESTS
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+CACHE_SIZE = int(os.getenv("KAIROS_RESPONSE_CACHE_SIZE", "128"))
+COMPRESS_MIN_BYTES = int(os.getenv("KAIROS_COMPRESS_MIN_BYTES", "1024"))
+
+_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+}
+if brotli is not None:
+    _COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=5)
+# Preferred first when the client accepts several
+ENCODINGS = tuple(e for e in ("br", "gzip") if e in _COMPRESSORS)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CachedResponse:
+    """Serialized body of one response plus its lazily compressed variants."""
+
+    def __init__(self, etag: str, versions: Tuple, body: bytes):
+        self.etag = etag
+        self.versions = versions
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Body for `encoding`, or the identity body when not worth compressing."""
+        if encoding is None or len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body, None
+        if encoding not in self._encoded:
+            self._encoded[encoding] = _COMPRESSORS[encoding](self.body)
+        return self._encoded[encoding], encoding
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Unquoted ETag of one representation.
+
+        A strong ETag must differ between byte-different representations, so
+        compressed bodies get the encoding appended.
+        """
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(b) for b in self._encoded.values())
+
+
+class ResponseCache:
+    """LRU of CachedResponse entries, rebuilt when their table versions change."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        name: str,
+        query: str,
+        versions: Sequence[int],
+        build: Callable[[], Any],
+    ) -> CachedResponse:
+        """Cached response for (name, query) at `versions`, building it on a miss."""
+        key = (name, query)
+        versions = tuple(versions)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.versions == versions:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(cache="response", result="hit")
+                return entry
+        CACHE_REQUESTS.inc(cache="response", result="miss")
+
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        query_digest = hashlib.blake2b(query.encode(), digest_size=4).hexdigest()
+        etag = f"{name}-{'.'.join(str(v) for v in versions)}-{query_digest}"
+        entry = CachedResponse(etag, versions, body)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def nbytes(self) -> int:
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(e.nbytes() for e in entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
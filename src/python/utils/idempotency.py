@@ -0,0 +1,132 @@
+"""
+Idempotency keys: one execution per client-supplied key.
+
+The first request with a key runs; duplicates that arrive while it is running
+wait for the same result, and duplicates that arrive later replay the stored
+result for IDEMPOTENCY_WINDOW seconds after it finished. A key reused with a
+different request body is a conflict. Failed executions are not stored, so the
+client can retry them with the same key.
+
+Results live in this process only; with several prefork workers a duplicate is
+only caught when it reaches the same worker.
+
+  KAIROS_IDEMPOTENCY_WINDOW    seconds a finished result is kept (default 600)
+  KAIROS_IDEMPOTENCY_MAX_KEYS  finished results kept at most (default 1000)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Optional, Tuple
+
+from utils.metrics import counter
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_WINDOW = float(os.getenv("KAIROS_IDEMPOTENCY_WINDOW", "600"))
+MAX_KEYS = int(os.getenv("KAIROS_IDEMPOTENCY_MAX_KEYS", "1000"))
+
+IDEMPOTENT_REQUESTS = counter(
+    "kairos_idempotent_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome",
+    ("route", "result"),
+)
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different body."""
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable digest of a JSON-able request body."""
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.future: Future = Future()
+        self.finished_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """In-flight and recently finished executions, keyed by idempotency key."""
+
+    def __init__(
+        self, route: str, window: float = IDEMPOTENCY_WINDOW, max_keys: int = MAX_KEYS
+    ):
+        self.route = route
+        self.window = window
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, request_fingerprint: str) -> Tuple[Future, bool]:
+        """Claim `key`. Returns (future, owner).
+
+        The owner runs the request and must call finish() or fail(); everyone
+        else waits on the future. Raises IdempotencyConflict when the key was
+        used for a different request body.
+        """
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != request_fingerprint:
+                    IDEMPOTENT_REQUESTS.inc(route=self.route, result="conflict")
+                    raise IdempotencyConflict(
+                        "Idempotency-Key was already used with a different request"
+                    )
+                result = "replayed" if entry.future.done() else "coalesced"
+                IDEMPOTENT_REQUESTS.inc(route=self.route, result=result)
+                return entry.future, False
+            entry = _Entry(request_fingerprint)
+            self._entries[key] = entry
+            IDEMPOTENT_REQUESTS.inc(route=self.route, result="new")
+            return entry.future, True
+
+    def finish(self, key: str, result: Any) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if entry.future.done():
+                # A waiter cancelled the shared future; later duplicates still
+                # need the result, so store it on a fresh one
+                entry.future = Future()
+            entry.finished_at = time.monotonic()
+            # Finished entries expire oldest first, so keep them in that order
+            self._entries.move_to_end(key)
+            future = entry.future
+        future.set_result(result)
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """Forget `key` so it can be retried; current waiters get `error`.
+
+        A key that already finished keeps its stored result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.finished_at is not None:
+                return
+            del self._entries[key]
+        if not entry.future.done():
+            entry.future.set_exception(error)
+
+    def _expire(self) -> None:
+        """Drop finished entries past the window, and the oldest beyond max_keys."""
+        now = time.monotonic()
+        finished = [k for k, e in self._entries.items() if e.finished_at is not None]
+        excess = len(finished) - self.max_keys
+        for i, key in enumerate(finished):
+            if i >= excess and now - self._entries[key].finished_at < self.window:
+                break
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
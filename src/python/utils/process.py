@@ -0,0 +1,55 @@
+"""
+Process memory readings from /proc (Linux), used for worker and budget reports.
+"""
+import os
+from typing import Dict, Union
+
+# smaps_rollup fields worth reporting, in kB
+_SMAPS_FIELDS = (
+    "Rss",
+    "Pss",
+    "Shared_Clean",
+    "Shared_Dirty",
+    "Private_Clean",
+    "Private_Dirty",
+)
+
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """Return memory usage of a process in bytes.
+
+    Uses /proc/<pid>/smaps_rollup so shared (copy-on-write) and private pages
+    can be told apart. Falls back to VmRSS, then to ru_maxrss, on systems
+    without it. Returns an empty dict if the process is gone.
+    """
+    report: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in _SMAPS_FIELDS:
+                    report[name.lower()] = int(rest.split()[0]) * 1024
+        return report
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError):
+        return report
+
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    report["rss"] = int(line.split()[1]) * 1024
+        return report
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError):
+        return report
+
+    if pid in ("self", os.getpid()):
+        import resource
+
+        # ru_maxrss is the peak, in kB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["rss"] = peak if os.uname().sysname == "Darwin" else peak * 1024
+    return report
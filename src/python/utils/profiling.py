@@ -0,0 +1,192 @@
+"""
+Opt-in sampling profiler for single chat turns.
+
+A background thread samples Python stacks every few milliseconds while a turn
+runs and writes them in collapsed-stack format (one "frame;frame;frame count"
+line per stack), which flamegraph.pl, speedscope and inferno read directly.
+
+Environment:
+  KAIROS_PROFILE           true to profile turns automatically (rate limited)
+  KAIROS_PROFILE_DIR       where profiles are written (default: data/profiles)
+  KAIROS_PROFILE_INTERVAL  minimum seconds between automatic profiles (default 60)
+  KAIROS_PROFILE_SAMPLE_MS sampling period in milliseconds (default 5)
+
+The API also profiles a request carrying `X-Kairos-Profile: 1` when it comes
+from localhost. Behind a local reverse proxy every caller looks local, so those
+requests share the same rate limit.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+from termcolor import colored
+
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+PROFILE_DIR = os.getenv(
+    "KAIROS_PROFILE_DIR", os.path.join(PROJECT_ROOT, "data", "profiles")
+)
+PROFILE_INTERVAL = float(os.getenv("KAIROS_PROFILE_INTERVAL", "60"))
+SAMPLE_SECONDS = float(os.getenv("KAIROS_PROFILE_SAMPLE_MS", "5")) / 1000
+PROFILE_HEADER = "X-Kairos-Profile"
+LOCAL_ADDRESSES = ("127.0.0.1", "::1", "localhost")
+# Innermost frames of threads parked waiting for work; dropped when sampling all
+IDLE_FRAMES = (
+    "_worker (thread.py:",
+    "wait (threading.py:",
+    "select (selectors.py:",
+)
+
+_enabled = os.getenv("KAIROS_PROFILE", "false").lower() == "true"
+_rate_lock = threading.Lock()
+_last_profile_at = float("-inf")
+
+
+def is_local(remote_addr: Optional[str]) -> bool:
+    return remote_addr in LOCAL_ADDRESSES
+
+
+def header_requests_profile(value: Optional[str], remote_addr: Optional[str]) -> bool:
+    """Whether a PROFILE_HEADER value asks for a profile: exactly "1", from localhost."""
+    return value is not None and value.strip() == "1" and is_local(remote_addr)
+
+
+def _take_slot() -> bool:
+    """Rate limiter for all profiles: at most one per PROFILE_INTERVAL."""
+    global _last_profile_at
+    with _rate_lock:
+        now = time.monotonic()
+        if now - _last_profile_at < PROFILE_INTERVAL:
+            return False
+        _last_profile_at = now
+        return True
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Decide whether to profile this turn.
+
+    `requested` is an explicit ask (a trusted header), honoured even when
+    KAIROS_PROFILE is off; either way the rate limit must allow it.
+    """
+    return (requested or _enabled) and _take_slot()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler:
+    """Samples the stacks of some (or all) threads from a background thread."""
+
+    def __init__(
+        self,
+        thread_ids: Optional[Iterable[int]] = None,
+        interval: float = SAMPLE_SECONDS,
+        thread_prefix: Optional[str] = None,
+    ):
+        # None samples every thread, with the thread name as the root frame
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        # Also sample threads whose name starts with this, e.g. pool workers
+        # that only start once the sampled code submits work to them
+        self.thread_prefix = thread_prefix
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(
+            target=self._run, name="kairos-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        # With more than one thread in a profile, name each one in the root frame
+        named = self.thread_ids is None or self.thread_prefix is not None
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            wanted = self.thread_ids
+            if wanted is not None and self.thread_prefix is not None:
+                wanted = wanted | {
+                    ident
+                    for ident, name in names.items()
+                    if name.startswith(self.thread_prefix)
+                }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if wanted is not None and thread_id not in wanted:
+                    continue
+                if named and _frame_label(frame).startswith(IDLE_FRAMES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if named:
+                    stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_turn(
+    label: str,
+    requested: bool = False,
+    all_threads: bool = False,
+    thread_prefix: Optional[str] = None,
+) -> Iterator[Optional[dict]]:
+    """Profile the enclosed block if should_profile() allows it.
+
+    Yields a dict whose "path" is filled in with the written file afterwards,
+    or None when this turn is not profiled. Besides the caller's thread, only
+    threads named with `thread_prefix` (the pool the turn fans out to) are
+    sampled, or every thread with `all_threads` (e.g. the asyncio server,
+    whose turn hops between the event loop and executor threads).
+    """
+    if not should_profile(requested):
+        yield None
+        return
+
+    result: dict = {"path": None}
+    thread_ids = None if all_threads else [threading.get_ident()]
+    sampler = StackSampler(thread_ids, thread_prefix=thread_prefix).start()
+    try:
+        yield result
+    finally:
+        sampler.stop()
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            name = f"{label}-{stamp}-{os.getpid()}-{threading.get_ident()}.collapsed"
+            path = os.path.join(PROFILE_DIR, name)
+            sampler.write_collapsed(path)
+            result["path"] = path
+            print(
+                colored(
+                    f"🔥 Profile written: {path} ({sampler.samples} samples)", "yellow"
+                )
+            )
+        except OSError as e:
+            print(colored(f"⚠️ Could not write profile: {e}", "yellow"))
@@ -0,0 +1,40 @@
+"""
+Per-phase startup timings.
+
+Each init step runs inside phase(name); durations are kept in start-up order,
+exported as kairos_startup_seconds{phase=...} and printed by
+benchmarks/startup_profile.py. Repeated phases (e.g. a second KairosAI) add up.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from utils.metrics import gauge
+
+STARTUP_SECONDS = gauge(
+    "kairos_startup_seconds", "Time spent in each start-up phase", ("phase",)
+)
+
+_phases: Dict[str, float] = {}
+
+
+def record(name: str, seconds: float) -> None:
+    if name not in _phases:
+        _phases[name] = 0.0
+        STARTUP_SECONDS.set_function(lambda: _phases[name], phase=name)
+    _phases[name] += seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time one start-up phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def report() -> Dict[str, float]:
+    """Seconds per phase, in the order phases first ran."""
+    return dict(_phases)
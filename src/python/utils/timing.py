@@ -0,0 +1,65 @@
+"""
+Per-request stage timings for Server-Timing headers and debug responses.
+
+A request handler calls start_request() to get a fresh RequestTimings; any
+stage() block that runs in the same context (including executor work started
+with a copied context) adds its duration to it. Every stage is also observed
+in the kairos_stage_seconds histogram, so /metrics and Server-Timing agree.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from utils.metrics import STAGE_SECONDS
+
+
+class RequestTimings:
+    """Accumulated seconds per stage for a single request."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        # Insertion order is pipeline order, which keeps the header readable
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds."""
+        return {stage: round(s * 1000, 2) for stage, s in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.to_dict().items())
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "kairos_request_timings", default=None
+)
+
+
+def start_request() -> RequestTimings:
+    """Begin collecting stage timings for the current request."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere (e.g. reported by the model)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as pipeline stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
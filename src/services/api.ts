@@ -1,6 +1,6 @@
 // API service layer - HTTP client and API endpoint functions
 // This file will contain API configuration, base URL setup, and request/response handling
-import { Memory } from '@/types';
+import { CreateMemoryRequest, Memory } from '@/types';
 import { API_CONFIG } from '@/constants/config';
 
 const API_BASE_URL = API_CONFIG.BASE_URL;
@@ -35,13 +35,19 @@ const fetchWithTimeout = async (
 };
 
 export const apiClient = {
-  chat: async (message: string, includeMemories: boolean) => {
+  // Retries that reuse idempotencyKey share the original generation
+  chat: async (
+    message: string,
+    includeMemories: boolean,
+    idempotencyKey?: string
+  ) => {
     const response = await fetchWithTimeout(
       `${API_BASE_URL}/chat`,
       {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
         },
         body: JSON.stringify({ message, includeMemories }),
       },
@@ -49,14 +55,67 @@ export const apiClient = {
     );
     return response.json();
   },
-  recentChatHistory: async () => {
-    const response = await fetch(`${API_BASE_URL}/chat-history?limit=10`, {
+  createChatJob: async (
+    message: string,
+    includeMemories: boolean,
+    idempotencyKey?: string
+  ) => {
+    const response = await fetch(`${API_BASE_URL}/chat/jobs`, {
+      method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
       },
+      body: JSON.stringify({ message, include_memories: includeMemories }),
     });
     return response.json();
   },
+  // Long-poll: the server answers when the job finishes or after `wait` seconds
+  chatJob: async (jobId: string, wait: number = 25) => {
+    const response = await fetchWithTimeout(
+      `${API_BASE_URL}/chat/jobs/${jobId}?wait=${wait}`,
+      {
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      },
+      (wait + 5) * 1000
+    );
+    return response.json();
+  },
+  recentChatHistory: async (limit: number = 10) => {
+    const response = await fetch(
+      `${API_BASE_URL}/chat-history?limit=${limit}`,
+      {
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      }
+    );
+    return response.json();
+  },
+  chatHistoryBefore: async (beforeId: number, limit: number = 50) => {
+    const response = await fetch(
+      `${API_BASE_URL}/chat-history?before_id=${beforeId}&limit=${limit}`,
+      {
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      }
+    );
+    return response.json();
+  },
+  chatHistorySince: async (sinceId: number) => {
+    const response = await fetch(
+      `${API_BASE_URL}/chat-history?since=${sinceId}`,
+      {
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      }
+    );
+    return response.json();
+  },
   deleteChatHistory: async () => {
     const response = await fetch(`${API_BASE_URL}/chat-history`, {
       method: 'DELETE',
@@ -111,6 +170,26 @@ export const apiClient = {
     });
     return response.json();
   },
+  addMemories: async (memories: CreateMemoryRequest[]) => {
+    const response = await fetch(`${API_BASE_URL}/memories/batch`, {
+      method: 'POST',
+      body: JSON.stringify({ memories }),
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+    return response.json();
+  },
+  deleteMemoriesByKeys: async (memoryKeys: string[]) => {
+    const response = await fetch(`${API_BASE_URL}/memories/batch`, {
+      method: 'DELETE',
+      body: JSON.stringify({ memory_keys: memoryKeys }),
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+    return response.json();
+  },
   deleteMemories: async () => {
     const response = await fetch(`${API_BASE_URL}/memories`, {
       method: 'DELETE',
@@ -1,14 +1,55 @@
+import { ChatJob } from '@/types';
 import { apiClient } from './api';
 
 export const chatService = {
-  sendMessage: async (message: string, includeMemories: boolean) => {
-    const response = await apiClient.chat(message, includeMemories);
+  // Pass the same idempotencyKey when retrying a message, so the server
+  // returns the original reply instead of generating (and storing) another
+  sendMessage: async (
+    message: string,
+    includeMemories: boolean,
+    idempotencyKey: string = crypto.randomUUID()
+  ) => {
+    const response = await apiClient.chat(
+      message,
+      includeMemories,
+      idempotencyKey
+    );
     return response;
   },
+  // For long generations: queue a job, then long-poll until it finishes
+  sendMessageAsJob: async (
+    message: string,
+    includeMemories: boolean,
+    idempotencyKey: string = crypto.randomUUID()
+  ): Promise<ChatJob> => {
+    const created = await apiClient.createChatJob(
+      message,
+      includeMemories,
+      idempotencyKey
+    );
+    if (!created.job_id) {
+      throw new Error(created.error || 'Failed to queue chat job');
+    }
+    let job: ChatJob = await apiClient.chatJob(created.job_id);
+    while (job.status === 'queued' || job.status === 'running') {
+      job = await apiClient.chatJob(created.job_id);
+    }
+    return job;
+  },
   getChatHistory: async () => {
     const response = await apiClient.recentChatHistory();
     return response;
   },
+  // Older page: pass the next_cursor from the previous page
+  getOlderChatHistory: async (beforeId: number, limit?: number) => {
+    const response = await apiClient.chatHistoryBefore(beforeId, limit);
+    return response;
+  },
+  // Cheap poll: only messages newer than the last id the client has seen
+  getNewChatMessages: async (sinceId: number) => {
+    const response = await apiClient.chatHistorySince(sinceId);
+    return response;
+  },
   deleteChatHistory: async () => {
     const response = await apiClient.deleteChatHistory();
     return response;
@@ -0,0 +1,50 @@
+// WebSocket chat channel - one persistent session per socket (/ws/chat)
+// Needs the async backend: npm run start:async
+import { API_CONFIG } from '@/constants/config';
+
+export type ChatSocketFrame =
+  | { type: 'ready'; session_id: string; resumed: boolean }
+  | { type: 'token'; id: string; text: string }
+  | {
+      type: 'done';
+      id: string;
+      response: string;
+      relevant_memories: string[];
+      timings?: Record<string, number>;
+    }
+  | { type: 'error'; id?: string; error: string }
+  | { type: 'pong' };
+
+const SOCKET_URL = `${API_CONFIG.BASE_URL.replace(/^http/, 'ws').replace(
+  /\/api$/,
+  ''
+)}/ws/chat`;
+
+export const createChatSocket = (
+  onFrame: (frame: ChatSocketFrame) => void,
+  sessionId?: string
+) => {
+  const url = sessionId
+    ? `${SOCKET_URL}?session=${encodeURIComponent(sessionId)}`
+    : SOCKET_URL;
+  const socket = new WebSocket(url);
+  socket.onmessage = (event) => onFrame(JSON.parse(event.data));
+
+  const send = (frame: Record<string, unknown>) => {
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify(frame));
+    }
+  };
+
+  return {
+    socket,
+    sendMessage: (message: string, includeMemories: boolean) => {
+      const id = crypto.randomUUID();
+      send({ type: 'message', id, message, include_memories: includeMemories });
+      return id;
+    },
+    // Call as the user types so the server can warm retrieval for the turn
+    typing: (text: string) => send({ type: 'typing', text }),
+    close: () => socket.close(),
+  };
+};
@@ -1,7 +1,7 @@
 // Memory service - API functions for memory operations
 // This file will contain memory CRUD operations, search, and bulk actions
 
-import { Memory } from '@/types'
+import { BatchMemoryResponse, CreateMemoryRequest, Memory } from '@/types'
 import { apiClient } from './api'
 
 export const memoryService = {
@@ -34,6 +34,24 @@ export const memoryService = {
     }
     return response
   },
+  addMemories: async (
+    memories: CreateMemoryRequest[]
+  ): Promise<BatchMemoryResponse> => {
+    const response = await apiClient.addMemories(memories)
+    if (!response || !response.results) {
+      throw new Error('Failed to add memories')
+    }
+    return response
+  },
+  deleteMemoriesByKeys: async (
+    memoryKeys: string[]
+  ): Promise<BatchMemoryResponse> => {
+    const response = await apiClient.deleteMemoriesByKeys(memoryKeys)
+    if (!response || !response.results) {
+      throw new Error('Failed to delete memories')
+    }
+    return response
+  },
   deleteMemories: async () => {
     const response = await apiClient.deleteMemories()
     if (!response) {
@@ -6,6 +6,12 @@ export interface ChatMessage {
   timestamp: string;
 }
 
+export interface ChatHistoryPage {
+  history: ChatMessage[];
+  next_cursor: number | null;
+  has_more: boolean;
+}
+
 export interface ChatRequest {
   message: string;
   includeMemories?: boolean;
@@ -15,6 +21,18 @@ export interface ChatResponse {
   response: string;
   relevantMemories: string[];
   timestamp: string;
+  // Per-stage milliseconds, only returned when the server runs with KAIROS_DEBUG
+  timings?: Record<string, number>;
+}
+
+export interface ChatJob {
+  id: string;
+  status: 'queued' | 'running' | 'done' | 'error';
+  include_memories: boolean;
+  response: string | null;
+  error: string | null;
+  created_at: string;
+  updated_at: string;
 }
 
 // Memory types
@@ -39,6 +57,21 @@ export interface UpdateMemoryRequest {
   priority: number;
 }
 
+export interface BatchMemoryResult {
+  memory_key: string | null;
+  id?: number | null;
+  deleted?: boolean;
+  error?: string;
+}
+
+export interface BatchMemoryResponse {
+  results: BatchMemoryResult[];
+  saved?: number;
+  failed?: number;
+  deleted?: number;
+  not_found?: number;
+}
+
 // API types
 export interface ApiResponse<T> {
   data: T;